@@ -0,0 +1,36 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import time
+from datetime import datetime
+
+import config # ARCHIVE_* policy
+import refresh # OFF_MARKET marker
+
+# --- Archive tier ---
+# Rejected, off-market and stale listings are moved out of listings.json into archive.json,
+# so they no longer take part in scoring, saves or /listings responses. The archive is a
+# second ListingStore: it isn't read until something asks for it (a search, a restore, or
+# archiving more listings), and listings can be restored to the live set at any time.
+
+def added_at(listing):
+    """Unix time a listing was added: its added_at, else from its id (a YYYYmmddHHMMSS timestamp), or None."""
+    if listing.get("added_at") is not None:
+        return listing["added_at"]
+    try:
+        return datetime.strptime(str(listing.get("id")), "%Y%m%d%H%M%S").timestamp()
+    except ValueError:
+        return None
+
+def archive_reason(listing, now=None):
+    """Why the archive policy would move this listing out of the live set ("group", "off_market", "age"), or None."""
+    if listing.get("group") in config.ARCHIVE_GROUPS:
+        return "group"
+    if config.ARCHIVE_OFF_MARKET and listing.get("date_available") == refresh.OFF_MARKET:
+        return "off_market"
+    if config.ARCHIVE_AFTER_DAYS is not None and not listing.get("applied"): # Keep the ones we're waiting to hear back on
+        added = added_at(listing)
+        if added is not None and (now or time.time()) - added > config.ARCHIVE_AFTER_DAYS * 86400:
+            return "age"
+    return None
@@ -0,0 +1,86 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+"""
+Load, save and /listings serialization cost for large listing collections: the previous
+path (json + a separate validation loop, json.dump(indent=4), Flask's default jsonify)
+against the listing codec (orjson when installed, compact and pretty modes).
+
+    python benchmarks/codec.py [--count 20000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+from models import Listing
+from listing_memory import make_listing
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def old_load(text):
+    """json.load, then the separate image validation loop, then conversion to records."""
+    data = json.loads(text)
+    for listing in data:
+        codec._normalize_images(listing)
+    return [Listing.from_dict(listing) for listing in data]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    records = [Listing.from_dict(make_listing(i, rng)) for i in range(args.count)]
+    dicts = [listing.to_dict() for listing in records]
+    old_file = json.dumps(dicts, indent=4)
+    new_file = codec.encode_listings(records)
+
+    print(f"{args.count} listings, best of {args.repeat} (orjson: {'yes' if codec.orjson else 'no'})")
+    print(f"  listings.json size: indent=4 {len(old_file) / 1e6:.1f} MB, compact {len(new_file) / 1e6:.1f} MB, "
+          f"pretty {len(codec.encode_listings(records, pretty=True)) / 1e6:.1f} MB")
+
+    rows = [
+        ("load listings.json", best_of(args.repeat, lambda: old_load(old_file)),
+                               best_of(args.repeat, lambda: codec.decode_listings(new_file))),
+        ("save (compact)", best_of(args.repeat, lambda: json.dumps([l.to_dict() for l in records], indent=4)),
+                           best_of(args.repeat, lambda: codec.encode_listings(records))),
+        ("save (pretty)", best_of(args.repeat, lambda: json.dumps([l.to_dict() for l in records], indent=4)),
+                          best_of(args.repeat, lambda: codec.encode_listings(records, pretty=True))),
+    ]
+
+    try:
+        from flask import Flask
+        from flask.json.provider import DefaultJSONProvider
+        import zillower
+    except ImportError as e:
+        print(f"  (skipping /listings serialization: {e})")
+    else:
+        default_app = Flask("baseline")
+        default_app.json = DefaultJSONProvider(default_app)
+        with default_app.app_context():
+            before = best_of(args.repeat, lambda: default_app.json.response(dicts).get_data())
+        with zillower.app.app_context():
+            after = best_of(args.repeat, lambda: zillower.app.json.response(records).get_data())
+        rows.append(("/listings response", before, after))
+
+    print(f"{'':24}{'before (ms)':>14}{'codec (ms)':>14}{'speed-up':>10}")
+    for name, before, after in rows:
+        print(f"{name:24}{before:14.1f}{after:14.1f}{before / after:9.1f}x")
+
+if __name__ == "__main__":
+    main()
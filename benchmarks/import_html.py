@@ -0,0 +1,58 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+"""
+Saved-page import throughput: parsing a directory of listing pages in one process against a
+process pool (importer.read_pages). No network calls; the pages are synthetic but about the
+size of a saved Zillow page.
+
+    python benchmarks/import_html.py [--count 200] [--workers N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importer
+
+def make_page(i):
+    data = {
+        "@type": "Residence",
+        "offers": {"price": 900 + i % 1500},
+        "address": {"streetAddress": f"{i} Elm St", "addressLocality": "Fort Collins", "addressRegion": "CO"},
+        "numberOfRooms": f"{1 + i % 4} Bed {1 + i % 2} Bath",
+        "floorSize": {"value": 500 + i % 2000, "unitCode": "SQF"},
+        "description": "Bright unit near campus with a fenced yard and off-street parking. " * 20,
+    }
+    markup = "".join(f'<div class="c{j}"><span>Detail {j}</span><a href="/x/{j}">link</a></div>' for j in range(2500))
+    return (f'<html><head><link rel="canonical" href="https://www.zillow.com/homedetails/{i}_zpid/"></head><body>'
+            f'<script type="application/ld+json">{json.dumps(data)}</script>{markup}'
+            '<span class="Text-c11n-8-109-3__sc-aiai24-0 hdp__sc-1hoxd7t-2 cEHZrB iWQNvU">Available Aug 1</span></body></html>')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(args.count):
+            with open(os.path.join(directory, f"{i}.html"), "w") as f:
+                f.write(make_page(i))
+        size_kb = os.path.getsize(os.path.join(directory, "0.html")) / 1024
+
+        print(f"{args.count} pages of {size_kb:.0f} KB")
+        for workers in sorted({1, args.workers}):
+            start = time.perf_counter()
+            pages, failures = importer.read_pages(importer.iter_sources(directory), workers)
+            seconds = time.perf_counter() - start
+            print(f"  {workers:3} worker(s): {seconds:7.2f} s  {len(pages) / seconds:8.1f} pages/s  ({len(failures)} failed)")
+
+if __name__ == "__main__":
+    main()
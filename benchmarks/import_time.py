@@ -0,0 +1,86 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+"""
+Import-time budget for the web server.
+
+Runs `python -X importtime -c "import zillower"` in a fresh interpreter, reports the
+slowest imports and fails (exit code 1) if the total is over budget or any of the heavy
+scraping/image dependencies were loaded at startup.
+
+    python benchmarks/import_time.py [--budget-ms 400] [--module zillower] [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only loaded when a scrape, parse, image download or re-encode actually runs
+HEAVY_MODULES = ("playwright", "playwright_stealth", "selenium", "bs4", "PIL", "requests")
+
+def measure(module):
+    """
+    Imports module in a fresh interpreter. Returns ({package: cumulative µs}, total µs), where the
+    total is the module's own cumulative import time (interpreter start-up is not counted).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr}")
+
+    packages = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = len(name) - len(name.lstrip())
+        name = name.strip()
+        if depth == 1 and name == module:
+            total = int(cumulative)
+        elif depth == 3: # Direct imports of the module: their cumulative time includes their children
+            packages[name] = packages.get(name, 0) + int(cumulative)
+        packages.setdefault(name.split(".")[0] + "*", 0) # Remember every package seen, at any depth
+    return packages, total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="zillower")
+    parser.add_argument("--budget-ms", type=float, default=400.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        packages, total = measure(args.module)
+        totals.append(total)
+    median_ms = statistics.median(totals) / 1000
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print(f"Slowest imports made by {args.module} (last run):")
+    top_level = sorted(((us, name) for name, us in packages.items() if not name.endswith("*")), reverse=True)
+    for us, name in top_level[:15]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    loaded_heavy = [m for m in HEAVY_MODULES if f"{m}*" in packages]
+    failed = False
+    if loaded_heavy:
+        print(f"FAIL: heavy modules loaded at import: {', '.join(loaded_heavy)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import time {median_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
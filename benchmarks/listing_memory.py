@@ -0,0 +1,108 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+"""
+Memory and hot-path cost of typed Listing records versus the old free-form dicts.
+
+Builds N synthetic listings shaped like scraped ones ("$1,850" prices, "3.4 mi" distances,
+-1 for missing sizes) and compares, for dicts and for Listing records:
+  - retained memory per listing after loading from JSON (tracemalloc)
+  - assign_scores() time
+  - the /listings sort by price and by distance
+
+    python benchmarks/listing_memory.py [--count 20000] [--repeat 5]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scoring
+from models import Listing
+
+def make_listing(i, rng):
+    """One listing as the scraper used to produce it: numbers still formatted as strings."""
+    return {
+        "id": 20250101000000 + i,
+        "url": f"https://www.zillow.com/homedetails/{i}_zpid/",
+        "address": f"{rng.randint(1, 9999)} Main St, Fort Collins, CO 80521",
+        "price": f"${rng.randint(900, 4000):,}",
+        "square_footage": rng.choice([-1, rng.randint(400, 2500)]),
+        "bedrooms": rng.randint(1, 5),
+        "bathrooms": rng.choice([1.0, 1.5, 2.0, 2.5]),
+        "date_available": "Not Listed",
+        "distance": f"{rng.uniform(0.2, 15):.1f} mi",
+        "contacted": False,
+        "applied": False,
+        "group": rng.choice(["none", "red", "green", "blue"]),
+        "overall_rating": rng.randint(1, 10),
+        "roommates": rng.randint(0, 3),
+        "utility_estimate": None,
+        "comments": "",
+        "image": [f"/images/{i:016x}-{i:016x}.webp"],
+        "thumbnails": [f"/images/{i:016x}-{i:016x}_thumb.webp"],
+    }
+
+def retained_bytes(build):
+    """Bytes still allocated after build() returns its result."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    source = [make_listing(i, rng) for i in range(args.count)]
+
+    # What load_listings keeps in memory: the parsed JSON dicts, or the records built from them
+    text = json.dumps(source)
+    dicts, dict_bytes = retained_bytes(lambda: json.loads(text))
+    records, record_bytes = retained_bytes(lambda: [Listing.from_dict(d) for d in json.loads(text)])
+
+    def sort_dicts(field, parse):
+        return sorted(dicts, key=lambda l: parse(l.get(field)) if parse(l.get(field)) is not None else float("inf"))
+
+    def sort_records(field):
+        return sorted(records, key=lambda l: l.get(field) if l.get(field) is not None else float("inf"))
+
+    rows = [
+        ("memory / listing (bytes)", dict_bytes / args.count, record_bytes / args.count),
+        ("assign_scores (ms)", best_of(args.repeat, lambda: scoring.assign_scores(dicts)),
+                               best_of(args.repeat, lambda: scoring.assign_scores(records))),
+        ("sort by price (ms)", best_of(args.repeat, lambda: sort_dicts("price", scoring.currency_to_float)),
+                               best_of(args.repeat, lambda: sort_records("price"))),
+        ("sort by distance (ms)", best_of(args.repeat, lambda: sort_dicts("distance", scoring.to_miles)),
+                                  best_of(args.repeat, lambda: sort_records("distance"))),
+    ]
+
+    print(f"{args.count} listings, best of {args.repeat}")
+    print(f"{'':28}{'dict':>12}{'Listing':>12}{'change':>10}")
+    for name, before, after in rows:
+        print(f"{name:28}{before:12.1f}{after:12.1f}{(after - before) / before:+10.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+"""
+Peak memory of reading a listings.json full of inline base64 photos: decoding it whole (as
+load_listings does) against streaming it one listing at a time (codec.iter_listings, which
+migrate.py uses). Each runs in a fresh process and reports its peak RSS.
+
+    python benchmarks/migration_memory.py [--count 400] [--image-kb 200]
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def make_file(path, count, image_kb, rng):
+    """Writes a listings file one listing at a time, each with two inline 'photos' of random bytes."""
+    with open(path, "w") as f:
+        f.write("[")
+        for i in range(count):
+            photos = [f"data:image/jpeg;base64,{base64.b64encode(rng.randbytes(image_kb * 512)).decode()}" for _ in range(2)]
+            listing = {"id": 20250101000000 + i, "url": f"https://www.zillow.com/homedetails/{i}_zpid/",
+                       "address": f"{i} Elm St, Fort Collins, CO", "price": f"${rng.randint(900, 2500):,}",
+                       "square_footage": rng.randint(400, 2000), "bedrooms": rng.randint(1, 4), "bathrooms": 1.5,
+                       "distance": f"{rng.uniform(0.5, 9):.1f} mi", "image": photos}
+            f.write(("," if i else "") + json.dumps(listing))
+        f.write("]")
+
+def measure(mode, path):
+    """Runs in a child process: reads path whole or streaming, prints listings read, seconds and peak RSS."""
+    import codec
+    start = time.perf_counter()
+    if mode == "whole":
+        with open(path, "rb") as f:
+            count = len(codec.decode_listings(f.read()))
+    else:
+        with open(path, "rb") as f:
+            count = sum(1 for _ in codec.iter_listings(f))
+    seconds = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # KB on Linux
+    print(json.dumps({"listings": count, "seconds": seconds, "peak_mb": peak_kb / 1024}))
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], sys.argv[3])
+        return
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=400)
+    parser.add_argument("--image-kb", type=int, default=200, help="Approximate base64 size of each photo")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "listings.json")
+        make_file(path, args.count, args.image_kb, random.Random(1))
+        print(f"{args.count} listings, {os.path.getsize(path) / 2**20:.0f} MB file")
+        for mode in ("whole", "streaming"):
+            result = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", mode, path],
+                                    capture_output=True, text=True, cwd=ROOT, check=True)
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"  {mode:10} {stats['listings']:6} listings  {stats['seconds']:7.2f} s  peak RSS {stats['peak_mb']:7.0f} MB")
+
+if __name__ == "__main__":
+    main()
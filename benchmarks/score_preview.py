@@ -0,0 +1,58 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+"""
+Cost of trying new score weights: a full re-score and save (what /update_settings does)
+against /score_preview's weighted sum over cached feature columns.
+
+    python benchmarks/score_preview.py [--count 5000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+import scoring
+from models import Listing
+from listing_memory import make_listing
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    records = scoring.assign_scores([Listing.from_dict(make_listing(i, rng)) for i in range(args.count)])
+    weights = {"rent": 0.5, "sqft": 0.1, "bedrooms": 0.1, "bathrooms": 0.1, "distance": 0.1}
+
+    def rank(scores):
+        return sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+
+    columns = scoring.feature_columns(records)
+    rows = [
+        ("re-score + encode file", best_of(args.repeat, lambda: codec.encode_listings(scoring.assign_scores(records)))),
+        ("build feature columns", best_of(args.repeat, lambda: scoring.feature_columns(records))),
+        ("preview (cached columns)", best_of(args.repeat, lambda: rank(scoring.score_columns(columns, weights)))),
+    ]
+
+    print(f"{args.count} listings, best of {args.repeat}")
+    for name, ms in rows:
+        print(f"  {name:28}{ms:10.1f} ms")
+
+if __name__ == "__main__":
+    main()
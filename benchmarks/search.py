@@ -0,0 +1,96 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+"""
+/search latency at large collection sizes: the inverted index (build, term, prefix and phrase
+queries, patching after one comment edit) against scanning every listing's text.
+
+    python benchmarks/search.py [--count 20000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search
+from models import Listing
+from listing_memory import make_listing
+from top_k import FakeStore
+
+# Amenity words that show up in a fraction of listings, mixed into filler text from a larger vocabulary
+WORDS = ("garage park yard quiet sunny remodeled basement laundry dishwasher balcony campus bus "
+         "hardwood carpet pets allowed fenced patio downtown trail view storage parking").split()
+
+def make_text(rng, filler, words):
+    return " ".join(rng.choice(WORDS) if rng.random() < 0.05 else rng.choice(filler) for _ in range(words))
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def scan(listings_data, words):
+    """What finding a listing looked like without an index: every word in any text field."""
+    return [l for l in listings_data
+            if all(any(w in (l.get(f) or "").lower() for f in search.SEARCH_FIELDS) for w in words)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    filler = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 9))) for _ in range(3000)]
+    records = []
+    for i in range(args.count):
+        listing = make_listing(i, rng)
+        listing["comments"] = make_text(rng, filler, rng.randint(0, 12))
+        listing["description"] = make_text(rng, filler, rng.randint(40, 120))
+        records.append(Listing.from_dict(listing))
+
+    store = FakeStore(records)
+    index = search.SearchIndex()
+
+    def edit_one_comment():
+        i = rng.randrange(len(records))
+        listing = records[i].copy()
+        listing["comments"] = make_text(rng, WORDS, 8)
+        records[i] = listing
+        store.commit(records)
+        index.sync(records, store)
+
+    def rescore_all():
+        """Every listing gets a new score (as after an edit to a price); no text changes."""
+        for i, listing in enumerate(records):
+            listing = listing.copy()
+            listing["score"] = round(rng.random(), 2)
+            records[i] = listing
+        store.commit(records)
+        index.sync(records, store)
+
+    rows = [
+        ("build index", best_of(1, lambda: index.sync(records, store))),
+        ("term: garage", best_of(args.repeat, lambda: index.search("garage"))),
+        ("two terms: garage park", best_of(args.repeat, lambda: index.search("garage park"))),
+        ("prefix: gar*", best_of(args.repeat, lambda: index.search("gar*"))),
+        ('phrase: "quiet sunny"', best_of(args.repeat, lambda: index.search('"quiet sunny"'))),
+        ("commit + patch (1 comment)", best_of(args.repeat, edit_one_comment)),
+        ("commit + patch (all re-scored)", best_of(args.repeat, rescore_all)),
+        ("scan: garage park", best_of(args.repeat, lambda: scan(records, ["garage", "park"]))),
+    ]
+
+    print(f"{args.count} listings, best of {args.repeat}")
+    for name, ms in rows:
+        print(f"  {name:28}{ms:10.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+"""
+Radius and map-viewport queries: the grid index against computing a distance for every listing.
+
+    python benchmarks/spatial.py [--count 50000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spatial
+from models import Listing
+from listing_memory import make_listing
+from top_k import FakeStore
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    records = []
+    for i in range(args.count):
+        listing = make_listing(i, rng)
+        listing["latitude"] = 40.58 + rng.uniform(-0.5, 0.5) # A metro area around Fort Collins
+        listing["longitude"] = -105.08 + rng.uniform(-0.5, 0.5)
+        records.append(Listing.from_dict(listing))
+
+    store = FakeStore(records)
+    index = spatial.SpatialIndex()
+    lat, lon = 40.585, -105.084
+
+    def scan_radius(miles):
+        return [l for l in records if spatial.haversine_miles(lat, lon, l["latitude"], l["longitude"]) <= miles]
+
+    def scan_box(south, west, north, east):
+        return [l for l in records if south <= l["latitude"] <= north and west <= l["longitude"] <= east]
+
+    viewport = (40.55, -105.12, 40.62, -105.04)
+    rows = [
+        ("build index", best_of(1, lambda: index.sync(records, store))),
+        ("radius 1 mi: scan", best_of(args.repeat, lambda: scan_radius(1))),
+        ("radius 1 mi: index", best_of(args.repeat, lambda: index.within_radius(lat, lon, 1))),
+        ("radius 10 mi: scan", best_of(args.repeat, lambda: scan_radius(10))),
+        ("radius 10 mi: index", best_of(args.repeat, lambda: index.within_radius(lat, lon, 10))),
+        ("viewport: scan", best_of(args.repeat, lambda: scan_box(*viewport))),
+        ("viewport: index", best_of(args.repeat, lambda: index.within_box(*viewport))),
+    ]
+
+    print(f"{args.count} listings, best of {args.repeat} ({len(index.within_radius(lat, lon, 1))} within 1 mi, "
+          f"{len(index.within_box(*viewport))} in the viewport)")
+    for name, ms in rows:
+        print(f"  {name:28}{ms:10.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+"""
+Time-to-first-byte and peak memory of the /listings body: building the whole JSON document
+(as jsonify did) versus streaming it in chunks (JSON array and NDJSON).
+
+    python benchmarks/streaming.py [--count 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+import config
+from models import Listing
+from listing_memory import make_listing
+
+def measure(body):
+    """Consumes a body iterator. Returns (ms to first chunk, total ms, peak traced KB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    for _ in body():
+        if first is None:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first * 1000, total * 1000, peak / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    records = [Listing.from_dict(make_listing(i, rng)) for i in range(args.count)]
+
+    bodies = [
+        ("whole document", lambda: [codec.dumps(records)]),
+        ("streamed array", lambda: codec.iter_json_array(records, config.STREAM_CHUNK_BYTES)),
+        ("streamed ndjson", lambda: codec.iter_ndjson(records, config.STREAM_CHUNK_BYTES)),
+    ]
+    print(f"{args.count} listings, {config.STREAM_CHUNK_BYTES // 1024} KB chunks")
+    print(f"{'':18}{'first byte (ms)':>17}{'total (ms)':>12}{'peak (KB)':>12}")
+    for name, body in bodies:
+        first, total, peak = measure(body)
+        print(f"{name:18}{first:17.2f}{total:12.1f}{peak:12.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+"""
+"Best K by score": sorting the whole collection (what /listings did) against a heap selection
+and the maintained score index, including patching the index after a few listings are re-scored.
+
+    python benchmarks/top_k.py [--count 20000] [--k 20] [--repeat 5]
+"""
+
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ranking
+import scoring
+from models import Listing
+from listing_memory import make_listing
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+class FakeStore:
+    """Just enough of ListingStore for ScoreIndex.sync: a version token and a change log."""
+
+    def __init__(self, listings_data):
+        from state import ChangeLog
+        self.changes = ChangeLog()
+        self.version = 1
+        self.changes.record(listings_data, self.version)
+
+    def version_token(self):
+        return self.changes.token(self.version)
+
+    def commit(self, listings_data):
+        self.version += 1
+        self.changes.record(listings_data, self.version)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    records = scoring.assign_scores([Listing.from_dict(make_listing(i, rng)) for i in range(args.count)])
+    key = lambda l: l.get("score") if l.get("score") is not None else float("-inf")
+    red = lambda l: l.get("group") == "red"
+
+    store = FakeStore(records)
+    index = ranking.ScoreIndex()
+    index.sync(records, store)
+
+    def rescore_five():
+        """Five listings get new scores; the change log diff (paid by every write anyway) and the index patch."""
+        for i in rng.sample(range(len(records)), 5):
+            listing = records[i].copy()
+            listing["score"] = round(rng.random(), 2)
+            records[i] = listing
+        store.commit(records)
+        index.sync(records, store)
+
+    rows = [
+        ("full sort + slice", best_of(args.repeat, lambda: sorted(records, key=key, reverse=True)[:args.k])),
+        ("heapq.nlargest", best_of(args.repeat, lambda: heapq.nlargest(args.k, records, key=key))),
+        ("score index", best_of(args.repeat, lambda: index.top(args.k))),
+        ("score index, group=red", best_of(args.repeat, lambda: index.top(args.k, red))),
+        ("commit + patch (5 re-scored)", best_of(args.repeat, rescore_five)),
+        ("rebuild index", best_of(args.repeat, lambda: index._rebuild(records))),
+    ]
+
+    print(f"{args.count} listings, top {args.k}, best of {args.repeat}")
+    for name, ms in rows:
+        print(f"  {name:28}{ms:10.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import json
+import re
+
+from images import IMAGE_URL_PREFIX
+from models import Listing # Typed record; models.FIELDS is the schema (field -> converter)
+
+# orjson is optional: it is several times faster than the json module, which is used without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# --- Listing codec ---
+# One encoder/decoder for listings.json and for API responses. Decoding validates each
+# entry against the Listing schema and builds the typed record in the same pass; encoding
+# is compact by default, with an indented mode for a human-readable listings file.
+
+class DecodeError(ValueError):
+    """The data is not valid JSON, or not a JSON array of listings."""
+
+def _default(obj):
+    """Serializes types JSON doesn't know about: Listing records (and sets, as lists)."""
+    if isinstance(obj, Listing):
+        return obj.to_dict()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+def dumps(obj, pretty=False):
+    """Encodes obj (which may contain Listing records) to UTF-8 JSON bytes."""
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    if pretty:
+        return json.dumps(obj, default=_default, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def loads(data):
+    """Decodes JSON bytes or text. Raises DecodeError on malformed input."""
+    try:
+        return orjson.loads(data) if orjson else json.loads(data)
+    except ValueError as e: # orjson.JSONDecodeError and json.JSONDecodeError are both ValueErrors
+        raise DecodeError(str(e)) from None
+
+def _normalize_images(listing):
+    """Ensures 'image' is a list of valid image references (stored-image URLs or data URIs)."""
+    if 'image' not in listing or not isinstance(listing['image'], list):
+        if 'image' in listing and isinstance(listing['image'], str):
+            # Convert old raw Base64 string to a list containing a data URI
+            if listing['image'].startswith("data:"):
+                listing['image'] = [listing['image']]
+            else:
+                print(f"Converting old raw Base64 image for listing {listing.get('id')} to Data URI (assuming JPEG).")
+                listing['image'] = [f"data:image/jpeg;base64,{listing['image']}"]
+        else:
+            print(f"Warning: Listing {listing.get('id')} has malformed or missing 'image' field. Resetting to empty list.")
+            listing['image'] = []
+
+    # Validate existing images in the list
+    valid_images = []
+    for img_data in listing['image']:
+        if isinstance(img_data, str) and (img_data.startswith(IMAGE_URL_PREFIX) or (img_data.startswith("data:") and len(img_data) > 50)):
+            valid_images.append(img_data)
+        else:
+            print(f"Warning: Invalid image data found in listing {listing.get('id')}'s image list. Skipping this image.")
+    if len(valid_images) != len(listing['image']):
+        listing.pop('thumbnails', None) # No longer lines up with the images; the UI falls back to full images
+    listing['image'] = valid_images
+
+def decode_listing(entry):
+    """Validates one decoded listing object and builds its typed Listing, or returns None if it isn't one."""
+    if not isinstance(entry, dict):
+        print(f"Warning: Skipping listing entry of type {type(entry).__name__}; expected an object.")
+        return None
+    _normalize_images(entry)
+    return Listing.from_dict(entry)
+
+def decode_listings(data):
+    """
+    Decodes a listings file (JSON bytes or text) into typed Listing records in one pass.
+    Raises DecodeError if it isn't a JSON array; entries that aren't objects are skipped.
+    """
+    decoded = loads(data)
+    if not isinstance(decoded, list):
+        raise DecodeError(f"Expected a JSON array of listings, got {type(decoded).__name__}.")
+    listings = []
+    for entry in decoded:
+        listing = decode_listing(entry)
+        if listing is not None:
+            listings.append(listing)
+    return listings
+
+def encode_listings(listings, pretty=False):
+    """Encodes listings (Listing records or plain dicts) for listings.json."""
+    return dumps(listings, pretty=pretty)
+
+# --- Streaming ---
+# Large responses are sent as a series of chunks, one batch of records at a time, so the
+# first bytes go out immediately and the whole document is never held in memory.
+
+def iter_json_array(records, chunk_bytes):
+    """Yields a JSON array of records as byte chunks of roughly chunk_bytes."""
+    buffer = bytearray(b"[")
+    first = True
+    for record in records:
+        if not first:
+            buffer += b","
+        buffer += dumps(record)
+        first = False
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]"
+    yield bytes(buffer)
+
+def iter_ndjson(records, chunk_bytes):
+    """Yields records as newline-delimited JSON (one record per line), in byte chunks of roughly chunk_bytes."""
+    buffer = bytearray()
+    for record in records:
+        buffer += dumps(record)
+        buffer += b"\n"
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+# --- Streaming decode ---
+# A listings file can be hundreds of MB (inline base64 photos in old files). These read a JSON
+# array one item at a time, so memory holds a single listing rather than the whole document.
+# Strings are skipped with a regex search, not byte by byte, so long base64 values are cheap.
+
+_STRUCTURE = re.compile(rb'[\[\]{}",]')
+_STRING_END = re.compile(rb'["\\]')
+
+def iter_array_items(f, chunk_bytes=1024 * 1024, offset=0):
+    """
+    Yields (item, end offset) for each item of the JSON array in binary file f, decoding one
+    item at a time. end offset is the file position just after the item: pass it back as
+    offset (a position between two items, as returned) to resume from the next one.
+    Raises DecodeError if the data isn't a JSON array or is cut short.
+    """
+    f.seek(offset)
+    buffer = bytearray()
+    base = offset               # file offset of buffer[0]
+    pos = 0                     # scan position in buffer
+    depth = 1 if offset else 0  # 1 = directly inside the array
+    in_string = False
+    item_from = 0               # buffer position where the current item's text starts
+    resumed = bool(offset)      # A resume offset sits just before the separator after an item
+    while True:
+        chunk = f.read(chunk_bytes)
+        if not chunk:
+            break
+        buffer += chunk
+        while True:
+            if in_string:
+                match = _STRING_END.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                if match.group() == b"\\":
+                    if match.end() >= len(buffer): # The escaped character is in the next chunk
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                in_string = False
+                pos = match.end()
+                continue
+            match = _STRUCTURE.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            char = match.group()
+            pos = match.end()
+            if depth == 0:
+                if char != b"[" or buffer[:match.start()].strip():
+                    raise DecodeError("Expected a JSON array of listings.")
+                depth = 1
+                item_from = pos
+            elif char == b'"':
+                in_string = True
+            elif char in b"[{":
+                depth += 1
+            elif char in b"]}" and depth > 1:
+                depth -= 1
+            elif depth == 1 and char in b",]": # End of an item (or of the array)
+                text = bytes(buffer[item_from:match.start()]).strip()
+                if text:
+                    yield loads(text), base + match.start()
+                elif char == b"," and not resumed:
+                    raise DecodeError(f"Empty array item at byte {base + match.start()}.")
+                resumed = False
+                if char == b"]":
+                    return
+                item_from = pos
+        # Drop what has been consumed; keep the current item's text
+        del buffer[:item_from]
+        base += item_from
+        pos -= item_from
+        item_from = 0
+    raise DecodeError("Unexpected end of data: the JSON array is incomplete.")
+
+def iter_listings(f, chunk_bytes=1024 * 1024, offset=0):
+    """Like iter_array_items, but yields (Listing, end offset), validated as decode_listings does (non-objects skipped)."""
+    for entry, end in iter_array_items(f, chunk_bytes, offset):
+        listing = decode_listing(entry)
+        if listing is not None:
+            yield listing, end
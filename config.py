@@ -6,9 +6,23 @@ import os
 
 # --- File Paths ---
 LISTINGS_FILE = "listings.json"
+PRETTY_LISTINGS_FILE = False # True writes listings.json indented for reading/diffing by hand (slower, larger)
 GOOGLE_API_KEY_FILE = "googleapi.txt"
+PROFILES_FILE = "profiles.json" # Named score weight profiles and which one is active
+DATABASE_FILE = "listings.db" # SQLite target of the listings.json migration (see migrate.py)
+ARCHIVE_FILE = "archive.json" # Archived listings, kept out of the live set (see archive.py)
+ARCHIVE_META_FILE = "archive.meta.json" # Highest id ever archived, so new ids avoid archived ones without loading the archive
+
+# --- API responses ---
+STREAM_CHUNK_BYTES = 64 * 1024 # /listings is streamed in chunks of about this size
+MAX_BATCH_OPERATIONS = 500 # Largest list of operations accepted by /listings/batch
+EXPORT_BATCH_ROWS = 5000 # Rows per Parquet row group / Arrow record batch in /export
+SEARCH_RESULT_LIMIT = 200 # Default cap on /search results
+SPATIAL_CELL_DEGREES = 0.02 # Grid cell size of the spatial index (about 1.4 miles north-south)
+DEFAULT_RADIUS_MILES = 5 # /listings?near= radius when none is given
 
 # --- Scoring Weights ---
+# The active profile's weights (see profiles.py); these are the defaults without a profiles.json
 SCORE_WEIGHTS = {
     "rent": 0.3,
     "sqft": 0.2,
@@ -17,6 +31,58 @@ SCORE_WEIGHTS = {
     "distance": 0.1
 }
 
+# --- Images ---
+IMAGE_DIR = "images" # Content-addressed store for listing photos and thumbnails
+IMAGE_FORMAT = "WEBP" # Or "AVIF" with a Pillow build that supports it
+IMAGE_QUALITY = 80
+IMAGE_MAX_DIMENSION = 1600 # Longest side of stored full-size photos, in pixels
+THUMBNAIL_MAX_DIMENSION = 360 # Longest side of card thumbnails, in pixels
+MAX_GALLERY_IMAGES = 12 # Gallery photos fetched per scraped listing
+IMAGE_FETCH_WORKERS = 6 # Concurrent gallery downloads
+IMAGE_GC_GRACE_SECONDS = 3600 # Unreferenced photos used more recently than this are kept (a listing may be about to save them)
+PHASH_DUPLICATE_DISTANCE = 4 # Max differing bits for two photos to count as the same picture
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024 # Largest photo accepted by /upload_image
+
+# --- listings.json -> listings.db migration (migrate.py) ---
+MIGRATION_BATCH_SIZE = 200 # Listings written per transaction (and per resume checkpoint)
+MIGRATION_CHUNK_BYTES = 1024 * 1024 # listings.json is read in chunks of this size
+
+# --- Batch import of saved listing pages (importer.py) ---
+IMPORT_WORKERS = None # Parser processes (None: one per CPU)
+IMPORT_ENRICH_WORKERS = 4 # Pages whose gallery and distance are fetched at once
+MAX_IMPORT_PAGE_BYTES = 20 * 1024 * 1024 # Larger saved pages are reported as failures
+MAX_IMPORT_BYTES = 500 * 1024 * 1024 # Largest upload accepted by /import_html and /import
+IMPORT_BATCH_ROWS = 1000 # Rows applied per write transaction by /import
+MAX_IMPORT_ERRORS = 1000 # Per-row errors listed in an /import report (the rest are only counted)
+
+# --- Scheduled listing refresh (refresh.py) ---
+REFRESH_ENABLED = False # Run the refresh scheduler in the server process (enable it in one process only)
+REFRESH_INTERVAL_HOURS = 24 # How often each listing is re-fetched
+REFRESH_JITTER = 0.2 # Each listing's interval varies by up to this fraction, to spread fetches out
+REFRESH_RETRY_MINUTES = 60 # Delay before retrying a listing whose refresh failed
+REFRESH_HOST_MIN_INTERVAL = 15 # Minimum seconds between refresh requests to the same host
+REFRESH_BATCH_SIZE = 10 # Listings fetched per write (and re-score)
+REFRESH_FETCH_WORKERS = 4 # Hosts fetched from at once (each host's requests stay sequential)
+REFRESH_POLL_SECONDS = 300 # How often the scheduler looks for listings that came due
+REFRESH_SKIP_GROUPS = () # Groups that are never refreshed
+REFRESH_HISTORY_LIMIT = 200 # Price/availability points kept per listing
+
+# --- Archive policy (archive.py; applied by POST /archive {"auto": true} and "flask archive") ---
+ARCHIVE_GROUPS = () # Groups to archive, e.g. the colour used for rejected listings
+ARCHIVE_OFF_MARKET = True # Archive listings a refresh found off the market
+ARCHIVE_AFTER_DAYS = None # Archive listings added more than this many days ago, unless applied to (None: never)
+
+# --- Outbound HTTP (shared client in http_client.py) ---
+HTTP_CONNECT_TIMEOUT = 3.05 # Seconds to establish a connection
+HTTP_READ_TIMEOUT = 10 # Seconds to wait for response data
+HTTP_MAX_RETRIES = 2 # Retries for idempotent requests on connection errors, timeouts, 429 and 5xx
+HTTP_BACKOFF_BASE = 0.5 # Seconds; retry delays are full-jitter exponential from this base
+HTTP_BACKOFF_MAX = 8 # Longest single retry delay, in seconds
+HTTP_POOL_HOSTS = 10 # Number of per-host connection pools kept alive
+HTTP_POOL_MAXSIZE = 10 # Keep-alive connections per host
+HTTP_BREAKER_THRESHOLD = 5 # Consecutive failures before a host's circuit opens
+HTTP_BREAKER_COOLDOWN = 30 # Seconds an open circuit rejects requests before a trial request
+
 # --- Google Maps API Key ---
 Maps_API_KEY = None
 try:
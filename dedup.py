@@ -0,0 +1,183 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import re
+from difflib import SequenceMatcher
+from urllib.parse import urlsplit
+
+# --- Canonical listing keys ---
+# A listing is identified by its zpid (from the Zillow URL) and by a USPS-style
+# normalized address, so "123 Main St, Apt 2" and "123 Main Street #2" match.
+
+_ZPID_PATTERN = re.compile(r'(\d+)_zpid', re.IGNORECASE)
+_ZIP_PATTERN = re.compile(r'^\d{5}(-\d{4})?$')
+
+# USPS Publication 28 street suffix abbreviations (the common ones)
+STREET_SUFFIXES = {
+    "ALLEY": "ALY", "AVENUE": "AVE", "AV": "AVE", "BOULEVARD": "BLVD", "CIRCLE": "CIR",
+    "COURT": "CT", "COVE": "CV", "CROSSING": "XING", "DRIVE": "DR", "EXPRESSWAY": "EXPY",
+    "HIGHWAY": "HWY", "LANE": "LN", "LOOP": "LOOP", "PARKWAY": "PKWY", "PLACE": "PL",
+    "PLAZA": "PLZ", "POINT": "PT", "ROAD": "RD", "SQUARE": "SQ", "STREET": "ST",
+    "STR": "ST", "TERRACE": "TER", "TRAIL": "TRL", "WAY": "WAY",
+}
+DIRECTIONALS = {
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+    "NORTHEAST": "NE", "NORTHWEST": "NW", "SOUTHEAST": "SE", "SOUTHWEST": "SW",
+}
+# Secondary unit designators all collapse to "#" so "Apt 2", "Unit 2" and "#2" compare equal
+UNIT_DESIGNATORS = {"APARTMENT", "APT", "UNIT", "SUITE", "STE", "NUMBER", "NO", "#"}
+
+NEAR_DUPLICATE_THRESHOLD = 0.9 # SequenceMatcher ratio above which two addresses are "the same place"
+
+def extract_zpid(url):
+    """Extracts the Zillow property id from a listing URL (e.g. '.../13374246_zpid/'), or None."""
+    if not url:
+        return None
+    match = _ZPID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+def listing_identity(url):
+    """
+    Returns a canonical identity key for a listing URL.
+    Uses the zpid when the URL has one, otherwise the URL without query string, fragment or trailing slash.
+    """
+    zpid = extract_zpid(url)
+    if zpid:
+        return f"zpid:{zpid}"
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    return f"url:{parts.netloc.lower()}{parts.path.rstrip('/')}"
+
+def normalize_address(address):
+    """
+    Normalizes an address USPS-style: upper case, no punctuation, abbreviated suffixes
+    and directionals, and unit designators collapsed to '#<unit>'.
+    Returns None for empty or placeholder addresses.
+    """
+    if not address or not isinstance(address, str) or address == "Address not found":
+        return None
+    # Split '#2' into '# 2' and drop everything that isn't a word character, '#', '/' or '-'
+    cleaned = re.sub(r'#', ' # ', address.upper())
+    cleaned = re.sub(r'[^\w#/\- ]', ' ', cleaned)
+    tokens = cleaned.split()
+
+    normalized = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in UNIT_DESIGNATORS and i + 1 < len(tokens):
+            # Skip a doubled designator like "Apt #2"
+            j = i + 1
+            while j < len(tokens) - 1 and tokens[j] in UNIT_DESIGNATORS:
+                j += 1
+            normalized.append(f"#{tokens[j]}")
+            i = j + 1
+            continue
+        token = STREET_SUFFIXES.get(token, token)
+        token = DIRECTIONALS.get(token, token)
+        normalized.append(token)
+        i += 1
+    return " ".join(normalized) if normalized else None
+
+def blocking_key(normalized_address):
+    """
+    Returns the (ZIP, street number) block for a normalized address.
+    Near-duplicate comparison only happens inside a block, which keeps it sub-quadratic.
+    """
+    if not normalized_address:
+        return None
+    tokens = normalized_address.split()
+    zip_code = next((t[:5] for t in reversed(tokens) if _ZIP_PATTERN.match(t)), None)
+    street_number = tokens[0] if tokens[0][:1].isdigit() else None
+    if zip_code is None and street_number is None:
+        return None
+    return (zip_code, street_number)
+
+def _units(normalized_address):
+    """Returns the set of '#<unit>' tokens in a normalized address."""
+    return {t for t in normalized_address.split() if t.startswith("#")}
+
+class ListingIndex:
+    """
+    Dedup index over the listings: O(1) exact lookups by zpid/URL identity and by
+    normalized address, plus fuzzy matching restricted to the address's block.
+    Stores listing ids, not listing dicts, so re-scored copies don't go stale.
+    """
+
+    def __init__(self):
+        self.by_identity = {}  # listing_identity(url) -> id
+        self.by_address = {}   # normalized address -> id
+        self.blocks = {}       # blocking key -> {id: normalized address}
+        self._keys = {}        # id -> (identity, normalized address, block)
+
+    def rebuild(self, listings_data):
+        """Rebuilds the whole index from a list of listings."""
+        self.by_identity.clear()
+        self.by_address.clear()
+        self.blocks.clear()
+        self._keys.clear()
+        for listing in listings_data:
+            self.add(listing)
+
+    def add(self, listing):
+        """Indexes a single listing (re-indexing it if its id is already present)."""
+        listing_id = listing.get("id")
+        if listing_id in self._keys:
+            self.remove(listing_id)
+        identity = listing_identity(listing.get("url"))
+        address = normalize_address(listing.get("address"))
+        block = blocking_key(address)
+        if identity:
+            self.by_identity[identity] = listing_id
+        if address:
+            self.by_address[address] = listing_id
+        if block:
+            self.blocks.setdefault(block, {})[listing_id] = address
+        self._keys[listing_id] = (identity, address, block)
+
+    def remove(self, listing_id):
+        """Drops a listing from the index."""
+        keys = self._keys.pop(listing_id, None)
+        if not keys:
+            return
+        identity, address, block = keys
+        if identity and self.by_identity.get(identity) == listing_id:
+            del self.by_identity[identity]
+        if address and self.by_address.get(address) == listing_id:
+            del self.by_address[address]
+        if block and block in self.blocks:
+            self.blocks[block].pop(listing_id, None)
+            if not self.blocks[block]:
+                del self.blocks[block]
+
+    def find_by_url(self, url):
+        """Returns the id of the listing with the same zpid/URL identity, or None."""
+        identity = listing_identity(url)
+        return self.by_identity.get(identity) if identity else None
+
+    def find_by_address(self, address):
+        """Returns the id of the listing with the same normalized address, or None."""
+        normalized = normalize_address(address)
+        return self.by_address.get(normalized) if normalized else None
+
+    def find_near_duplicate(self, address, threshold=NEAR_DUPLICATE_THRESHOLD):
+        """
+        Returns (id, similarity) for the most similar listing in the same block whose
+        similarity is at least threshold, or None.
+        """
+        normalized = normalize_address(address)
+        block = blocking_key(normalized)
+        if not block:
+            return None
+        units = _units(normalized)
+        best = None
+        for listing_id, candidate in self.blocks.get(block, {}).items():
+            candidate_units = _units(candidate)
+            if units and candidate_units and units != candidate_units:
+                continue # Different apartments in the same building are not duplicates
+            ratio = SequenceMatcher(None, normalized, candidate).ratio()
+            if ratio >= threshold and (best is None or ratio > best[1]):
+                best = (listing_id, ratio)
+        return best
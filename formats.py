@@ -0,0 +1,211 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import csv
+import io
+import json
+import os
+
+import codec # NDJSON encoding and JSON decoding
+import config # STREAM_CHUNK_BYTES, EXPORT_BATCH_ROWS
+import scoring # Fields recomputed on import
+from models import FIELDS, to_bool, to_count, to_float, to_id, to_int, to_latitude, to_list, to_longitude, to_measure, to_miles, to_money
+
+# --- Listing export and bulk import: CSV, NDJSON, Parquet and Arrow ---
+# Exports are generators of byte chunks over the listings, so a response or file is written
+# as it is produced and never held whole. Imports read rows one at a time. Parquet and Arrow
+# need pyarrow, which is optional and only imported when one of them is asked for.
+# List fields (image, thumbnails, price_history) are JSON text in CSV, Parquet and Arrow.
+
+FORMATS = ("csv", "ndjson", "parquet", "arrow")
+MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet", ".arrow": "arrow"}
+
+LIST_FIELDS = frozenset(name for name, converter in FIELDS.items() if converter is to_list)
+# Not taken from imported rows: recomputed from the other fields
+COMPUTED_FIELDS = frozenset(scoring.DERIVED_FIELDS) | {"score"}
+
+def format_for(path, requested=None):
+    """The format to use for a file: the requested one, or guessed from its extension. Raises ValueError."""
+    name = requested or EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if name not in FORMATS:
+        raise ValueError(f"Unknown format {name or os.path.splitext(path)[1]!r}; use one of {', '.join(FORMATS)}.")
+    return name
+
+def select_fields(names=None):
+    """Fields to export from a comma-separated string (or list), in the order given. All of them by default. Raises ValueError."""
+    if not names:
+        return list(FIELDS)
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(",") if name.strip()]
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}.")
+    return list(dict.fromkeys(names))
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Parquet and Arrow need pyarrow (pip install pyarrow).") from None
+    return pyarrow
+
+# --- Export ---
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+def iter_csv(listings, fields, chunk_bytes=None):
+    """Yields listings as CSV (a header row, then one row each) in byte chunks."""
+    chunk_bytes = chunk_bytes or config.STREAM_CHUNK_BYTES
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for listing in listings:
+        writer.writerow([_csv_value(listing.get(name)) for name in fields])
+        if buffer.tell() >= chunk_bytes:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+def iter_ndjson(listings, fields, chunk_bytes=None):
+    """Yields listings as NDJSON objects with just the selected fields, in byte chunks."""
+    records = ({name: listing.get(name) for name in fields} for listing in listings)
+    return codec.iter_ndjson(records, chunk_bytes or config.STREAM_CHUNK_BYTES)
+
+_ARROW_TYPES = {
+    to_money: "float64", to_float: "float64", to_measure: "float64", to_miles: "float64",
+    to_latitude: "float64", to_longitude: "float64",
+    to_count: "int64", to_int: "int64", to_id: "int64", to_bool: "bool_",
+}
+
+class _ChunkSink:
+    """A write-only file object that collects what pyarrow writes, to be yielded as chunks."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_arrow(listings, fields, parquet=True):
+    """
+    Yields listings as a Parquet file (or an Arrow IPC stream) in byte chunks, one row group /
+    record batch of EXPORT_BATCH_ROWS listings at a time. Raises ValueError without pyarrow.
+    """
+    pa = _pyarrow()
+    schema = pa.schema([(name, getattr(pa, _ARROW_TYPES.get(FIELDS[name], "string"))()) for name in fields])
+    sink = _ChunkSink()
+    writer = pa.parquet.ParquetWriter(sink, schema) if parquet else pa.ipc.new_stream(sink, schema)
+
+    def write(rows):
+        columns = {name: [json.dumps(value) if isinstance(value, list) else value
+                          for value in (row.get(name) for row in rows)] for name in fields}
+        writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+
+    rows = []
+    for listing in listings:
+        rows.append(listing)
+        if len(rows) >= config.EXPORT_BATCH_ROWS:
+            write(rows)
+            rows = []
+            data = sink.drain()
+            if data:
+                yield data
+    if rows:
+        write(rows)
+    writer.close()
+    yield sink.drain()
+
+def export(listings, fmt, fields):
+    """Byte chunks of listings in a format (see FORMATS) with the selected fields."""
+    if fmt == "csv":
+        return iter_csv(listings, fields)
+    if fmt == "ndjson":
+        return iter_ndjson(listings, fields)
+    _pyarrow() # Fail before the response starts, not halfway through it
+    return iter_arrow(listings, fields, parquet=fmt == "parquet")
+
+# --- Import ---
+
+def iter_rows(path, fmt):
+    """Yields the rows of an exported file (CSV, NDJSON, Parquet or Arrow) as dicts, one at a time."""
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+    elif fmt == "ndjson":
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield codec.loads(line)
+                    except codec.DecodeError:
+                        yield None # Reported by clean_row, without stopping the import
+    else:
+        pa = _pyarrow()
+        if fmt == "parquet":
+            batches = pa.parquet.ParquetFile(path).iter_batches(batch_size=config.EXPORT_BATCH_ROWS)
+            for batch in batches:
+                yield from batch.to_pylist()
+        else:
+            with pa.OSFile(path, "rb") as f:
+                for batch in pa.ipc.open_stream(f):
+                    yield from batch.to_pylist()
+
+def clean_row(row):
+    """
+    The importable fields of a row: known fields with a value, list fields decoded from JSON
+    text, computed fields (cost fields, score) left out. Raises ValueError for a bad row.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("Row is not a JSON object.")
+    fields = {}
+    for name, value in row.items():
+        if name not in FIELDS or name in COMPUTED_FIELDS or value is None or value == "":
+            continue
+        if name in LIST_FIELDS and isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                raise ValueError(f"'{name}' is not a JSON list.") from None
+        fields[name] = value
+    if not fields:
+        raise ValueError("Row has no listing fields.")
+    return fields
@@ -0,0 +1,150 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+
+# --- Shared outbound HTTP client ---
+# Every network call (Google Maps, gallery images, listing refreshes) goes through this
+# module: one keep-alive session with a connection pool per host, connect/read timeouts,
+# bounded retries with jittered backoff, a per-host circuit breaker and per-host counters.
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised without touching the network when a host's circuit breaker is open."""
+
+_session = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_hosts = {} # host -> counters and breaker state
+
+def _get_session():
+    """Returns the process-wide session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=config.HTTP_POOL_HOSTS, pool_maxsize=config.HTTP_POOL_MAXSIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+    return _session
+
+def _host_state(host):
+    """Returns the (locked-by-caller) state record for a host."""
+    state = _hosts.get(host)
+    if state is None:
+        state = _hosts[host] = {
+            "requests": 0, "errors": 0, "retries": 0, "rejected": 0,
+            "total_latency": 0.0, "max_latency": 0.0, "last_status": None,
+            "consecutive_failures": 0, "circuit": "closed", "opened_at": 0.0,
+        }
+    return state
+
+def _before_attempt(host):
+    """Applies the circuit breaker. Raises CircuitOpenError if the host is cooling down."""
+    with _stats_lock:
+        state = _host_state(host)
+        if state["circuit"] == "open":
+            if time.monotonic() - state["opened_at"] < config.HTTP_BREAKER_COOLDOWN:
+                state["rejected"] += 1
+                raise CircuitOpenError(f"Circuit open for {host}; not sending request.")
+            state["circuit"] = "half-open" # Let one trial request through
+        elif state["circuit"] == "half-open":
+            state["rejected"] += 1
+            raise CircuitOpenError(f"Circuit half-open for {host}; a trial request is already in flight.")
+
+def _record(host, latency, status=None, failed=False):
+    """Updates a host's counters and breaker state after an attempt."""
+    with _stats_lock:
+        state = _host_state(host)
+        state["requests"] += 1
+        state["total_latency"] += latency
+        state["max_latency"] = max(state["max_latency"], latency)
+        state["last_status"] = status
+        if failed:
+            state["errors"] += 1
+            state["consecutive_failures"] += 1
+            if state["circuit"] == "half-open" or state["consecutive_failures"] >= config.HTTP_BREAKER_THRESHOLD:
+                if state["circuit"] != "open":
+                    print(f"Circuit opened for {host} after {state['consecutive_failures']} consecutive failures.")
+                state["circuit"] = "open"
+                state["opened_at"] = time.monotonic()
+        else:
+            state["consecutive_failures"] = 0
+            state["circuit"] = "closed"
+
+def _backoff(attempt, response=None):
+    """Sleeps before a retry: full-jitter exponential backoff, honouring a numeric Retry-After."""
+    delay = random.uniform(0, min(config.HTTP_BACKOFF_MAX, config.HTTP_BACKOFF_BASE * (2 ** attempt)))
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, min(float(retry_after), config.HTTP_BACKOFF_MAX))
+    time.sleep(delay)
+
+def request(method, url, retries=None, **kwargs):
+    """
+    Sends a request through the shared session. Timeouts default to
+    (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT). Idempotent requests are retried on connection
+    errors, timeouts and 429/5xx responses. Raises requests.exceptions.RequestException
+    (including CircuitOpenError) when the request ultimately fails to get a response.
+    """
+    method = method.upper()
+    host = urlsplit(url).netloc.lower()
+    kwargs.setdefault("timeout", (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT))
+    if retries is None:
+        retries = config.HTTP_MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+
+    for attempt in range(retries + 1):
+        _before_attempt(host)
+        start = time.monotonic()
+        response = None
+        try:
+            response = _get_session().request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            _record(host, time.monotonic() - start, failed=True)
+            if attempt >= retries:
+                raise
+            print(f"Request to {host} failed ({e.__class__.__name__}); retrying ({attempt + 1}/{retries}).")
+        except requests.exceptions.RequestException:
+            _record(host, time.monotonic() - start, failed=True) # Not retryable (bad URL, too many redirects, ...)
+            raise
+        else:
+            failed = response.status_code in RETRY_STATUSES
+            _record(host, time.monotonic() - start, response.status_code, failed=failed)
+            if not failed or attempt >= retries:
+                return response
+            print(f"Request to {host} returned {response.status_code}; retrying ({attempt + 1}/{retries}).")
+        with _stats_lock:
+            _host_state(host)["retries"] += 1
+        _backoff(attempt, response)
+
+def get(url, **kwargs):
+    """GET through the shared client. See request()."""
+    return request("GET", url, **kwargs)
+
+def host_stats():
+    """Returns per-host request, error, retry and latency counters plus circuit breaker state."""
+    with _stats_lock:
+        stats = {}
+        for host, state in _hosts.items():
+            stats[host] = {
+                "requests": state["requests"],
+                "errors": state["errors"],
+                "retries": state["retries"],
+                "rejected": state["rejected"],
+                "avg_latency_ms": round(1000 * state["total_latency"] / state["requests"], 1) if state["requests"] else None,
+                "max_latency_ms": round(1000 * state["max_latency"], 1),
+                "last_status": state["last_status"],
+                "circuit": state["circuit"],
+            }
+        return stats
@@ -0,0 +1,325 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import base64
+import binascii
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+# --- Image store ---
+# Photos are stored once on disk under config.IMAGE_DIR, named by their perceptual hash
+# and content hash, and listings keep the URLs ("/images/<name>") instead of inline base64.
+
+IMAGE_URL_PREFIX = "/images/"
+_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp", "image/avif": ".avif"}
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+_pil = None # (Image, ImageOps) once Pillow has been imported, False if it isn't installed
+
+def _load_pil():
+    """
+    Imports Pillow on first use. Pillow is optional: without it images are stored as-is
+    (no resizing, thumbnails or perceptual dedup). Returns (Image, ImageOps) or None.
+    """
+    global _pil
+    if _pil is None:
+        try:
+            from PIL import Image, ImageOps
+            _pil = (Image, ImageOps)
+        except ImportError:
+            _pil = False
+            print("WARNING: Pillow is not installed. Images will be stored without re-encoding or thumbnails.")
+    return _pil or None
+
+def _fetch_one(url):
+    """Downloads a single image. Returns (bytes, content_type) or None on failure."""
+    import requests
+    import http_client # Loaded with the first download, not at server start
+    try:
+        response = http_client.get(url, headers=config.REQUEST_HEADERS)
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', 'application/octet-stream').split(';')[0].strip()
+        return response.content, content_type
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching image {url}: {e}")
+        return None
+
+def fetch_images(urls):
+    """Downloads all image URLs concurrently. Returns a list of (bytes, content_type), in order, skipping failures."""
+    if not urls:
+        return []
+    with ThreadPoolExecutor(max_workers=min(config.IMAGE_FETCH_WORKERS, len(urls))) as executor:
+        results = list(executor.map(_fetch_one, urls))
+    return [result for result in results if result]
+
+def dhash(image, hash_size=8):
+    """Computes a 64-bit difference hash, so re-encoded or resized copies of a photo compare as equal."""
+    small = image.convert("L").resize((hash_size + 1, hash_size))
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+def phash_from_url(image_url):
+    """Recovers the perceptual hash encoded in a stored image's name, or None (legacy or un-hashed images)."""
+    if not isinstance(image_url, str) or not image_url.startswith(IMAGE_URL_PREFIX):
+        return None
+    name = image_url[len(IMAGE_URL_PREFIX):]
+    if "-" not in name:
+        return None
+    try:
+        return int(name.split("-", 1)[0], 16)
+    except ValueError:
+        return None
+
+def is_perceptual_duplicate(phash, known_phashes):
+    """True if phash is within config.PHASH_DUPLICATE_DISTANCE bits of any known hash."""
+    if phash is None:
+        return False
+    return any((phash ^ known).bit_count() <= config.PHASH_DUPLICATE_DISTANCE for known in known_phashes if known is not None)
+
+def _write(name, data):
+    """Writes bytes or a binary file object into the image store (unless it's already there) and returns its URL."""
+    os.makedirs(config.IMAGE_DIR, exist_ok=True)
+    path = os.path.join(config.IMAGE_DIR, name)
+    try:
+        os.utime(path) # Already stored: marking it as just used keeps it out of a concurrent collection
+        return IMAGE_URL_PREFIX + name
+    except FileNotFoundError:
+        pass
+    # A temp file of its own: the same photo may be stored by two threads at once
+    fd, temp_path = tempfile.mkstemp(dir=config.IMAGE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(data, (bytes, bytearray)):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f, UPLOAD_CHUNK_SIZE)
+        os.replace(temp_path, path) # Same content either way, so the last writer winning is fine
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return IMAGE_URL_PREFIX + name
+
+def _encode(image, max_dimension):
+    """Resizes image to fit max_dimension and encodes it in config.IMAGE_FORMAT."""
+    resized = image.copy()
+    resized.thumbnail((max_dimension, max_dimension))
+    buffer = io.BytesIO()
+    resized.save(buffer, format=config.IMAGE_FORMAT, quality=config.IMAGE_QUALITY)
+    return buffer.getvalue()
+
+def store_image(source, content_type=None):
+    """
+    Re-encodes an image (bytes or a binary file object) at a capped resolution, writes it and
+    a card thumbnail to the image store, and returns {"image", "thumbnail", "phash"} or None
+    if the data isn't a readable image or can't be stored.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    content_hash = hashlib.sha256()
+    for chunk in iter(lambda: source.read(1024 * 1024), b""):
+        content_hash.update(chunk)
+    content_hash = content_hash.hexdigest()[:16]
+    source.seek(0)
+
+    pil = _load_pil()
+    if pil is None:
+        extension = _EXTENSIONS.get(content_type, ".img")
+        try:
+            url = _write(f"{content_hash}{extension}", source)
+        except OSError as e:
+            print(f"Could not store image: {e}")
+            return None
+        return {"image": url, "thumbnail": url, "phash": None}
+
+    Image, ImageOps = pil
+    try:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image) # Respect phone camera orientation
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    except Exception as e:
+        print(f"Could not read image data: {e}")
+        return None
+
+    phash = dhash(image)
+    extension = "." + config.IMAGE_FORMAT.lower()
+    name = f"{phash:016x}-{content_hash}"
+    try:
+        image_url = _write(name + extension, _encode(image, config.IMAGE_MAX_DIMENSION))
+        thumbnail_url = _write(f"{name}_thumb{extension}", _encode(image, config.THUMBNAIL_MAX_DIMENSION))
+    except Exception as e: # An IMAGE_FORMAT this Pillow can't write, a full disk, ...
+        print(f"Could not store image: {e}")
+        return None
+    return {"image": image_url, "thumbnail": thumbnail_url, "phash": phash}
+
+def add_to_listing(listing, stored):
+    """
+    Appends a stored image and its thumbnail to a listing, skipping perceptual duplicates
+    of photos it already has. Returns True if the image was added.
+    """
+    if not isinstance(listing.get("image"), list):
+        listing["image"] = []
+    if not isinstance(listing.get("thumbnails"), list) or len(listing["thumbnails"]) != len(listing["image"]):
+        # Legacy listings have no thumbnails; their full image doubles as one
+        listing["thumbnails"] = list(listing["image"])
+
+    if stored["image"] in listing["image"]:
+        return False
+    if is_perceptual_duplicate(stored["phash"], [phash_from_url(url) for url in listing["image"]]):
+        print(f"Skipping image {stored['image']}: perceptual duplicate of an existing photo.")
+        return False
+    listing["image"].append(stored["image"])
+    listing["thumbnails"].append(stored["thumbnail"])
+    return True
+
+def migrate_inline_images(listing):
+    """
+    Moves a listing's inline base64 data-URI images into the image store (re-encoded, with
+    thumbnails). Returns True if the listing changed.
+    """
+    current = listing.get("image")
+    if not isinstance(current, list) or not any(isinstance(i, str) and i.startswith("data:") for i in current):
+        return False
+    migrated = {"image": [], "thumbnails": []}
+    for image_data in current:
+        if not image_data.startswith("data:"):
+            migrated["image"].append(image_data)
+            migrated["thumbnails"].append(image_data)
+            continue
+        header, _, encoded = image_data.partition(",")
+        try:
+            stored = store_image(base64.b64decode(encoded), header[len("data:"):].split(";")[0])
+        except (binascii.Error, ValueError):
+            stored = None
+        if stored:
+            add_to_listing(migrated, stored)
+        else:
+            print(f"Dropping unreadable inline image from listing {listing.get('id')}.")
+    listing["image"], listing["thumbnails"] = migrated["image"], migrated["thumbnails"]
+    return True
+
+def process_gallery(urls):
+    """
+    Downloads gallery photos concurrently, dedups them by content and perceptual hash, and
+    stores re-encoded copies. Returns (image_urls, thumbnail_urls) in gallery order.
+    """
+    gallery = {"image": [], "thumbnails": []}
+    for data, content_type in fetch_images(urls[:config.MAX_GALLERY_IMAGES]):
+        stored = store_image(data, content_type)
+        if stored:
+            add_to_listing(gallery, stored)
+    print(f"Stored {len(gallery['image'])} gallery images out of {len(urls)} found.")
+    return gallery["image"], gallery["thumbnails"]
+
+# --- Garbage collection ---
+# Stored files are shared by content, so a photo is only removed once no live or archived
+# listing refers to it (archived listings keep theirs, to come back with them on a restore).
+# Files used within IMAGE_GC_GRACE_SECONDS are kept: a listing being scraped or imported
+# stores its photos before it is saved.
+
+def referenced_names(listings_data):
+    """Names of the image store files that listings refer to (photos and thumbnails)."""
+    names = set()
+    for listing in listings_data:
+        for field in ("image", "thumbnails"):
+            for url in listing.get(field) or ():
+                if isinstance(url, str) and url.startswith(IMAGE_URL_PREFIX):
+                    names.add(url[len(IMAGE_URL_PREFIX):])
+    return names
+
+def remove_images(names, referenced):
+    """Deletes the named store files that aren't in referenced and weren't used recently. Returns how many were removed."""
+    cutoff = time.time() - config.IMAGE_GC_GRACE_SECONDS
+    removed = 0
+    for name in names:
+        if name in referenced or os.path.basename(name) != name:
+            continue
+        path = os.path.join(config.IMAGE_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+def collect_garbage(referenced):
+    """Deletes every store file no listing refers to (see remove_images), skipping writes in progress. Returns how many were removed."""
+    try:
+        names = [name for name in os.listdir(config.IMAGE_DIR) if not name.endswith((".tmp", ".upload"))]
+    except FileNotFoundError:
+        return 0
+    return remove_images(names, referenced)
+
+# --- Streaming uploads ---
+
+class _UploadRejected(Exception):
+    """Internal signal used by receive_upload to stop reading a bad upload."""
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def sniff_image_type(header):
+    """Identifies an image from its leading bytes. Returns its MIME type, or None if it isn't a supported image."""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    if header[4:8] == b"ftyp" and header[8:12] in (b"avif", b"avis"):
+        return "image/avif"
+    return None
+
+def receive_upload(stream, max_bytes):
+    """
+    Copies an upload stream to a temporary file in the image store in fixed-size chunks,
+    enforcing max_bytes and checking the content is really an image (by its magic bytes,
+    not the client's Content-Type).
+    Returns {"path", "content_type", "size"} or {"error", "status"}. The caller removes the file.
+    """
+    os.makedirs(config.IMAGE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=config.IMAGE_DIR, suffix=".upload")
+    size = 0
+    header = b""
+    content_type = None
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _UploadRejected(f"Image is larger than the {max_bytes // (1024 * 1024)} MB limit.", 413)
+                if content_type is None:
+                    header += chunk[:16]
+                    if len(header) >= 12:
+                        content_type = sniff_image_type(header)
+                        if content_type is None:
+                            raise _UploadRejected("Uploaded data is not a supported image (JPEG, PNG, GIF, WebP or AVIF).", 415)
+                f.write(chunk)
+        if content_type is None:
+            raise _UploadRejected("Uploaded data is empty or too short to be an image.", 400)
+        return {"path": temp_path, "content_type": content_type, "size": size}
+    except _UploadRejected as e:
+        os.remove(temp_path)
+        return {"error": e.message, "status": e.status}
+    except BaseException:
+        os.remove(temp_path)
+        raise
@@ -0,0 +1,182 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import multiprocessing
+import os
+import re
+import tarfile
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import config # IMPORT_* settings
+import parsing # Listing page parsing and enrichment
+
+# --- Batch import of saved listing pages ---
+# Saving a listing page from the browser is the reliable way past bot detection. This reads a
+# directory (or a .zip/.tar archive) of saved pages, parses them in worker processes (the
+# BeautifulSoup parse is CPU-bound, so threads wouldn't help), then fetches galleries and
+# distances for the parsed pages on a thread pool. Adding them (dedup, derived fields and
+# one re-score) is left to the caller, in a single write.
+
+PAGE_EXTENSIONS = (".html", ".htm")
+IMPORT_CHUNK_SIZE = 1024 * 1024 # Uploads are copied to disk in chunks of this size
+
+_CANONICAL = re.compile(r'<link[^>]+rel=["\']canonical["\'][^>]*>', re.IGNORECASE)
+_OG_URL = re.compile(r'<meta[^>]+property=["\']og:url["\'][^>]*>', re.IGNORECASE)
+_HREF = re.compile(r'(?:href|content)=["\']([^"\']+)["\']', re.IGNORECASE)
+
+def page_url(raw_html):
+    """The listing URL a saved page records (canonical link or og:url), or None."""
+    for pattern in (_CANONICAL, _OG_URL):
+        tag = pattern.search(raw_html)
+        if tag:
+            href = _HREF.search(tag.group(0))
+            if href and href.group(1).startswith("http"):
+                return href.group(1)
+    return None
+
+def _read_limited(f, limit):
+    """f's contents, or None if it holds more than limit bytes (at most limit + 1 are read)."""
+    data = f.read(limit + 1)
+    return data if len(data) <= limit else None
+
+def iter_sources(path):
+    """
+    Yields (name, source) for each saved page under a directory (recursively) or inside a
+    .zip/.tar(.gz) archive. source is a file path, or the page's bytes for archive members,
+    so archives are read one member at a time. Members larger than MAX_IMPORT_PAGE_BYTES
+    (by their header, or once decompressed) are never read whole: their source is None.
+    """
+    limit = config.MAX_IMPORT_PAGE_BYTES
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                if name.lower().endswith(PAGE_EXTENSIONS):
+                    full_path = os.path.join(root, name)
+                    yield os.path.relpath(full_path, path), full_path
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(PAGE_EXTENSIONS):
+                    if info.file_size > limit:
+                        yield info.filename, None
+                        continue
+                    with archive.open(info) as member:
+                        yield info.filename, _read_limited(member, limit)
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path) as archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith(PAGE_EXTENSIONS):
+                    if member.size > limit:
+                        yield member.name, None
+                        continue
+                    yield member.name, _read_limited(archive.extractfile(member), limit)
+    else:
+        raise ValueError(f"{path} is not a directory, zip or tar archive.")
+
+def parse_page(name, source):
+    """
+    Parses one saved page without any network calls (runs in a worker process).
+    Returns (name, page dict, None) or (name, None, error message).
+    """
+    try:
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                source = _read_limited(f, config.MAX_IMPORT_PAGE_BYTES)
+        if source is None: # Over MAX_IMPORT_PAGE_BYTES
+            return name, None, "Page is too large."
+        raw_html = source.decode("utf-8", errors="replace")
+        page = parsing.parse_html(raw_html, page_url(raw_html), enrich=False)
+    except Exception as e: # The HTML fallbacks assume Zillow's markup
+        return name, None, f"Could not parse listing details ({e.__class__.__name__}: {e})."
+    if not page.get("address") or page["address"] == "Address not found":
+        return name, None, "No listing details found (not a saved Zillow listing page?)."
+    return name, page, None
+
+def _pool_context():
+    """
+    Workers are started by a fork server (or spawned), never forked from the caller: the web
+    server is multithreaded, and a child forked while another thread holds a lock (the store,
+    the refresh scheduler, the HTTP pool) would wait on it forever.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def parse_pages(sources, workers=None):
+    """
+    Parses (name, source) pairs in a process pool, yielding parse_page results as they finish.
+    Only a few pages per worker are in flight at once, so memory stays bounded for big archives.
+    """
+    workers = workers or config.IMPORT_WORKERS or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        pending = set()
+        for name, source in sources:
+            pending.add(pool.submit(parse_page, name, source))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+def enrich_pages(pages):
+    """
+    Runs parsing.enrich_listing for (name, page) pairs on a thread pool (network-bound).
+    Returns ([(name, listing data)], [(name, error message)]).
+    """
+    def enrich(item):
+        name, page = item
+        try:
+            return name, parsing.enrich_listing(page), None
+        except Exception as e:
+            return name, None, f"{e.__class__.__name__}: {e}"
+
+    enriched, failures = [], []
+    with ThreadPoolExecutor(max_workers=config.IMPORT_ENRICH_WORKERS) as pool:
+        for name, data, error in pool.map(enrich, pages):
+            if error:
+                failures.append((name, error))
+            else:
+                enriched.append((name, data))
+    return enriched, failures
+
+def read_pages(sources, workers=None):
+    """
+    Parses (name, source) pairs. Returns (pages as [(name, page)], failures as [(name, error)]),
+    in no particular order.
+    """
+    pages, failures = [], []
+    for name, page, error in parse_pages(sources, workers):
+        if error:
+            failures.append((name, error))
+        else:
+            pages.append((name, page))
+    return pages, failures
+
+def without_enrichment(page):
+    """A parsed page as listing data without the network-fetched parts (no photos or distance)."""
+    data = dict(page, image=[], thumbnails=[], distance=None)
+    data.pop("image_urls", None)
+    return data
+
+def receive_file(stream, max_bytes):
+    """
+    Copies an upload (an archive of pages, or a file for /import) to a temporary file in
+    chunks, up to max_bytes. Returns its path (the caller removes it). Raises ValueError if
+    it is too large.
+    """
+    fd, temp_path = tempfile.mkstemp(suffix=".import")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: stream.read(IMPORT_CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"Upload is larger than the {max_bytes // (1024 * 1024)} MB limit.")
+                f.write(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
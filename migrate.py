@@ -0,0 +1,139 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import codec # Streaming listings decoder
+import config # DATABASE_FILE and MIGRATION_* settings
+import images # Inline image extraction into the image store
+import scoring # Derived cost fields
+import state # File identity
+from models import FIELDS, to_bool, to_count, to_float, to_id, to_int, to_latitude, to_list, to_longitude, to_measure, to_miles, to_money
+
+# --- Streaming migration of listings.json into listings.db ---
+# Old listings files hold every photo inline as base64, so loading one whole (as
+# load_listings does) takes several times the file size in memory. The migration reads the
+# file one listing at a time (codec.iter_listings), moves inline photos into the image store,
+# and writes listings to SQLite in batches. Each batch is committed together with the file
+# offset it reached, so an interrupted migration resumes from the last committed batch.
+
+TABLE = "listings"
+EXTRA_COLUMN = "extra" # JSON of any keys outside models.FIELDS
+
+_COLUMN_TYPES = {
+    to_money: "REAL", to_float: "REAL", to_measure: "REAL", to_miles: "REAL",
+    to_latitude: "REAL", to_longitude: "REAL",
+    to_count: "INTEGER", to_int: "INTEGER", to_bool: "INTEGER", to_id: "INTEGER",
+}
+_JSON_FIELDS = {name for name, converter in FIELDS.items() if converter is to_list} # image, thumbnails, price_history
+
+def ensure_schema(db):
+    """
+    Creates the listings and progress tables if missing, and adds a column for each Listing
+    field an older listings.db doesn't have yet (its schema has grown the same way).
+    """
+    columns = ",\n            ".join(
+        "id INTEGER PRIMARY KEY AUTOINCREMENT" if name == "id" else f'"{name}" {_COLUMN_TYPES.get(converter, "TEXT")}'
+        for name, converter in FIELDS.items())
+    db.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} (\n            {columns}\n        )")
+    existing = {row[1] for row in db.execute(f"PRAGMA table_info({TABLE})")}
+    for name, converter in list(FIELDS.items()) + [(EXTRA_COLUMN, None)]:
+        if name not in existing:
+            db.execute(f'ALTER TABLE {TABLE} ADD COLUMN "{name}" {_COLUMN_TYPES.get(converter, "TEXT")}')
+    db.execute("""CREATE TABLE IF NOT EXISTS migration_progress (
+            source TEXT PRIMARY KEY,
+            signature TEXT,
+            byte_offset INTEGER,
+            listings INTEGER,
+            images INTEGER,
+            finished INTEGER DEFAULT 0,
+            updated_at TEXT
+        )""")
+    db.commit()
+
+def _row(listing):
+    """Column values for a listing, in FIELDS order followed by the extra column."""
+    values = []
+    for name in FIELDS:
+        value = listing.get(name)
+        if name in _JSON_FIELDS:
+            value = json.dumps(value) if value is not None else None
+        elif type(value) is bool:
+            value = int(value)
+        elif name == "url" and value is None:
+            value = "" # NOT NULL in the original schema
+        values.append(value)
+    extra = getattr(listing, "_extra", None)
+    values.append(json.dumps(extra, default=str) if extra else None)
+    return values
+
+_COLUMNS = ", ".join(f'"{name}"' for name in list(FIELDS) + [EXTRA_COLUMN])
+_INSERT = f"INSERT OR REPLACE INTO {TABLE} ({_COLUMNS}) VALUES ({', '.join('?' * (len(FIELDS) + 1))})"
+
+def _checkpoint(db, rows, source, signature, offset, listings, moved_images, finished=False):
+    """Writes a batch of rows and the progress it reaches in one transaction."""
+    with db: # Commits both, or neither
+        db.executemany(_INSERT, rows)
+        db.execute("INSERT OR REPLACE INTO migration_progress VALUES (?, ?, ?, ?, ?, ?, ?)",
+                   (source, signature, offset, listings, moved_images, int(finished),
+                    datetime.now().isoformat(timespec="seconds")))
+
+def migrate(source=None, database=None, batch_size=None, restart=False):
+    """
+    Copies every listing in a listings file into a listings.db, resuming an interrupted run
+    unless restart is set (or the file changed since). Returns {"listings", "images", "skipped",
+    "resumed_at", "finished"}; skipped counts listings whose id isn't a number.
+    """
+    source = os.path.abspath(source or config.LISTINGS_FILE)
+    database = database or config.DATABASE_FILE
+    batch_size = batch_size or config.MIGRATION_BATCH_SIZE
+    signature = state.file_signature(source)
+    if signature is None:
+        raise FileNotFoundError(source)
+    signature = ":".join(map(str, signature))
+
+    db = sqlite3.connect(database)
+    try:
+        ensure_schema(db)
+        progress = db.execute("SELECT signature, byte_offset, listings, images, finished FROM migration_progress WHERE source = ?",
+                              (source,)).fetchone()
+        offset, migrated, moved_images = 0, 0, 0
+        if progress and not restart:
+            if progress[0] != signature:
+                print(f"{source} changed since the last migration; starting over.")
+            elif progress[4]:
+                print(f"{source} was already migrated ({progress[2]} listings). Use restart to migrate it again.")
+                return {"listings": progress[2], "images": progress[3], "skipped": 0, "resumed_at": progress[1], "finished": True}
+            else:
+                offset, migrated, moved_images = progress[1], progress[2], progress[3]
+                print(f"Resuming migration of {source} at byte {offset} ({migrated} listings done).")
+        resumed_at = offset
+
+        size = os.path.getsize(source)
+        rows, skipped = [], 0
+        with open(source, "rb") as f:
+            for listing, end in codec.iter_listings(f, config.MIGRATION_CHUNK_BYTES, offset):
+                moved_images += sum(1 for i in listing.get("image") or [] if isinstance(i, str) and i.startswith("data:"))
+                images.migrate_inline_images(listing) # Photos go to the image store; the row gets their URLs
+                scoring.update_derived(listing)
+                if isinstance(listing.get("id"), int):
+                    rows.append(_row(listing))
+                else:
+                    skipped += 1
+                    print(f"Skipping listing with non-numeric id {listing.get('id')!r}.")
+                offset = end
+                if len(rows) >= batch_size:
+                    migrated += len(rows)
+                    _checkpoint(db, rows, source, signature, offset, migrated, moved_images)
+                    rows = []
+                    print(f"Migrated {migrated} listings ({offset / max(size, 1):.0%} of {source}).")
+        migrated += len(rows)
+        _checkpoint(db, rows, source, signature, offset, migrated, moved_images, finished=True)
+        print(f"Migration finished: {migrated} listings and {moved_images} inline images written to {database}.")
+        return {"listings": migrated, "images": moved_images, "skipped": skipped, "resumed_at": resumed_at, "finished": True}
+    finally:
+        db.close()
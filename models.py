@@ -0,0 +1,289 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import re
+import sys
+
+# --- Typed listing records ---
+# Listings used to be free-form dicts whose fields changed type over their lifetime
+# ("$1,200" vs 1200.0, "3.4 mi" vs 3.4, -1 for "missing"). A Listing converts every field
+# once, when it is loaded or scraped, so scoring, sorting and the API work on plain numbers.
+# It keeps the dict interface (listing["price"], .get, "x" in listing, ...) so code that
+# handles listings doesn't care which it has, and __slots__ keeps each record small.
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+_MISSING = (None, "", "N/A", "Not Listed")
+
+def to_money(value):
+    """'$1,850/mo', 1850 or '1850.0' -> 1850.0. Missing or unparsable -> None."""
+    if type(value) is float: # Already converted (a record re-loaded from a saved file)
+        return value
+    if value in _MISSING:
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = _NUMBER.search(str(value).replace(",", ""))
+    return float(match.group(0)) if match else None
+
+def to_miles(value):
+    """'3.4 mi', '3.4 miles', '850 ft' or 3.4 -> miles as a float. Missing or unparsable -> None."""
+    if type(value) is float:
+        return value
+    if value in _MISSING:
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    text = str(value).replace(",", "")
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    miles = float(match.group(0))
+    if re.search(r'\bft\b|feet', text, re.IGNORECASE): # Google returns short trips in feet
+        miles = round(miles / 5280, 2)
+    return miles
+
+def to_latitude(value):
+    """Latitude in decimal degrees. Missing, unparsable or outside -90..90 -> None."""
+    number = to_money(value)
+    return number if number is not None and -90 <= number <= 90 else None
+
+def to_longitude(value):
+    """Longitude in decimal degrees. Missing, unparsable or outside -180..180 -> None."""
+    number = to_money(value)
+    return number if number is not None and -180 <= number <= 180 else None
+
+def to_count(value):
+    """Whole-number counts (sqft, bedrooms). The old -1 'missing' marker and junk become None."""
+    if type(value) is int and value >= 0:
+        return value
+    number = to_money(value)
+    return int(number) if number is not None and number >= 0 else None
+
+def to_measure(value):
+    """Non-negative decimals (bathrooms, utilities). -1 and junk become None."""
+    number = to_money(value)
+    return number if number is not None and number >= 0 else None
+
+def to_float(value):
+    """Derived numbers (scores, costs). 'N/A' becomes None."""
+    return to_money(value)
+
+def to_int(value):
+    if type(value) is int:
+        return value
+    number = to_money(value)
+    return int(number) if number is not None else None
+
+def to_bool(value):
+    if value is True or value is False:
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes")
+    return bool(value)
+
+def to_text(value):
+    return value if value is None or isinstance(value, str) else str(value)
+
+def to_tag(value):
+    """Short repeated strings (group names) are interned so every listing shares one copy."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def to_list(value):
+    if isinstance(value, list):
+        return value
+    return list(value) if isinstance(value, tuple) else []
+
+def to_id(value):
+    """Ids are timestamps; keep anything that isn't numeric as-is rather than losing it."""
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value
+
+# Field name -> converter, in the order fields are written to JSON
+FIELDS = {
+    "id": to_id,
+    "url": to_text,
+    "address": to_text,
+    "price": to_money,
+    "square_footage": to_count,
+    "bedrooms": to_count,
+    "bathrooms": to_measure,
+    "date_available": to_text,
+    "distance": to_miles,
+    "latitude": to_latitude,
+    "longitude": to_longitude,
+    "contacted": to_bool,
+    "applied": to_bool,
+    "group": to_tag,
+    "overall_rating": to_int,
+    "roommates": to_int,
+    "utility_estimate": to_measure,
+    "comments": to_text,
+    "description": to_text, # The listing's own write-up, when the page has one (searchable)
+    "image": to_list,
+    "thumbnails": to_list,
+    "cost_per_sqft": to_float,
+    "cost_per_roommate": to_float,
+    "cost_per_occupant": to_float,
+    "score": to_float,
+    "price_history": to_list, # [unix time, price, date_available] at each change seen by a refresh
+    "refreshed_at": to_float, # Unix time of the last successful refresh
+    "next_refresh": to_float, # Unix time the listing is next due for one
+    "content_hash": to_text, # Fingerprint of the page payload at the last refresh
+    "added_at": to_float, # Unix time the listing was added (older listings go by their timestamp id)
+    "archived_at": to_float, # Unix time the listing was moved to the archive (archived listings only)
+}
+
+# Values of these types are stored as-is: the fast path when re-loading a file this codebase wrote.
+# (to_count, to_measure, to_latitude, to_longitude and to_tag still run, to reject -1 and out-of-range values and to intern.)
+_CANONICAL = {
+    to_money: float, to_miles: float, to_float: float,
+    to_int: int, to_bool: bool, to_text: str, to_list: list, to_id: int,
+}
+_FAST = {name: (converter, _CANONICAL.get(converter)) for name, converter in FIELDS.items()}
+
+_UNSET = object()
+
+class Listing:
+    """
+    A listing with typed fields. Fields that were never set are absent ("x" in listing is
+    False, listing.get("x") is None), just like keys missing from a dict. Keys outside
+    FIELDS are kept untyped in a side dict, which is only created when one appears.
+    """
+
+    __slots__ = tuple(FIELDS) + ("_extra",)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a Listing from a loaded or scraped dict (or copies another Listing), converting every field."""
+        if isinstance(data, Listing):
+            return data.copy()
+        listing = cls()
+        for key, value in data.items():
+            field = _FAST.get(key)
+            if field is None:
+                listing[key] = value # Unknown keys are kept as-is
+            elif type(value) is field[1]:
+                setattr(listing, key, value) # Already the right type
+            else:
+                setattr(listing, key, field[0](value))
+        return listing
+
+    def to_dict(self):
+        """Plain dict for JSON: typed fields in FIELDS order, then any extra keys."""
+        data = {name: value for name in FIELDS if (value := getattr(self, name, _UNSET)) is not _UNSET}
+        extra = getattr(self, "_extra", None)
+        if extra:
+            data.update(extra)
+        return data
+
+    # --- dict interface ---
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        try:
+            return self._extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        converter = FIELDS.get(key)
+        if converter is to_float and (value is None or type(value) is float):
+            setattr(self, key, value) # Derived fields re-assigned on every scoring pass
+            return
+        if converter:
+            setattr(self, key, converter(value))
+            return
+        try:
+            self._extra[key] = value
+        except AttributeError:
+            self._extra = {key: value}
+
+    def __delitem__(self, key):
+        if key in FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        else:
+            try:
+                del self._extra[key]
+            except AttributeError:
+                raise KeyError(key) from None
+
+    def __contains__(self, key):
+        if key in FIELDS:
+            return hasattr(self, key)
+        return key in getattr(self, "_extra", ())
+
+    def get(self, key, default=None):
+        if key in FIELDS:
+            return getattr(self, key, default)
+        return getattr(self, "_extra", {}).get(key, default)
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, other=(), **kwargs):
+        items = other.items() if hasattr(other, "items") else other
+        for key, value in items:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def copy(self):
+        """Shallow copy, like dict.copy() (image lists are shared until replaced)."""
+        clone = Listing()
+        for name in FIELDS:
+            value = getattr(self, name, _UNSET)
+            if value is not _UNSET:
+                setattr(clone, name, value)
+        extra = getattr(self, "_extra", None)
+        if extra is not None:
+            clone._extra = dict(extra)
+        return clone
+
+    def __eq__(self, other):
+        if isinstance(other, Listing):
+            # Field by field, without building dicts: the change log compares every record on each write
+            for name in self.__slots__:
+                if getattr(self, name, _UNSET) != getattr(other, name, _UNSET):
+                    return False
+            return True
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None # Mutable, like dict
+
+    def __repr__(self):
+        return f"Listing({self.to_dict()!r})"
@@ -0,0 +1,295 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import json
+import re
+from urllib.parse import quote
+
+import config # Allows access to constants like ORIGIN_ADDRESS, Maps_API_KEY, etc.
+import images # Gallery download, re-encoding and thumbnails
+
+# --- Listing page parsing ---
+# BeautifulSoup and the HTTP client are imported on first use, so importing this module
+# (and the web server) stays cheap until a listing is actually parsed.
+
+_JSON_LD = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+
+def listing_payload(raw_html):
+    """
+    The page's JSON-LD listing data as text (None if it has none), found without building a
+    parse tree. Refreshes hash it to tell whether a listing changed before parsing the page.
+    """
+    blocks = [block.strip() for block in _JSON_LD.findall(raw_html or "")]
+    return "\n".join(blocks) if blocks else None
+
+def parse_html(raw_html, url, enrich=True):
+    """Parses raw Zillow page HTML into a listing dictionary. See parse_zillow_html."""
+    from bs4 import BeautifulSoup
+    return parse_zillow_html(BeautifulSoup(raw_html, "html.parser"), url, enrich=enrich)
+
+def parse_zillow_html(soup, url, enrich=True):
+    """
+    Parses a BeautifulSoup object (Zillow HTML) to extract listing details.
+    Used by scraping.scrape_zillow and parse_html. With enrich=False only the page itself is
+    read (no gallery downloads, distance or geocoding calls): the result has the gallery's
+    image_urls instead of images and no distance, and enrich_listing() completes it later.
+    """
+    listing_data = {}
+
+    # Attempt to parse data from JSON-LD script (preferred method)
+    script_json_ld = soup.find('script', type='application/ld+json')
+    if script_json_ld:
+        try:
+            json_data = json.loads(script_json_ld.string)
+            json_items = [json_data] if isinstance(json_data, dict) else json_data # Handle single object or list of objects
+
+            for item in json_items:
+                if item.get('@type') in ['Product', 'Residence', 'House', 'RealEstateListing']:
+                    # Extract price
+                    price_offer = item.get('offers', {}).get('price')
+                    print(f" PRICE ___ ${price_offer}")
+                    listing_data['price'] = float(price_offer) if price_offer else None
+
+                    # Extract address
+                    address_obj = item.get('address', {})
+                    address_parts = [
+                        address_obj.get('streetAddress'),
+                        address_obj.get('addressLocality'),
+                        address_obj.get('addressRegion'),
+                        address_obj.get('postalCode')
+                    ]
+                    listing_data['address'] = ", ".join(filter(None, address_parts))
+
+                    # Extract bedrooms/bathrooms
+                    rooms_text = item.get('numberOfRooms')
+                    if isinstance(rooms_text, str):
+                        beds_match = re.search(r'(\d+)\s*Bed', rooms_text, re.IGNORECASE)
+                        baths_match = re.search(r'(\d+(\.\d+)?)\s*Bath', rooms_text, re.IGNORECASE)
+                        listing_data['bedrooms'] = int(beds_match.group(1)) if beds_match else -1
+                        listing_data['bathrooms'] = float(baths_match.group(1)) if baths_match else -1
+                    elif isinstance(rooms_text, (int, float)):
+                        listing_data['bedrooms'] = int(rooms_text)
+                    
+                    # Also check direct 'bed' and 'bath' fields if present
+                    if 'bed' in item and isinstance(item['bed'], (int, float)):
+                        listing_data['bedrooms'] = int(item['bed'])
+                    if 'bath' in item and isinstance(item['bath'], (int, float)):
+                        listing_data['bathrooms'] = float(item['bath'])
+
+                    # Extract square footage
+                    floor_size = item.get('floorSize', {})
+                    if isinstance(floor_size, dict):
+                        sqft_val = floor_size.get('value')
+                        sqft_unit = floor_size.get('unitCode')
+                        if sqft_val and sqft_unit == 'SQF':
+                            listing_data['square_footage'] = int(sqft_val)
+                    
+                    # Extract coordinates (for map and radius queries)
+                    geo = item.get('geo')
+                    if isinstance(geo, dict) and geo.get('latitude') is not None and geo.get('longitude') is not None:
+                        listing_data['latitude'] = geo['latitude']
+                        listing_data['longitude'] = geo['longitude']
+
+                    # Extract the listing's description (for search)
+                    if isinstance(item.get('description'), str):
+                        listing_data['description'] = item['description'].strip()
+
+                    # Extract gallery image URLs
+                    image_url_from_json = item.get('image')
+                    if isinstance(image_url_from_json, list) and image_url_from_json:
+                        listing_data['image_urls_for_fetch'] = [u for u in image_url_from_json if isinstance(u, str)]
+                    elif isinstance(image_url_from_json, str):
+                        listing_data['image_urls_for_fetch'] = [image_url_from_json]
+
+                    # If we found sufficient data, break the loop
+                    if listing_data.get('address') and listing_data.get('price'):
+                        break
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON-LD script: {e}")
+        except Exception as e:
+            print(f"Unexpected error processing JSON-LD: {e}")
+
+    # Fallback to direct HTML parsing if JSON-LD fails or is incomplete
+    # Price element attempt 1.
+    if listing_data.get('price') is None:
+        #price_element = soup.find("span", class_="Text-c11n-8-109-3__sc-aiai24-0 sc-lknQiW knxFxJ jMCwlu")
+        # Attempt 2
+      #if not price_element:
+      #    price_element = soup.find("span", class_="Text-c11n-8-109-3__sc-aiai24-0 WduMe").parent
+
+        # Attempt 3
+        inner_span = soup.find('span', class_=['Text-c11n-8-109-3__sc-aiai24-0', 'WduMe'], text="/mo")
+        if inner_span:
+            # Get the parent of this inner span, which is our target outer span
+            outer_span = inner_span.parent
+        
+            # Get only the direct text content of the outer_span
+            # .contents gives you a list of children (tags and NavigableString objects)
+            # Filter for NavigableString (text) and join them
+            direct_text_parts = [
+                str(content) for content in outer_span.contents
+                if isinstance(content, str) and content.strip()
+            ]
+            price_text = "".join(direct_text_parts).strip()
+        
+            print(f"Extracted price: {price_text}") # Output: Extracted price: $1,100
+            match = re.search(r'(\d[\d,.]*\d|\d+)', price_text)
+            if match:
+                listing_data['price'] = float(match.group(1).replace(",", ""))
+            else:
+                listing_data['price'] = None
+        else:
+            print("Inner span not found.")
+        
+    if not listing_data.get('address'):
+        address_element_h2 = soup.find("h2", {"data-test-id": "bdp-building-address"})
+        if address_element_h2:
+            listing_data['address'] = address_element_h2.text.strip()
+        else:
+            address_element_h1 = soup.find("h1", class_="Text-c11n-8-109-3__sc-aiai24-0 cEHZrB")
+            listing_data['address'] = address_element_h1.text.strip() if address_element_h1 else "Address not found"
+
+    if listing_data.get('bedrooms', -1) < 0:
+        bedrooms_element = soup.find("span", string=lambda s: s and "beds" in s.lower())
+        if bedrooms_element:
+            try:
+                beds_text = bedrooms_element.find_previous("span").text.strip()
+                listing_data['bedrooms'] = int(re.search(r'\d+', beds_text).group(0)) if re.search(r'\d+', beds_text) else -1
+            except (AttributeError, ValueError):
+                listing_data['bedrooms'] = -1
+
+    if listing_data.get('bathrooms', -1) < 0:
+        bathrooms_element = soup.find("span", string=lambda s: s and "baths" in s.lower())
+        if bathrooms_element:
+            try:
+                baths_text = bathrooms_element.find_previous("span").text.strip()
+                listing_data['bathrooms'] = float(re.search(r'\d+(\.\d+)?', baths_text).group(0)) if re.search(r'\d+(\.\d+)?', baths_text) else -1
+            except (AttributeError, ValueError):
+                listing_data['bathrooms'] = -1
+    
+    # Attempt 1 sq ft
+    #if listing_data.get('square_footage', -1) < 0:
+     #   sqft_element = soup.find("span", string=lambda s: s and "sqft" in s.lower())
+    # Attempt 2 sq ft
+    if listing_data.get('square_footage', -1) < 0:
+        sqft_element = soup.find_all("span", class_="Text-c11n-8-109-3__sc-aiai24-0 styles__StyledValueText-fshdp-8-106-0__sc-12ivusx-1 cEHZrB bfIPme --medium")[2]
+        if sqft_element:
+            listing_data['square_footage']=float(sqft_element.text)
+            print(f"sqft ___ {sqft_element.text}")
+        else:
+            listing_data['square_footage']=-1
+    # Date Attempt 1
+    if not listing_data.get('date_available'):
+        date_available_element = soup.find("div", string=lambda s: s and "available" in s.lower())
+    # Date Attempt 2
+    if not listing_data.get('date_available'):
+        date_available_element = soup.find("span", class_="Text-c11n-8-109-3__sc-aiai24-0 hdp__sc-1hoxd7t-2 cEHZrB iWQNvU")
+        listing_data['date_available'] = date_available_element.text.strip() if date_available_element else "Not Listed"
+
+    if not listing_data.get('description'):
+        description_element = soup.find("div", {"data-testid": "description"})
+        listing_data['description'] = description_element.get_text(" ", strip=True) if description_element else ""
+
+    if not listing_data.get('image_urls_for_fetch'):
+        gallery = soup.find("div", {"data-testid": "hollywood-gallery-images-tile-list"})
+        image_tags = gallery.find_all("img") if gallery else []
+        listing_data['image_urls_for_fetch'] = [tag["src"] for tag in image_tags if tag.get("src")]
+
+    page = {
+        "price": listing_data.get('price'),
+        "address": listing_data.get('address', "Address not found"),
+        "bedrooms": listing_data.get('bedrooms', -1),
+        "bathrooms": listing_data.get('bathrooms', -1.0),
+        "square_footage": listing_data.get('square_footage', -1),
+        "date_available": listing_data.get('date_available', "Not Listed"),
+        "latitude": listing_data.get('latitude'),
+        "longitude": listing_data.get('longitude'),
+        "description": listing_data.get('description', ""),
+        "image_urls": list(dict.fromkeys(listing_data.get('image_urls_for_fetch') or [])), # Drop repeated URLs, keep order
+        "url": url
+    }
+    return enrich_listing(page) if enrich else page
+
+def enrich_listing(page):
+    """
+    Completes a listing read by parse_zillow_html(enrich=False) with its network-fetched parts:
+    stored gallery images and thumbnails, distance, and coordinates if the page had none.
+    Returns a new dictionary (without image_urls).
+    """
+    listing_data = dict(page)
+    gallery_urls = listing_data.pop('image_urls', None) or []
+
+    # Fetch the whole gallery concurrently, dedup it and store re-encoded copies plus thumbnails
+    listing_data['image'], listing_data['thumbnails'] = images.process_gallery(gallery_urls)
+
+    # Get distance
+    listing_data['distance'] = get_distance(listing_data['address']) # Calls another utility function
+
+    # Get coordinates from the address if the page didn't have them
+    if listing_data.get('latitude') is None or listing_data.get('longitude') is None:
+        listing_data['latitude'], listing_data['longitude'] = geocode(listing_data['address'])
+    return listing_data
+
+def get_distance(destination_address):
+    """Uses Google Maps Distance Matrix API to get travel distance."""
+    if not config.Maps_API_KEY or config.Maps_API_KEY == "YOUR_Maps_API_KEY_HERE":
+        print("Google Maps API key is not set. Cannot calculate distance.")
+        return "N/A"
+        
+    encoded_origin = quote(config.ORIGIN_ADDRESS)
+    encoded_destination = quote(destination_address)
+    url = f"https://maps.googleapis.com/maps/api/distancematrix/json?origins={encoded_origin}&destinations={encoded_destination}&units=imperial&key={config.Maps_API_KEY}"
+    
+    import requests
+    import http_client # Shared pooled client; loaded on first lookup
+    try:
+        response = http_client.get(url)
+    except requests.exceptions.RequestException as e:
+        print(f"Google Maps API request failed: {e}")
+        return "N/A"
+    if response.status_code == 200:
+        data = response.json()
+        try:
+            if data['status'] == 'OK' and data['rows'][0]['elements'][0]['status'] == 'OK':
+                distance_text = data["rows"][0]["elements"][0]["distance"]["text"]
+                return distance_text
+            else:
+                error_status = data['rows'][0]['elements'][0]['status']
+                print(f"Google Maps API element status not OK: {error_status}. Message: {data.get('error_message', 'No error message.')}")
+                return "N/A"
+        except (KeyError, IndexError) as e:
+            print(f"Error parsing Google Maps API response: {e}")
+            print(f"Google Maps API raw response: {data}")
+            return "N/A"
+    else:
+        print(f"Google Maps API request failed with status code: {response.status_code}")
+        return "N/A"
+
+def geocode(address):
+    """Uses the Google Maps Geocoding API to get (latitude, longitude) for an address, or (None, None)."""
+    if not config.Maps_API_KEY or config.Maps_API_KEY == "YOUR_Maps_API_KEY_HERE" or not address or address == "Address not found":
+        return None, None
+
+    url = f"https://maps.googleapis.com/maps/api/geocode/json?address={quote(address)}&key={config.Maps_API_KEY}"
+
+    import requests
+    import http_client # Shared pooled client; loaded on first lookup
+    try:
+        response = http_client.get(url)
+    except requests.exceptions.RequestException as e:
+        print(f"Google Geocoding API request failed: {e}")
+        return None, None
+    if response.status_code != 200:
+        print(f"Google Geocoding API request failed with status code: {response.status_code}")
+        return None, None
+    data = response.json()
+    try:
+        if data['status'] != 'OK':
+            print(f"Google Geocoding API status not OK: {data['status']}. Message: {data.get('error_message', 'No error message.')}")
+            return None, None
+        location = data['results'][0]['geometry']['location']
+        return location['lat'], location['lng']
+    except (KeyError, IndexError) as e:
+        print(f"Error parsing Google Geocoding API response: {e}")
+        return None, None
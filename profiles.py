@@ -0,0 +1,209 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import json
+import logging
+import math
+import os
+import threading
+
+import config # PROFILES_FILE and the active SCORE_WEIGHTS
+import scoring # Feature columns and weighted scores
+import state # Cross-process file lock
+
+# --- Named score weight profiles (profiles.json) ---
+# Each profile is a full set of SCORE_WEIGHTS ("budget-first", "commute-first", ...). The active
+# one is what assign_scores uses and what the stored listing scores reflect; the others can be
+# ranked at any time from the cached score columns without touching the listings.
+
+DEFAULT_PROFILE = "default"
+
+_lock = threading.Lock()
+
+def check_weights(weights):
+    """Raises ValueError unless every weight is a finite number from 0 to 1 and they add up to at most 1."""
+    for key, weight in weights.items():
+        if not (isinstance(weight, (int, float)) and math.isfinite(weight) and 0 <= weight <= 1):
+            raise ValueError(f"Weight '{key}' must be a number from 0 to 1.")
+    if sum(weights.values()) > 1 + 1e-9: # Room for float rounding in weights like 0.3 + 0.2 + ...
+        raise ValueError("Weights must add up to at most 1.")
+
+def _clean_weights(weights):
+    """Every SCORE_WEIGHTS key as a float, missing ones taken from the current weights. Raises ValueError on invalid weights."""
+    weights = {key: float(weights.get(key, config.SCORE_WEIGHTS.get(key, 0))) for key in config.SCORE_WEIGHTS}
+    check_weights(weights)
+    return weights
+
+def load_profiles():
+    """
+    Returns {"active": name, "profiles": {name: weights}} from config.PROFILES_FILE. Without
+    a file, the current SCORE_WEIGHTS are the one "default" profile.
+    """
+    try:
+        with open(config.PROFILES_FILE, "rb") as f:
+            data = json.loads(f.read())
+        profiles = {}
+        for name, weights in data["profiles"].items():
+            try:
+                profiles[str(name)] = _clean_weights(weights)
+            except (ValueError, TypeError, AttributeError) as e:
+                logging.error(f"Skipping profile {name!r} in {config.PROFILES_FILE}: {e}") # The others still load
+        active = data.get("active") if data.get("active") in profiles else next(iter(profiles))
+        return {"active": active, "profiles": profiles}
+    except FileNotFoundError:
+        pass
+    except (ValueError, KeyError, TypeError, AttributeError, StopIteration) as e:
+        logging.error(f"Error reading {config.PROFILES_FILE}: {e}. Using the default profile.")
+    return {"active": DEFAULT_PROFILE, "profiles": {DEFAULT_PROFILE: dict(config.SCORE_WEIGHTS)}}
+
+def save_profiles(data):
+    """Writes profiles atomically (temp file + replace), like listings.json."""
+    temp_file = f"{config.PROFILES_FILE}.tmp"
+    with open(temp_file, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(temp_file, config.PROFILES_FILE)
+
+def update_profiles(change):
+    """
+    Loads the profiles, applies change(data) (which may raise ValueError to refuse), saves
+    and returns them. Serialized across threads and processes.
+    """
+    with _lock, state.file_lock(f"{config.PROFILES_FILE}.lock"):
+        data = load_profiles()
+        change(data)
+        save_profiles(data)
+        return data
+
+def activate(data):
+    """Makes the active profile's weights the ones assign_scores uses."""
+    config.SCORE_WEIGHTS.update(data["profiles"][data["active"]])
+
+class ActiveProfile:
+    """
+    Registered with the listing store so that when another process's changes are re-loaded,
+    this process also picks up the profile it may have switched to.
+    """
+
+    def rebuild(self, listings_data):
+        activate(load_profiles())
+
+class ScoreColumns:
+    """
+    Scores of the current listings under each profile, as columns parallel to their ids.
+    The normalized criteria (scoring.feature_columns) and each profile's scores are computed in
+    full once, then kept current from the store's change log: only the listings changed since
+    the version last seen get new criteria and new scores in every cached column. Normalization
+    is relative to the whole collection, so a change that moves a criterion's min/max renormalizes
+    every row (from the cached raw criteria). A full rebuild happens only when the log can't diff
+    from that version, or when it's cheaper (a large share changed).
+    """
+
+    rebuild_fraction = 0.25
+    max_profiles = 16 # Score columns kept; the least recently computed are dropped first
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = None
+        self._rows = {}      # id -> scoring.feature_row
+        self._ranges = None  # scoring.feature_ranges of the rows
+        self._position = {}  # id -> index in the columns
+        self._columns = None
+        self._scores = {}    # (profile name, weights) -> scores
+        self._weights = {}   # the same key -> weights
+
+    def _rebuild(self, listings_data):
+        ids = [listing.get("id") for listing in listings_data]
+        self._rows = {listing.get("id"): scoring.feature_row(listing) for listing in listings_data}
+        self._renormalize(ids)
+
+    def _renormalize(self, ids):
+        """Recomputes the ranges, the columns and every cached profile's scores from the cached rows."""
+        self._ranges = scoring.feature_ranges(self._rows.values())
+        self._columns = scoring.normalized_columns(ids, [self._rows[i] for i in ids], self._ranges)
+        self._position = {listing_id: i for i, listing_id in enumerate(ids)}
+        self._scores = {key: scoring.score_columns(self._columns, self._weights[key]) for key in self._scores}
+
+    def _apply(self, listings_data, changed, deleted):
+        touched = {} # id -> (old row, new row or None if deleted)
+        for listing_id in deleted:
+            old = self._rows.pop(listing_id, None)
+            if old is not None:
+                touched[listing_id] = (old, None)
+        for listing in changed:
+            listing_id = listing.get("id")
+            row = scoring.feature_row(listing)
+            old = self._rows.get(listing_id)
+            self._rows[listing_id] = row
+            if old != row or listing_id not in self._position: # Most changes (re-scores, comments) don't touch the criteria
+                touched[listing_id] = (old, row)
+
+        ids = [listing.get("id") for listing in listings_data]
+        if any(scoring.outside_ranges(old, self._ranges, at_bound=True) for old, _ in touched.values() if old) or \
+                any(scoring.outside_ranges(new, self._ranges) for _, new in touched.values() if new):
+            if scoring.feature_ranges(self._rows.values()) != self._ranges:
+                self._renormalize(ids)
+                return
+
+        # Same ranges: only the touched rows get new values. Lists are copied, never patched in
+        # place: callers may still be reading the previous version's columns.
+        names = scoring.CRITERIA + ("rating", "scoreable")
+        if ids == self._columns["id"]:
+            columns = {name: list(self._columns[name]) for name in names}
+            scores = {key: list(values) for key, values in self._scores.items()}
+        else: # Listings were added or deleted: carry the untouched rows over by id
+            old_position = self._position
+            positions = [old_position.get(listing_id) for listing_id in ids]
+            columns = {name: [values[i] if i is not None else None for i in positions]
+                       for name, values in self._columns.items() if name != "id"}
+            scores = {key: [values[i] if i is not None else None for i in positions]
+                      for key, values in self._scores.items()}
+            self._position = {listing_id: i for i, listing_id in enumerate(ids)}
+        columns["id"] = ids
+        for listing_id, (_, row) in touched.items():
+            i = self._position.get(listing_id)
+            if row is None or i is None:
+                continue
+            values = scoring.normalize(row, self._ranges)
+            scoreable = self._ranges is not None and row[6]
+            for name, value in zip(names, values + (scoreable,)):
+                columns[name][i] = value
+            for key, column in scores.items():
+                column[i] = scoring.score_row(values, scoreable, self._weights[key])
+        self._columns = columns
+        self._scores = scores
+
+    def _current(self, listings_data, store):
+        token = store.version_token()
+        if self._token != token:
+            delta = store.changes.since(self._token) if self._token else None
+            if delta is None or len(delta[0]) + len(delta[1]) > self.rebuild_fraction * max(len(listings_data), 1):
+                self._rebuild(listings_data)
+            else:
+                self._apply(listings_data, *delta)
+            self._token = token
+        return self._columns
+
+    def columns(self, listings_data, store):
+        """The feature columns for the store's current listings. Call with the store locked."""
+        with self._lock:
+            return self._current(listings_data, store)
+
+    def scores(self, listings_data, store, name, weights):
+        """(ids, scores) under a named profile's weights, computed in full the first time they're asked for."""
+        key = (name, tuple(sorted(weights.items())))
+        with self._lock:
+            columns = self._current(listings_data, store)
+            scores = self._scores.get(key)
+            if scores is None:
+                if len(self._scores) >= self.max_profiles: # Old weights of edited profiles
+                    oldest = next(iter(self._scores))
+                    del self._scores[oldest], self._weights[oldest]
+                self._weights[key] = dict(weights)
+                scores = self._scores[key] = scoring.score_columns(columns, weights)
+        return columns["id"], scores
+
+def ranking(ids, scores, top=None):
+    """(ids best first, their scores), at most top of them."""
+    ranked = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:top]
+    return [ids[i] for i in ranked], [scores[i] for i in ranked]
@@ -0,0 +1,83 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+from bisect import bisect_left, insort
+
+import state # Change-log synced index base
+
+# --- Score index for "best N" queries ---
+# /listings?top=K used to sort the whole collection to return its first K. The index keeps the
+# listings ordered by score (ties in the order they were added, like a stable sort of the list),
+# so the best K that pass a filter are the first K that pass it. It is brought up to date from the
+# store's change log: a write that re-scores a handful of listings moves a handful of entries.
+
+class ScoreIndex(state.ChangeLogIndex):
+    """
+    Listings ordered best score first. Call sync() with the store read-locked before top().
+    """
+
+    rebuild_fraction = 0.25 # A full sort beats that many bisect moves
+
+    def __init__(self):
+        super().__init__()
+        self._entries = []  # (sort key, id), ascending
+        self._keys = {}     # id -> its entry
+        self._records = {}  # id -> listing
+        self._seq = {}      # id -> insertion order, the tie-breaker
+        self._next_seq = 0
+
+    def _entry(self, listing):
+        listing_id = listing.get("id")
+        seq = self._seq.get(listing_id)
+        if seq is None:
+            seq = self._seq[listing_id] = self._next_seq
+            self._next_seq += 1
+        score = listing.get("score")
+        return (-score if score is not None else float("inf"), seq), listing_id # No score sorts last
+
+    def _rebuild(self, listings_data):
+        self._seq = {}
+        self._next_seq = 0
+        self._records = {listing.get("id"): listing for listing in listings_data}
+        self._keys = {}
+        for listing in listings_data:
+            entry = self._entry(listing)
+            self._keys[entry[1]] = entry
+        self._entries = sorted(self._keys.values())
+
+    def _remove(self, listing_id):
+        entry = self._keys.pop(listing_id, None)
+        if entry is not None:
+            i = bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+        self._records.pop(listing_id, None)
+
+    def _apply(self, changed, deleted):
+        for listing_id in deleted:
+            self._remove(listing_id)
+            self._seq.pop(listing_id, None)
+        for listing in changed:
+            listing_id = listing.get("id")
+            self._remove(listing_id)
+            entry = self._entry(listing)
+            self._keys[listing_id] = entry
+            self._records[listing_id] = listing
+            insort(self._entries, entry)
+
+    def top(self, k, predicate=None):
+        """The best k listings (that pass predicate, if given), best first."""
+        with self._lock:
+            entries = self._entries
+            records = self._records
+            if predicate is None:
+                return [records[listing_id] for _, listing_id in entries[:k]]
+            best = []
+            for _, listing_id in entries:
+                listing = records[listing_id]
+                if predicate(listing):
+                    best.append(listing)
+                    if len(best) == k:
+                        break
+            return best
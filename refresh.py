@@ -0,0 +1,214 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import config # REFRESH_* settings and REQUEST_HEADERS
+import parsing # JSON-LD payload extraction and page parsing
+import scoring # Derived fields and re-scoring
+from models import Listing # Field conversion for parsed values
+
+# --- Scheduled re-scrape of stored listings ---
+# Every listing is re-fetched about once per REFRESH_INTERVAL_HOURS (jittered, so listings
+# added together don't all come due together), at most one request per host every
+# REFRESH_HOST_MIN_INTERVAL seconds; different hosts are fetched concurrently. The page's
+# JSON-LD payload is hashed first: if it matches the hash from the last refresh the page isn't
+# parsed and nothing is re-scored. Price and availability changes are kept per listing in
+# price_history as compact [unix time, price, date_available] points, one per change.
+
+REFRESH_FIELDS = ("price", "bedrooms", "bathrooms", "square_footage", "date_available", "description")
+OFF_MARKET = "Off market" # date_available for listings whose page is gone
+
+def payload_hash(payload):
+    """Short fingerprint of a page's listing payload."""
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def next_refresh_time(now):
+    """When a listing refreshed at now is next due: the interval, give or take REFRESH_JITTER of it."""
+    interval = config.REFRESH_INTERVAL_HOURS * 3600
+    return now + interval * (1 + random.uniform(-config.REFRESH_JITTER, config.REFRESH_JITTER))
+
+def is_active(listing):
+    """Listings with a page to re-fetch, outside the groups that are never refreshed."""
+    url = listing.get("url")
+    return bool(url) and url.startswith("http") and listing.get("group") not in config.REFRESH_SKIP_GROUPS
+
+def due_listings(listings_data, now, limit=None, force=False):
+    """(id, url, content hash) of active listings due for a refresh, longest overdue first. Call with the store locked."""
+    due = [listing for listing in listings_data if is_active(listing)
+           and (force or (listing.get("next_refresh") or 0) <= now)]
+    due.sort(key=lambda listing: listing.get("next_refresh") or 0)
+    return [(listing.get("id"), listing.get("url"), listing.get("content_hash")) for listing in due[:limit]]
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least min_interval seconds apart, across threads."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next = {} # host -> earliest time of its next request
+
+    def wait(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock: # Reserve a slot, then sleep outside the lock
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            self._next[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def fetch(url, known_hash, limiter):
+    """
+    Re-fetches one listing page. Returns (status, fields, content hash) where status is
+    "changed" (fields holds the re-parsed REFRESH_FIELDS that have values), "unchanged",
+    "off_market" or "error" (fields None).
+    """
+    import requests # Only needed once a refresh actually runs
+    import http_client
+
+    limiter.wait(url)
+    try:
+        # requests can't decode br or zstd without optional packages, and the hash must be of the page, not its encoding
+        response = http_client.get(url, headers=dict(config.REQUEST_HEADERS, **{"Accept-Encoding": "gzip, deflate"}))
+    except requests.exceptions.RequestException as e:
+        print(f"Refresh of {url} failed: {e}")
+        return "error", None, known_hash
+    if response.status_code in (404, 410):
+        return "off_market", {"date_available": OFF_MARKET}, None # Re-parse if the page comes back
+    if response.status_code != 200:
+        print(f"Refresh of {url} returned {response.status_code}.")
+        return "error", None, known_hash
+
+    payload = parsing.listing_payload(response.text)
+    if payload is None: # Listing pages always have it: this is a bot check or an error page
+        print(f"Refresh of {url} got a page without listing data (blocked?).")
+        return "error", None, known_hash
+    digest = payload_hash(payload)
+    if digest == known_hash:
+        return "unchanged", None, digest
+
+    try:
+        parsed = Listing.from_dict(parsing.parse_html(response.text, url, enrich=False))
+    except Exception as e: # The HTML fallbacks assume Zillow's markup
+        print(f"Error parsing refreshed page {url}: {e}")
+        return "error", None, known_hash
+    # Keep stored values the page no longer shows rather than erasing them
+    fields = {field: parsed.get(field) for field in REFRESH_FIELDS if parsed.get(field) not in (None, "", "Not Listed")}
+    return "changed", fields, digest
+
+def fetch_all(due, limiter, workers=None):
+    """
+    fetch() for each (id, url, content hash) in due. Each host's listings are fetched in turn (the
+    limiter spaces them anyway); different hosts are fetched concurrently, one thread per host, up
+    to REFRESH_FETCH_WORKERS. Returns {id: fetch result}.
+    """
+    by_host = {}
+    for item in due:
+        by_host.setdefault(urlsplit(item[1]).netloc.lower(), []).append(item)
+
+    def fetch_host(items):
+        return [(listing_id, fetch(url, known_hash, limiter)) for listing_id, url, known_hash in items]
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(len(by_host), workers or config.REFRESH_FETCH_WORKERS))) as pool:
+        for fetched in pool.map(fetch_host, by_host.values()):
+            results.update(fetched)
+    return results
+
+def record_history(listing, now):
+    """Appends the listing's current price and availability to its price_history if either changed."""
+    history = listing.get("price_history") or []
+    point = [int(now), listing.get("price"), listing.get("date_available")]
+    if history and history[-1][1:] == point[1:]:
+        return False
+    listing["price_history"] = (history + [point])[-config.REFRESH_HISTORY_LIMIT:] # A new list: the old record shares the old one
+    return True
+
+def apply_results(txn, results, now):
+    """
+    Applies fetch() results ({id: (status, fields, hash)}) in a write transaction.
+    Returns (counts by status, whether a score input changed).
+    """
+    counts = {"changed": 0, "unchanged": 0, "off_market": 0, "error": 0}
+    rescore = False
+    for listing_id, (status, fields, digest) in results.items():
+        listing = txn.edit(listing_id)
+        if listing is None: # Deleted while it was being fetched
+            continue
+        counts[status] += 1
+        if status == "error":
+            listing["next_refresh"] = now + config.REFRESH_RETRY_MINUTES * 60
+            continue
+        listing["refreshed_at"] = now
+        listing["next_refresh"] = next_refresh_time(now)
+        listing["content_hash"] = digest
+        if fields:
+            changed = scoring.apply_changes(listing, fields)
+            rescore = rescore or bool(changed & scoring.SCORE_INPUTS)
+            record_history(listing, now)
+    return counts, rescore
+
+class RefreshScheduler:
+    """
+    Refreshes due listings of a ListingStore in batches of REFRESH_BATCH_SIZE: pages are
+    fetched with no lock held, then each batch is applied (and re-scored, if needed) in one write.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.limiter = HostRateLimiter(config.REFRESH_HOST_MIN_INTERVAL)
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"running": False, "runs": 0, "last_run": None,
+                      "changed": 0, "unchanged": 0, "off_market": 0, "error": 0}
+
+    def run_once(self, limit=None, force=False):
+        """Refreshes up to limit due listings (every active one with force). Returns counts by status."""
+        with self.store.read() as listings:
+            due = due_listings(listings, time.time(), limit, force)
+        if not due:
+            return {"refreshed": 0}
+
+        results = fetch_all(due, self.limiter)
+
+        with self.store.write() as txn:
+            counts, rescore = apply_results(txn, results, time.time())
+            if rescore:
+                txn.listings = scoring.assign_scores(txn.listings)
+        print(f"Refreshed {len(due)} listings: {counts}")
+
+        self.stats["runs"] += 1
+        self.stats["last_run"] = datetime.now().isoformat(timespec="seconds")
+        for status, count in counts.items():
+            self.stats[status] += count
+        return dict(counts, refreshed=len(due))
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                refreshed = self.run_once(limit=config.REFRESH_BATCH_SIZE)["refreshed"]
+            except Exception as e: # Keep the scheduler alive; the next pass retries
+                print(f"Error in scheduled refresh: {e}")
+                refreshed = 0
+            if refreshed < config.REFRESH_BATCH_SIZE: # Caught up: wait for more to come due
+                self._stop.wait(config.REFRESH_POLL_SECONDS)
+
+    def start(self):
+        """Starts refreshing in a background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="listing-refresh", daemon=True)
+            self._thread.start()
+            self.stats["running"] = True
+            print("Listing refresh scheduler started.")
+
+    def stop(self):
+        self._stop.set()
+        self.stats["running"] = False
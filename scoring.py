@@ -0,0 +1,354 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import re
+from typing import List, Dict, Any, Optional
+
+import config # Allows access to SCORE_WEIGHTS
+from models import to_miles # Distance strings ("3.4 mi", "850 ft") to miles
+
+# --- Scoring and derived fields ---
+
+def currency_to_float(currency_str: Optional[Any]) -> Optional[float]:
+    """Converts a currency string (e.g., "$1,200") to a float (e.g., 1200.0)."""
+    if currency_str is None or isinstance(currency_str, (int, float)):
+        return currency_str
+    try:
+        # Remove '$', ',', and any other non-numeric characters except '.'
+        clean_str = re.sub(r'[$,]', '', str(currency_str)).strip()
+        return float(clean_str)
+    except ValueError:
+        return None
+
+def calculate_cost_per_occupant(rent: Optional[float], num_occupants: int, utility_estimate: Optional[float] = None) -> Optional[float]:
+    """
+    Calculates the cost per occupant, including an optional utility estimate.
+    """
+    rent_val = currency_to_float(rent)
+    
+    if rent_val is None:
+        return None
+    
+    total_cost = rent_val
+    # Safely add utility_estimate if it's a number
+    if utility_estimate is not None and isinstance(utility_estimate, (int, float)):
+        total_cost += float(utility_estimate)
+    
+    if num_occupants is None or num_occupants <= 0:
+        # If no occupants specified or 0, cost is just rent + utility (for single person or total cost display)
+        return total_cost 
+    
+    return total_cost / num_occupants
+
+# Criteria with a weight in SCORE_WEIGHTS; the overall rating gets whatever weight is left over
+CRITERIA = ("rent", "sqft", "bedrooms", "bathrooms", "distance")
+
+def _utility_estimate(listing: Dict[str, Any]) -> float:
+    """The listing's utility estimate as a number, 0.0 if missing or not a valid number (e.g. "N/A")."""
+    utility_estimate_val = listing.get("utility_estimate")
+    if utility_estimate_val is None:
+        return 0.0
+    try:
+        return float(utility_estimate_val)
+    except (ValueError, TypeError):
+        return 0.0
+
+def _cost_per_sqft(listing: Dict[str, Any]) -> Optional[float]:
+    raw_price = currency_to_float(listing.get("price"))
+    sqft = listing.get("square_footage")
+    if raw_price is not None and sqft is not None and sqft > 0:
+        return round((raw_price + _utility_estimate(listing)) / sqft, 2)
+    return None
+
+def _cost_per_roommate(listing: Dict[str, Any]) -> Optional[float]:
+    """Unrounded; the UI sorts by it."""
+    return calculate_cost_per_occupant(currency_to_float(listing.get("price")), listing.get("roommates", 0), _utility_estimate(listing))
+
+def _cost_per_occupant(listing: Dict[str, Any]) -> Optional[float]:
+    cost_per_occupant = _cost_per_roommate(listing)
+    return round(cost_per_occupant, 2) if cost_per_occupant is not None else None
+
+# Derived fields: name -> (the fields it is computed from, how to compute it). Each is
+# recomputed only when one of its inputs changes (see update_derived), not on every write.
+DERIVED_FIELDS = {
+    "cost_per_sqft": (("price", "square_footage", "utility_estimate"), _cost_per_sqft),
+    "cost_per_occupant": (("price", "roommates", "utility_estimate"), _cost_per_occupant),
+    "cost_per_roommate": (("price", "roommates", "utility_estimate"), _cost_per_roommate),
+}
+
+# Fields the score is computed from. The score is normalized against the whole collection,
+# so a change to any of these on one listing means re-scoring them all (assign_scores).
+SCORE_INPUTS = frozenset(("price", "square_footage", "bedrooms", "bathrooms", "distance", "overall_rating", "roommates"))
+
+def update_derived(listing: Dict[str, Any], changed: Optional[set] = None) -> None:
+    """
+    Recomputes the derived fields that depend on the changed fields (all of them if changed
+    is None, e.g. for a new listing). Displayed on the card even if the listing can't be scored.
+    """
+    for name, (inputs, compute) in DERIVED_FIELDS.items():
+        if changed is None or not changed.isdisjoint(inputs):
+            listing[name] = compute(listing)
+
+def apply_changes(listing: Dict[str, Any], fields: Dict[str, Any]) -> set:
+    """
+    Sets fields on a listing and recomputes the derived fields that depend on them.
+    Returns the names of the fields whose value actually changed.
+    """
+    changed = set()
+    for field, value in fields.items():
+        before = listing.get(field)
+        listing[field] = value # A Listing converts the value to the field's type
+        if listing.get(field) != before:
+            changed.add(field)
+    if changed:
+        update_derived(listing, changed)
+    return changed
+
+# (column, index in a feature row, lower is better) for the criteria normalized by min/max
+_RANGED = (("rent", 0, True), ("sqft", 1, False), ("bedrooms", 2, False), ("bathrooms", 3, False), ("distance", 4, True))
+
+def feature_row(l: Dict[str, Any]) -> tuple:
+    """
+    A listing's raw scoring criteria: (price, sqft, bedrooms, bathrooms, distance, overall_rating,
+    scoreable, in_range). in_range rows are the ones that set the min/max for normalization.
+    """
+    price = currency_to_float(l.get("price"))
+    sqft = l.get("square_footage")
+    bedrooms = l.get("bedrooms")
+    bathrooms = l.get("bathrooms")
+    distance = to_miles(l.get("distance"))
+    overall_rating = l.get("overall_rating")
+    roommates = l.get("roommates")
+    scoreable = (price is not None and sqft is not None and sqft > 0 and
+                 bedrooms is not None and bedrooms > 0 and
+                 bathrooms is not None and bathrooms > 0 and
+                 distance is not None and distance >= 0 and
+                 overall_rating is not None and 1 <= overall_rating <= 10)
+    # Only listings with complete data (occupants included) set the min/max for normalization
+    in_range = scoreable and roommates is not None and roommates >= 0 # 0 means living alone
+    return (price, sqft, bedrooms, bathrooms, distance, overall_rating, scoreable, in_range)
+
+def feature_ranges(rows) -> Optional[tuple]:
+    """((low, high) for each min/max-normalized criterion) over the in_range feature rows, or None if there are none."""
+    ranged = [row for row in rows if row[7]]
+    if not ranged:
+        return None
+    return tuple((min(row[i] for row in ranged), max(row[i] for row in ranged)) for _, i, _ in _RANGED)
+
+def outside_ranges(row, ranges, at_bound=False) -> bool:
+    """True if an in_range feature row lies outside ranges (or on one of its bounds, with at_bound)."""
+    if not row[7]:
+        return False
+    if ranges is None:
+        return True
+    return any(row[i] < low or row[i] > high or (at_bound and row[i] in (low, high))
+               for (_, i, _), (low, high) in zip(_RANGED, ranges))
+
+def normalize(row, ranges) -> tuple:
+    """A feature row's criteria normalized to 0-1, in CRITERIA order followed by rating (all 0.0 if it can't be scored)."""
+    if ranges is None or not row[6]:
+        return (0.0,) * (len(CRITERIA) + 1)
+    values = []
+    for (_, i, lower_is_better), (low, high) in zip(_RANGED, ranges):
+        spread = high - low if high != low else 1 # Prevent division by zero if all values are the same
+        values.append(1 - ((row[i] - low) / spread) if lower_is_better else (row[i] - low) / spread)
+    values.append((row[5] - 1) / 9.0) # Scale 1-10 to 0-1
+    return tuple(values)
+
+def normalized_columns(ids: list, rows: list, ranges: Optional[tuple]) -> Dict[str, list]:
+    """feature_columns() output for feature rows (parallel to ids) normalized against ranges."""
+    columns = {"id": ids}
+    normalized = [normalize(row, ranges) for row in rows]
+    for j, name in enumerate(CRITERIA + ("rating",)):
+        columns[name] = [values[j] for values in normalized]
+    columns["scoreable"] = [ranges is not None and row[6] for row in rows] # Nothing can be normalized: nothing is scored
+    return columns
+
+def feature_columns(listings: List[Dict[str, Any]]) -> Dict[str, list]:
+    """
+    Normalizes each listing's scoring criteria to 0-1 against the rest of the collection and
+    returns them column by column: {"id": [...], "rent": [...], ..., "rating": [...], "scoreable": [...]}.
+    A score is then just a weighted sum of the columns, so trying new weights doesn't need the
+    listings at all. Listings without enough data to score have scoreable False (score 0.0).
+    """
+    rows = [feature_row(l) for l in listings]
+    return normalized_columns([l.get("id") for l in listings], rows, feature_ranges(rows))
+
+def score_columns(columns: Dict[str, list], weights: Dict[str, float]) -> List[float]:
+    """Scores every listing in feature_columns() output under the given weights, in the same order."""
+    rent, sqft, bedrooms, bathrooms, distance = (weights.get(name, 0) for name in CRITERIA)
+    rating = 1 - sum(weights.values()) # Remaining weight for overall rating
+    return [
+        round((r * rent) + (s * sqft) + (b * bedrooms) + (ba * bathrooms) + (d * distance) + (o * rating), 2) if ok else 0.0
+        for r, s, b, ba, d, o, ok in zip(columns["rent"], columns["sqft"], columns["bedrooms"],
+                                         columns["bathrooms"], columns["distance"], columns["rating"],
+                                         columns["scoreable"])
+    ]
+
+def score_row(values: tuple, scoreable: bool, weights: Dict[str, float]) -> float:
+    """One listing's score from its normalized criteria (see normalize), exactly as score_columns computes it."""
+    if not scoreable:
+        return 0.0
+    rent, sqft, bedrooms, bathrooms, distance = (weights.get(name, 0) for name in CRITERIA)
+    rating = 1 - sum(weights.values()) # Remaining weight for overall rating
+    r, s, b, ba, d, o = values
+    return round((r * rent) + (s * sqft) + (b * bedrooms) + (ba * bathrooms) + (d * distance) + (o * rating), 2)
+
+def assign_scores(listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Assigns a recommended score to each listing based on configurable weights. Returns a new
+    list in which only the listings whose score changed are (re-scored) copies. Listings that
+    have never had their derived cost fields computed get them too.
+    """
+    if not listings:
+        return []
+
+    scores = score_columns(feature_columns(listings), config.SCORE_WEIGHTS)
+    scored_listings = []
+    for listing, score in zip(listings, scores):
+        missing = any(name not in listing for name in DERIVED_FIELDS)
+        if missing or listing.get("score") != score:
+            listing = listing.copy() # Never modify a listing that may be shared
+            if missing:
+                update_derived(listing)
+            listing["score"] = score
+        scored_listings.append(listing)
+
+    return scored_listings
+
+# Example usage (for testing purposes only)
+if __name__ == '__main__':
+    print("--- scoring.py Test Run ---")
+
+    test_listing_1 = {
+        "id": 1,
+        "url": "http://example.com/test1",
+        "address": "123 Main St",
+        "price": "$2,000",
+        "square_footage": 1200,
+        "bedrooms": 3,
+        "bathrooms": 2.5,
+        "date_available": "August 1, 2025",
+        "distance": "2.5 miles", # Now a string, to test conversion
+        "contacted": False,
+        "applied": False,
+        "group": "none",
+        "overall_rating": 7,
+        "roommates": 2,
+        "image": [],
+        "comments": "Good location",
+        "utility_estimate": 150.0
+    }
+    
+    test_listing_2 = {
+        "id": 2,
+        "url": "http://example.com/test2",
+        "address": "456 Oak Ave",
+        "price": "$1,500",
+        "square_footage": 900,
+        "bedrooms": 2,
+        "bathrooms": 1.0,
+        "date_available": "Immediately",
+        "distance": 0.8, # Still a float
+        "contacted": True,
+        "applied": False,
+        "group": "red",
+        "overall_rating": 9,
+        "roommates": 1,
+        "image": [],
+        "comments": "Small but cheap",
+        "utility_estimate": 50.0
+    }
+
+    test_listing_3 = { # Incomplete data for scoring, distance as "N/A"
+        "id": 3,
+        "url": "http://example.com/test3",
+        "address": "789 Pine Ln",
+        "price": "$2,500",
+        "square_footage": None, # Missing data
+        "bedrooms": 4,
+        "bathrooms": 3.0,
+        "date_available": "September 1, 2025",
+        "distance": "N/A", # String "N/A"
+        "contacted": False,
+        "applied": False,
+        "group": "none",
+        "overall_rating": 6,
+        "roommates": 3,
+        "image": [],
+        "comments": "Big but far",
+        "utility_estimate": 200.0
+    }
+    
+    test_listing_4 = { # Distance as 0.0, utility_estimate as None
+        "id": 4,
+        "url": "http://example.com/test4",
+        "address": "100 Close St",
+        "price": "$1200",
+        "square_footage": 700,
+        "bedrooms": 1,
+        "bathrooms": 1.0,
+        "date_available": "July 10, 2025",
+        "distance": 0.0, # Distance as 0.0
+        "contacted": False,
+        "applied": False,
+        "group": "none",
+        "overall_rating": 8,
+        "roommates": 1,
+        "image": [],
+        "comments": "Very close",
+        "utility_estimate": None # Test with None utility estimate
+    }
+    
+    test_listing_5 = { # Price as None, utility_estimate as "100" (string)
+        "id": 5,
+        "url": "http://example.com/test5",
+        "address": "200 Missing Price",
+        "price": None, # Test with None price
+        "square_footage": 800,
+        "bedrooms": 2,
+        "bathrooms": 1.0,
+        "date_available": "August 15, 2025",
+        "distance": 3.0,
+        "contacted": False,
+        "applied": False,
+        "group": "none",
+        "overall_rating": 7,
+        "roommates": 2,
+        "image": [],
+        "comments": "Missing price test",
+        "utility_estimate": "100" # Test with string utility estimate
+    }
+
+
+    test_listings = [test_listing_1, test_listing_2, test_listing_3, test_listing_4, test_listing_5]
+
+    # Test assign_scores
+    print("\nAssigning scores to listings:")
+    scored_listings = assign_scores(test_listings)
+    for listing in scored_listings:
+        print(f"ID: {listing.get('id')}, "
+              f"Address: {listing.get('address')}, "
+              f"Price: {listing.get('price')}, "
+              f"Utilities: {listing.get('utility_estimate')}, "
+              f"SqFt: {listing.get('square_footage')}, "
+              f"Beds: {listing.get('bedrooms')}, "
+              f"Baths: {listing.get('bathrooms')}, "
+              f"Distance: {listing.get('distance')}, "
+              f"Rating: {listing.get('overall_rating')}, "
+              f"Occupants: {listing.get('roommates')}, "
+              f"Cost/SqFt: {listing.get('cost_per_sqft')}, "
+              f"Cost/Occupant: {listing.get('cost_per_occupant')}, "
+              f"Score: {listing.get('score')}")
+    
+    # Test `calculate_cost_per_occupant`
+    print(f"\nTesting calculate_cost_per_occupant:")
+    print(f"Rent $950, 1 occupant, $50 utility: ${calculate_cost_per_occupant(950, 1, 50):.2f}")
+    print(f"Rent $1800, 3 occupants, $120 utility: ${calculate_cost_per_occupant(1800, 3, 120):.2f}")
+    print(f"Rent $1000, 0 occupants, $80 utility (should just be total cost): ${calculate_cost_per_occupant(1000, 0, 80):.2f}")
+    print(f"Rent $700, 1 occupant, no utility: ${calculate_cost_per_occupant(700, 1):.2f}")
+    print(f"Rent $700, 1 occupant, None utility: ${calculate_cost_per_occupant(700, 1, None):.2f}")
+    print(f"Rent $700, 1 occupant, 'N/A' utility: ${calculate_cost_per_occupant(700, 1, 'N/A')}") # Should be 700 / 1
+
+    print("\n--- scoring.py Test Run Complete ---")
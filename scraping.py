@@ -0,0 +1,161 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+import config # Allows access to REQUEST_HEADERS
+import parsing
+from dedup import listing_identity # Canonical listing keys
+
+# --- Browser scraping ---
+# Playwright and playwright_stealth are only imported when a scrape actually runs.
+
+def scrape_zillow(url, headless=True):
+    """
+    Scrapes a Zillow listing URL using Playwright for full JavaScript rendering.
+    Handles CAPTCHA detection and provides options for manual solving.
+    """
+    print(f"Attempting to scrape Zillow URL: {url} using Playwright.")
+
+    # The browser stack is heavy, so it is only loaded once a scrape is actually requested
+    from bs4 import BeautifulSoup
+    from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+    from playwright_stealth import Stealth
+
+    stealth_instance = Stealth() # For Playwright stealth mode
+
+    temp_dir = None
+    browser_context = None
+    scraped_data_result = {}
+
+    try:
+        temp_dir = tempfile.mkdtemp() # Create a temporary directory for browser profile
+        print(f"Using temporary browser profile: {temp_dir}")
+
+        with sync_playwright() as p:
+            try: 
+                # Launch persistent context to reuse the profile if needed for CAPTCHA
+                browser_context = p.chromium.launch_persistent_context(
+                    user_data_dir=temp_dir,
+                    headless=headless,
+                    channel='chrome' # Use Chrome channel for better compatibility
+                ) 
+                page = browser_context.new_page()
+
+                stealth_instance.apply_stealth_sync(page) # Apply stealth settings
+                page.set_extra_http_headers(config.REQUEST_HEADERS) # Set custom headers
+
+                # Simulate human-like delay before navigating
+                delay_before_goto = random.uniform(2.0, 4.0)
+                print(f"Waiting for {delay_before_goto:.2f} seconds before navigating...")
+                time.sleep(delay_before_goto) 
+
+                print(f"Navigating to {url}...")
+                page.goto(url, wait_until="domcontentloaded", timeout=60000) # Wait up to 60 seconds
+                print("Page loaded (domcontentloaded).")
+
+                # Simulate human-like delay after navigation
+                delay_after_goto = random.uniform(3.0, 7.0)
+                print(f"Waiting for {delay_after_goto:.2f} seconds after navigation...")
+                time.sleep(delay_after_goto)
+
+                # Check for CAPTCHA
+                if page.locator('text=Verify you\'re not a robot').is_visible() or \
+                   page.locator('text=Please verify you are a human').is_visible() or \
+                   page.locator('input[name="h_captcha_response"]').is_visible():
+                    print("\n=========================================================================")
+                    print("  CAPTCHA DETECTED! Browser is open for manual solving.")
+                    print("=========================================================================")
+                    if not headless:
+                        # If not headless, prompt user to solve in the visible browser
+                        input("Press Enter to continue scraping after solving CAPTCHA...\n")
+                    else:
+                        # If headless, re-launch in non-headless mode to allow solving
+                        browser_context.close()
+                        browser_context = p.chromium.launch_persistent_context(
+                            user_data_dir=temp_dir,
+                            headless=False,
+                            channel='chrome'
+                        )
+                        page = browser_context.new_page()
+                        stealth_instance.apply_stealth_sync(page)
+                        page.set_extra_http_headers(config.REQUEST_HEADERS)
+                        page.goto(url, wait_until="domcontentloaded", timeout=60000)
+                        input("CAPTCHA window opened. Press Enter after solving and closing it...\n")
+
+                # Get the fully rendered HTML content
+                html = page.content()
+                soup = BeautifulSoup(html, "html.parser")
+                print(f"Successfully retrieved rendered HTML from {url}")
+
+                # Parse the HTML using the shared parser
+                scraped_data_result = parsing.parse_zillow_html(soup, url)
+
+            except PlaywrightTimeoutError as e:
+                print(f"Playwright operation timed out: {e}")
+                scraped_data_result = {"error": f"Playwright timeout: {e}"}
+            except Exception as e: # Catch any other Playwright-related errors
+                print(f"An unexpected error occurred during Playwright operations: {e}")
+                print(f"Error details: {e.__class__.__name__}: {e}")
+                scraped_data_result = {"error": f"Playwright error: {e}"}
+            finally:
+                if browser_context:
+                    browser_context.close() # Always close the browser context
+                    print("Browser context closed.")
+        
+    except Exception as outer_e: # Catch errors during Playwright setup
+        print(f"An outer error occurred during setup or Playwright context creation: {outer_e}")
+        print(f"Error details: {outer_e.__class__.__name__}: {outer_e}")
+        scraped_data_result = {"error": f"Scraper setup error: {outer_e}"}
+    finally:
+        if temp_dir and os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir) # Clean up the temporary browser profile
+            print(f"Cleaned up temporary browser profile at {temp_dir}")
+        print("Scrape function finished and cleanup performed.")
+    
+    return scraped_data_result
+
+# --- Listing identity and single-flight scraping ---
+# Concurrent scrape requests for the same listing (a double-click on "Add", or two
+# people adding the same URL) share one browser session and its result.
+_inflight_scrapes = {}
+_inflight_lock = threading.Lock()
+
+def scrape_zillow_single_flight(url, headless=True):
+    """
+    Scrapes a listing with scrape_zillow, but lets concurrent callers for the same listing
+    wait on the scrape already in flight instead of launching a second browser.
+    Every caller gets its own copy of the result.
+    """
+    key = listing_identity(url)
+    if key is None: # No listing to share a scrape with (and None must not become a shared key)
+        return scrape_zillow(url, headless=headless)
+
+    with _inflight_lock:
+        future = _inflight_scrapes.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight_scrapes[key] = future
+
+    if not is_owner:
+        print(f"Scrape for {key} already in progress. Waiting for its result.")
+        return dict(future.result())
+
+    try:
+        result = scrape_zillow(url, headless=headless)
+        future.set_result(result)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight_scrapes.pop(key, None)
+    return dict(result)
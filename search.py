@@ -0,0 +1,193 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+from bisect import bisect_left, insort
+import heapq
+import math
+import re
+
+import state # Change-log synced index base
+
+# --- Full-text search over listing addresses, comments and descriptions ---
+# An in-process inverted index: term -> {listing id: [positions]}. Positions make phrase
+# queries possible, a sorted vocabulary makes prefix queries a range scan, and results are
+# ranked with BM25. Like the score index, it is kept current from the store's change log, and
+# a listing is only re-indexed when one of its text fields actually changed.
+
+SEARCH_FIELDS = ("address", "comments", "description")
+FIELD_GAP = 10 # Position gap between fields, so a phrase can't match across two of them
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_CLAUSE = re.compile(r'"([^"]*)"|(\S+)')
+
+def tokenize(text):
+    """Lower-cased words and numbers."""
+    return _TOKEN.findall(text.lower()) if text else []
+
+def parse_query(query):
+    """
+    Splits a query into clauses, all of which must match:
+        word       -> ("term", "word")
+        pre*       -> ("prefix", "pre")      any word starting with "pre"
+        "a b c"    -> ("phrase", ["a", "b", "c"])
+    """
+    clauses = []
+    for phrase, word in _CLAUSE.findall(query or ""):
+        if phrase:
+            tokens = tokenize(phrase)
+            if len(tokens) > 1:
+                clauses.append(("phrase", tokens))
+            elif tokens:
+                clauses.append(("term", tokens[0]))
+            continue
+        tokens = tokenize(word)
+        if not tokens:
+            continue
+        clauses.extend(("term", token) for token in tokens[:-1])
+        clauses.append(("prefix" if word.endswith("*") else "term", tokens[-1]))
+    return clauses
+
+class SearchIndex(state.ChangeLogIndex):
+    """
+    Ranked full-text search over SEARCH_FIELDS. Call sync() with the store read-locked before search().
+    Always patches when the change log can diff: a re-score marks every listing changed, but
+    comparing their text is far cheaper than re-tokenizing the collection.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        super().__init__()
+        self.k1 = k1
+        self.b = b
+        self._clear()
+
+    def _clear(self):
+        self._postings = {}     # term -> {id: [positions]}
+        self._vocabulary = []   # sorted terms, for prefix queries
+        self._lengths = {}      # id -> number of indexed tokens
+        self._total_length = 0
+        self._texts = {}        # id -> the indexed field values, to skip re-indexing unchanged text
+        self._records = {}      # id -> listing
+        self._norms = {}        # id -> BM25 length normalization, per query
+        self._average_length = 1
+
+    def _add(self, listing_id, texts, sorted_vocabulary=True):
+        positions = {}
+        position = 0
+        for text in texts:
+            for position, token in enumerate(tokenize(text), position):
+                positions.setdefault(token, []).append(position)
+            position += FIELD_GAP
+        postings_by_term = self._postings
+        for term, term_positions in positions.items():
+            postings = postings_by_term.get(term)
+            if postings is None:
+                postings = postings_by_term[term] = {}
+                if sorted_vocabulary:
+                    insort(self._vocabulary, term)
+            postings[listing_id] = term_positions
+        length = sum(len(p) for p in positions.values())
+        self._lengths[listing_id] = length
+        self._total_length += length
+        self._texts[listing_id] = texts
+
+    def _remove(self, listing_id):
+        texts = self._texts.pop(listing_id, None)
+        if texts is None:
+            return
+        for term in set(token for text in texts for token in tokenize(text)):
+            postings = self._postings[term]
+            del postings[listing_id]
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+        self._total_length -= self._lengths.pop(listing_id)
+
+    def _rebuild(self, listings_data):
+        self._clear()
+        for listing in listings_data:
+            listing_id = listing.get("id")
+            self._records[listing_id] = listing
+            self._add(listing_id, tuple(listing.get(field) or "" for field in SEARCH_FIELDS), sorted_vocabulary=False)
+        self._vocabulary = sorted(self._postings)
+
+    def _apply(self, changed, deleted):
+        for listing_id in deleted:
+            self._remove(listing_id)
+            self._records.pop(listing_id, None)
+        for listing in changed:
+            listing_id = listing.get("id")
+            self._records[listing_id] = listing
+            texts = tuple(listing.get(field) or "" for field in SEARCH_FIELDS)
+            if texts != self._texts.get(listing_id): # Re-scores and flag changes don't touch the text
+                self._remove(listing_id)
+                self._add(listing_id, texts)
+
+    # --- Queries ---
+
+    def _idf(self, document_frequency):
+        documents = len(self._lengths)
+        return math.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def _norm(self, listing_id):
+        """BM25 length normalization for a listing, cached for the duration of one query."""
+        norm = self._norms.get(listing_id)
+        if norm is None:
+            norm = self._norms[listing_id] = self.k1 * (1 - self.b + self.b * self._lengths[listing_id] / self._average_length)
+        return norm
+
+    def _bm25(self, term_frequency, idf, listing_id):
+        return idf * term_frequency * (self.k1 + 1) / (term_frequency + self._norm(listing_id))
+
+    def _match_term(self, term):
+        postings = self._postings.get(term, {})
+        idf = self._idf(len(postings))
+        return {listing_id: self._bm25(len(positions), idf, listing_id) for listing_id, positions in postings.items()}
+
+    def _match_prefix(self, prefix):
+        scores = {}
+        i = bisect_left(self._vocabulary, prefix)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(prefix):
+            for listing_id, score in self._match_term(self._vocabulary[i]).items():
+                scores[listing_id] = scores.get(listing_id, 0.0) + score
+            i += 1
+        return scores
+
+    def _match_phrase(self, tokens):
+        postings = [self._postings.get(token) for token in tokens]
+        if not all(postings):
+            return {}
+        idfs = [self._idf(len(p)) for p in postings]
+        scores = {}
+        for listing_id in set.intersection(*(set(p) for p in sorted(postings, key=len))):
+            following = [set(p[listing_id]) for p in postings[1:]]
+            count = sum(1 for start in postings[0][listing_id]
+                        if all(start + offset in positions for offset, positions in enumerate(following, 1)))
+            if count:
+                scores[listing_id] = sum(self._bm25(count, idf, listing_id) for idf in idfs)
+        return scores
+
+    def search(self, query, limit=20):
+        """Returns (relevance, listing) pairs for listings matching every clause of query, best first."""
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        with self._lock:
+            self._average_length = (self._total_length / len(self._lengths) if self._lengths else 1) or 1
+            self._norms = {}
+            total = None
+            for kind, value in clauses:
+                if kind == "term":
+                    scores = self._match_term(value)
+                elif kind == "prefix":
+                    scores = self._match_prefix(value)
+                else:
+                    scores = self._match_phrase(value)
+                if total is None:
+                    total = scores
+                else:
+                    total = {listing_id: score + scores[listing_id] for listing_id, score in total.items() if listing_id in scores}
+                if not total:
+                    return []
+            ranked = heapq.nlargest(limit, total.items(), key=lambda item: item[1])
+            return [(round(score, 3), self._records[listing_id]) for listing_id, score in ranked]
@@ -0,0 +1,134 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import math
+
+import config # SPATIAL_CELL_DEGREES
+import state # Change-log synced index base
+
+# --- Spatial index for map and radius queries ---
+# Listings with coordinates are bucketed into a fixed grid of lat/lon cells. A query only
+# looks at the cells its area overlaps and checks the listings in those, instead of computing
+# a distance for every listing. Kept current from the store's change log: only listings whose
+# coordinates changed move between cells.
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LATITUDE = 69.0
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points, in miles."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+def radius_bounds(lat, lon, miles):
+    """
+    (south, west, north, east) of a box that contains the circle of this radius around a point.
+    Longitudes stay within -180..180: west > east when the box crosses the antimeridian, and it
+    spans every longitude when the circle covers a pole.
+    """
+    dlat = miles / MILES_PER_DEGREE_LATITUDE
+    south, north = lat - dlat, lat + dlat
+    if south <= -90 or north >= 90: # Covers a pole: every longitude is within reach
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    # The circle's widest longitude offset (where it touches a meridian), wider than miles / cos(lat) near the poles
+    ratio = math.sin(math.radians(dlat)) / math.cos(math.radians(lat))
+    if ratio >= 1:
+        return south, -180.0, north, 180.0
+    dlon = math.degrees(math.asin(ratio))
+    west, east = lon - dlon, lon + dlon
+    return south, (west + 360 if west < -180 else west), north, (east - 360 if east > 180 else east)
+
+class SpatialIndex(state.ChangeLogIndex):
+    """
+    Grid of listings by coordinates. Call sync() with the store read-locked before querying.
+    Listings without coordinates are never returned by spatial queries.
+    """
+
+    def __init__(self, cell_degrees=None):
+        super().__init__()
+        self.cell = cell_degrees or config.SPATIAL_CELL_DEGREES
+        self._cells = {}   # (row, column) -> {id: (lat, lon)}
+        self._points = {}  # id -> (lat, lon)
+        self._records = {} # id -> listing
+
+    def _key(self, lat, lon):
+        return math.floor(lat / self.cell), math.floor(lon / self.cell)
+
+    def _place(self, listing):
+        listing_id = listing.get("id")
+        self._records[listing_id] = listing
+        lat, lon = listing.get("latitude"), listing.get("longitude")
+        point = (lat, lon) if lat is not None and lon is not None else None
+        if point == self._points.get(listing_id):
+            return # Not moved (most changes are re-scores or edits to other fields)
+        self._unplace(listing_id)
+        if point is not None:
+            self._points[listing_id] = point
+            self._cells.setdefault(self._key(*point), {})[listing_id] = point
+
+    def _unplace(self, listing_id):
+        point = self._points.pop(listing_id, None)
+        if point is not None:
+            key = self._key(*point)
+            cell = self._cells[key]
+            del cell[listing_id]
+            if not cell:
+                del self._cells[key]
+
+    def _rebuild(self, listings_data):
+        self._cells = {}
+        self._points = {}
+        self._records = {}
+        for listing in listings_data:
+            self._place(listing)
+
+    def _apply(self, changed, deleted):
+        for listing_id in deleted:
+            self._unplace(listing_id)
+            self._records.pop(listing_id, None)
+        for listing in changed:
+            self._place(listing)
+
+    def _candidates(self, south, west, north, east):
+        """(id, point) for listings in the cells overlapping a box (which may cross the antimeridian)."""
+        row_low, column_low = self._key(south, west)
+        row_high, column_high = self._key(north, east)
+        columns = column_high - column_low + 1
+        if west > east: # Wraps past 180
+            columns = self._key(south, 180.0)[1] - column_low + 1 + column_high - self._key(south, -180.0)[1] + 1
+        if (row_high - row_low + 1) * columns > len(self._cells):
+            # A big area holds fewer occupied cells than it spans: walk the occupied ones instead
+            for (row, column), cell in self._cells.items():
+                if row_low <= row <= row_high:
+                    yield from cell.items()
+            return
+        if west > east:
+            column_ranges = ((column_low, self._key(south, 180.0)[1]), (self._key(south, -180.0)[1], column_high))
+        else:
+            column_ranges = ((column_low, column_high),)
+        for row in range(row_low, row_high + 1):
+            for first, last in column_ranges:
+                for column in range(first, last + 1):
+                    cell = self._cells.get((row, column))
+                    if cell:
+                        yield from cell.items()
+
+    def within_box(self, south, west, north, east):
+        """Listings inside a map viewport (west > east means it crosses the antimeridian)."""
+        with self._lock:
+            return [self._records[listing_id] for listing_id, (lat, lon) in self._candidates(south, west, north, east)
+                    if south <= lat <= north and ((west <= lon <= east) if west <= east else (lon >= west or lon <= east))]
+
+    def within_radius(self, lat, lon, miles):
+        """(distance in miles, listing) for listings within miles of a point, nearest first (/listings keeps that order only without ?sort_by=)."""
+        south, west, north, east = radius_bounds(lat, lon, miles)
+        with self._lock:
+            found = []
+            for listing_id, (plat, plon) in self._candidates(south, west, north, east):
+                distance = haversine_miles(lat, lon, plat, plon)
+                if distance <= miles:
+                    found.append((distance, self._records[listing_id]))
+        found.sort(key=lambda item: item[0])
+        return found
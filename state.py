@@ -0,0 +1,307 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Cross-process locking: fcntl on Linux/macOS, msvcrt on Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# --- Concurrency-safe listing state ---
+# One ListingStore per process owns the in-memory listings. Requests read under a shared
+# lock and mutate under an exclusive one; writers also take a lock file so several
+# workers (gunicorn, multiple processes) never interleave read-modify-write cycles, and
+# every access checks the file's identity so changes made by other workers are picked up.
+
+class ReadWriteLock:
+    """A writer-preferring reader-writer lock: many readers, or one writer."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+@contextmanager
+def file_lock(path):
+    """Holds an exclusive OS-level lock on path (created if missing) for the duration of the block."""
+    with open(path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def file_signature(path):
+    """Returns (inode, mtime_ns, size) for path, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+class Transaction:
+    """
+    A write in progress. txn.listings is this transaction's own list: add or remove listings
+    in it, or replace it (e.g. with re-scored copies); it is published when the transaction
+    commits. Change a stored listing through edit(), never in place: readers may still be
+    streaming the old record after their lock is released.
+    Set dirty = False to leave the file untouched (nothing changed, or the request was rejected),
+    or call abort() to throw away changes already made (and the index updates that went with them).
+    """
+
+    def __init__(self, listings_data):
+        self.listings = list(listings_data)
+        self.dirty = True
+        self.aborted = False
+        self._edited = set() # ids of copies made by edit() in this transaction
+
+    def abort(self):
+        """Discards everything this transaction changed; nothing is published or saved."""
+        self.dirty = False
+        self.aborted = True
+
+    def find(self, listing_id):
+        """Returns the listing with this id (int or string), or None."""
+        if listing_id is None:
+            return None
+        listing_id = str(listing_id)
+        return next((l for l in self.listings if str(l.get("id")) == listing_id), None)
+
+    def edit(self, listing_id):
+        """
+        Returns a private copy of the listing with this id to modify (or None), swapped into
+        txn.listings in place of the original. Lists inside it (images) are copied too.
+        """
+        if listing_id is None:
+            return None
+        listing_id = str(listing_id)
+        for i, listing in enumerate(self.listings):
+            if str(listing.get("id")) == listing_id:
+                if id(listing) in self._edited:
+                    return listing # Already this transaction's copy
+                copy = listing.copy()
+                for key, value in listing.items():
+                    if isinstance(value, list):
+                        copy[key] = list(value)
+                self.listings[i] = copy
+                self._edited.add(id(copy))
+                return copy
+        return None
+
+class ChangeLog:
+    """
+    Remembers which listings changed at which store version, so clients can ask for just the
+    listings created, updated (including re-scores) or deleted since the version they have.
+    Versions are tokens "<epoch>.<n>": the epoch is per process, so a client whose token comes
+    from another process (or before a restart) is told to reload instead of getting a wrong diff.
+    """
+
+    def __init__(self, max_tombstones=1000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._records = {}           # id -> the published record
+        self._versions = {}          # id -> version it last changed at
+        self._tombstones = OrderedDict() # deleted id -> version it was deleted at, oldest first
+        self._max_tombstones = max_tombstones
+        self._horizon = 0            # diffs from before this version are no longer available
+
+    def token(self, version):
+        return f"{self.epoch}.{version}"
+
+    def record(self, listings_data, version):
+        """Diffs newly published listings against the previous ones. Caller holds the write lock."""
+        current = {}
+        for listing in listings_data:
+            listing_id = listing.get("id")
+            current[listing_id] = listing
+            previous = self._records.get(listing_id)
+            if previous is not listing and (previous is None or previous != listing):
+                self._versions[listing_id] = version
+                self._tombstones.pop(listing_id, None)
+        for listing_id in self._records.keys() - current.keys():
+            self._versions.pop(listing_id, None)
+            self._tombstones[listing_id] = version
+        while len(self._tombstones) > self._max_tombstones:
+            _, deleted_at = self._tombstones.popitem(last=False)
+            self._horizon = max(self._horizon, deleted_at)
+        self._records = current
+
+    def since(self, token):
+        """
+        Returns (changed listings, deleted ids) since a version token, or None if the token is
+        from another process, malformed or too old, and the client should reload everything.
+        Caller holds the read lock.
+        """
+        epoch, _, number = (token or "").partition(".")
+        if epoch != self.epoch or not number.isdigit() or int(number) < self._horizon:
+            return None
+        since = int(number)
+        changed = [self._records[i] for i, version in self._versions.items() if version > since]
+        deleted = [i for i, version in self._tombstones.items() if version > since]
+        return changed, deleted
+
+class ChangeLogIndex:
+    """
+    Base for query indexes brought up to date lazily from a store's change log: sync() applies
+    just the listings changed or deleted since the version the index last saw, or rebuilds it
+    when the log can't diff from there. Subclasses implement _rebuild(listings) and
+    _apply(changed, deleted), and use self._lock around queries.
+    """
+
+    rebuild_fraction = None # Rebuild instead of patching when more than this share of listings changed
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = None # store version the index reflects
+
+    def sync(self, listings_data, store):
+        """Brings the index up to the store's current version. Call with the store read-locked."""
+        token = store.version_token()
+        with self._lock:
+            if token == self._token:
+                return
+            delta = store.changes.since(self._token) if self._token else None
+            if delta is None or (self.rebuild_fraction is not None and
+                                 len(delta[0]) + len(delta[1]) > self.rebuild_fraction * max(len(listings_data), 1)):
+                self._rebuild(listings_data)
+            else:
+                self._apply(*delta)
+            self._token = token
+
+    def _rebuild(self, listings_data):
+        raise NotImplementedError
+
+    def _apply(self, changed, deleted):
+        raise NotImplementedError
+
+class ListingStore:
+    """
+    Owns the listings for this process. Use
+        with store.read() as listings: ...   # shared, must not mutate
+        with store.write() as txn: ...       # exclusive, saved on exit unless txn.dirty is False
+    Indexes registered with register_index() are rebuilt whenever listings are re-loaded from disk;
+    routes keep them current incrementally inside write transactions.
+    """
+
+    def __init__(self, path, load, save, invalidate=None):
+        self.path = path
+        self._load = load
+        self._save = save
+        self._invalidate = invalidate # Drops the loader's cached snapshot after an abandoned write
+        self._lock = ReadWriteLock()
+        self._listings = None
+        self._signature = None
+        self._indexes = []
+        self.version = 0 # Bumped on every commit or reload
+        self.changes = ChangeLog() # Per-listing change versions, for delta sync
+
+    def register_index(self, index):
+        """Registers an object with a rebuild(listings) method to keep in sync with reloads."""
+        self._indexes.append(index)
+        if self._listings is not None:
+            with self._lock.write():
+                index.rebuild(self._listings)
+
+    def _reload(self):
+        """Loads listings from disk and rebuilds indexes. Caller holds the write lock."""
+        self._signature = file_signature(self.path)
+        self._listings = self._load()
+        for index in self._indexes:
+            index.rebuild(self._listings)
+        self.version += 1
+        self.changes.record(self._listings, self.version) # Picks up edits made by other processes
+
+    def version_token(self):
+        """The current version as a delta-sync token. Call with the store locked."""
+        return self.changes.token(self.version)
+
+    def _rebuild_indexes(self):
+        for index in self._indexes:
+            index.rebuild(self._listings)
+
+    def _is_stale(self):
+        return self._listings is None or file_signature(self.path) != self._signature
+
+    @contextmanager
+    def read(self):
+        """Yields the current listings under a shared lock, re-loading first if another process changed the file."""
+        if self._is_stale():
+            with self._lock.write():
+                if self._is_stale():
+                    self._reload()
+        with self._lock.read():
+            yield self._listings
+
+    @contextmanager
+    def write(self):
+        """
+        Yields a Transaction under the exclusive in-process lock and the cross-process file lock.
+        On success the listings are saved (atomically) and become the new state. If the
+        transaction isn't dirty its listings are discarded; on an exception the in-memory state
+        is discarded and re-loaded from disk on next access.
+        """
+        with self._lock.write(), file_lock(f"{self.path}.lock"):
+            if self._is_stale():
+                self._reload()
+            txn = Transaction(self._listings)
+            try:
+                yield txn
+            except BaseException:
+                self._listings = None # May have been partly mutated in place
+                if self._invalidate:
+                    self._invalidate()
+                raise
+            if not txn.dirty:
+                if txn.aborted:
+                    self._rebuild_indexes() # Undo index updates made for the discarded changes
+                return
+            self._listings = txn.listings
+            self._save(self._listings)
+            self._signature = file_signature(self.path)
+            self.version += 1
+            self.changes.record(self._listings, self.version)
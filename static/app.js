@@ -58,12 +58,12 @@ document.addEventListener("DOMContentLoaded", () => {
     const pasteImageBtn = document.getElementById("pasteImageBtn");
     const pasteImageMessage = document.getElementById("pasteImageMessage"); // This should be a div or span to show messages in
 
-    // Event listener for sort dropdown
-    document.getElementById("sort").addEventListener("change", loadAndFilterListings);
+    // Event listener for sort dropdown (re-orders the existing cards)
+    document.getElementById("sort").addEventListener("change", () => syncListings());
 
-    // Event listener for group filter radios
+    // Event listener for group filter radios (no fetch needed)
     document.querySelectorAll('input[name="group"]').forEach((radio) => {
-        radio.addEventListener("change", loadAndFilterListings);
+        radio.addEventListener("change", () => renderCards());
     });
 
     // Settings button toggle
@@ -71,8 +71,10 @@ document.addEventListener("DOMContentLoaded", () => {
         let settings = document.getElementById("settingsOverlay");
         if (settings.classList.contains("visible")) {
             settings.classList.remove("visible");
+            syncListings(); // Put back the saved order if weights were previewed but not saved
         } else {
             settings.classList.add("visible");
+            loadProfiles();
         }
     });
 
@@ -106,7 +108,9 @@ document.addEventListener("DOMContentLoaded", () => {
                     sqft: sqftWeight,
                     beds: bedsWeight,
                     baths: bathsWeight,
-                    dist: distWeight
+                    dist: distWeight,
+                    // Saved to (and activates) the selected profile, or a new one if a name was typed
+                    profile: document.getElementById("profileName").value.trim() || document.getElementById("profileSelect").value
                 })
             });
 
@@ -115,7 +119,7 @@ document.addEventListener("DOMContentLoaded", () => {
             if (result.success) {
                 showMessage(document.getElementById("settingsForm"), "Settings updated successfully!");
                 document.getElementById("settingsOverlay").classList.remove("visible");
-                loadAndFilterListings(); // Reload listings with new weights
+                syncListings(); // Patch the cards whose scores changed with the new weights
             } else {
                 showMessage(document.getElementById("settingsForm"), "Failed to update settings: " + result.error, true);
             }
@@ -125,6 +129,84 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     });
 
+    // Named weight profiles: picking one fills in its weights and re-ranks the cards from its
+    // cached scores (nothing is re-computed or saved until Save makes it the active profile).
+    let weightProfiles = {};
+    function showProfileWeights(weights) {
+        document.getElementById("rent_weight").value = weights.rent;
+        document.getElementById("sqft_weight").value = weights.sqft;
+        document.getElementById("bedrooms_weight").value = weights.bedrooms;
+        document.getElementById("bathrooms_weight").value = weights.bathrooms;
+        document.getElementById("distance_weight").value = weights.distance;
+    }
+    async function loadProfiles() {
+        try {
+            const result = await (await fetch("/profiles")).json();
+            if (!result.success) return;
+            weightProfiles = result.profiles;
+            const select = document.getElementById("profileSelect");
+            select.innerHTML = "";
+            Object.keys(weightProfiles).forEach((name) => {
+                const option = document.createElement("option");
+                option.value = name;
+                option.textContent = name === result.active ? `${name} (active)` : name;
+                select.appendChild(option);
+            });
+            select.value = result.active;
+            document.getElementById("profileName").value = "";
+            showProfileWeights(weightProfiles[result.active]);
+        } catch (error) {
+            console.error("Error loading profiles:", error);
+        }
+    }
+    document.getElementById("profileSelect").addEventListener("change", async (event) => {
+        const name = event.target.value;
+        showProfileWeights(weightProfiles[name]);
+        if (document.getElementById("sort").value !== "score") return;
+        try {
+            const result = await (await fetch(`/profiles/ranking?name=${encodeURIComponent(name)}`)).json();
+            if (result.success) {
+                listingOrder = result.order;
+                renderCards();
+            }
+        } catch (error) {
+            console.error("Error ranking by profile:", error);
+        }
+    });
+
+    // Live weight preview: re-rank the cards under the weights being edited, without saving them.
+    // Only the order changes (when sorted by score); Save applies the weights for real.
+    let previewTimer = null;
+    async function previewScores() {
+        if (document.getElementById("sort").value !== "score") return;
+        try {
+            const response = await fetch("/score_preview", {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({
+                    rent: parseFloat(document.getElementById("rent_weight").value) || 0,
+                    sqft: parseFloat(document.getElementById("sqft_weight").value) || 0,
+                    beds: parseFloat(document.getElementById("bedrooms_weight").value) || 0,
+                    baths: parseFloat(document.getElementById("bathrooms_weight").value) || 0,
+                    dist: parseFloat(document.getElementById("distance_weight").value) || 0
+                })
+            });
+            const result = await response.json();
+            if (result.success) {
+                listingOrder = result.order;
+                renderCards();
+            }
+        } catch (error) {
+            console.error("Error previewing scores:", error);
+        }
+    }
+    document.querySelectorAll("#weights input").forEach((input) => {
+        input.addEventListener("input", () => {
+            clearTimeout(previewTimer);
+            previewTimer = setTimeout(previewScores, 150);
+        });
+    });
+
     // Handle automated listing submission
     const automatedListingForm = document.getElementById("addListingForm");
     automatedListingForm.addEventListener("submit", async (event) => {
@@ -174,7 +256,7 @@ document.addEventListener("DOMContentLoaded", () => {
             if (result.success) {
                 showMessage(automatedListingForm, "Listing added successfully!");
                 automatedListingForm.reset(); // Clear form
-                loadAndFilterListings(); // Refresh the list
+                syncListings(); // Add the new card (and patch re-scored ones)
             } else {
                 showMessage(automatedListingForm, "Failed to add listing: " + result.error, true);
             }
@@ -239,7 +321,7 @@ document.addEventListener("DOMContentLoaded", () => {
                 manualRoommatesInput.value = "1"; // Reset to default
                 manualOverallRatingInput.value = "5"; // Reset to default
                 document.getElementById("manualUtilityEstimate").value = ""; // Clear manual utility estimate
-                loadAndFilterListings(); // Refresh the list
+                syncListings(); // Add the new card (and patch re-scored ones)
             } else {
                 showMessage(manualInputContainer, "Failed to add listing from HTML: " + result.error, true);
             }
@@ -365,7 +447,7 @@ document.addEventListener("DOMContentLoaded", () => {
             if (result.success) {
                 showMessage(editListingForm, "Listing saved successfully!", false);
                 editPopup.classList.add("hidden");
-                loadAndFilterListings(); // Refresh the list to show updated values and scores
+                syncListings(); // Patch the edited card and any re-scored ones
             } else {
                 showMessage(editListingForm, "Error: Save operation failed: " + result.error, true);
                 editPopup.classList.add("hidden"); // Still hide on logical failure for now
@@ -405,34 +487,25 @@ document.addEventListener("DOMContentLoaded", () => {
 
                     const blob = await item.getType(mimeType);
 
-                    const reader = new FileReader();
-                    reader.onloadend = async () => {
-                        // reader.result is already the full Data URL (e.g., "data:image/png;base64,...")
-                        const fullDataUri = reader.result;
-
-                        try {
-                            const response = await fetch("/edit_listing", {
-                                method: "POST",
-                                headers: { "Content-Type": "application/json" },
-                                body: JSON.stringify({
-                                    id: parseInt(listingId),
-                                    new_image_base64: fullDataUri // Send the FULL Data URI
-                                }),
-                            });
-                            const result = await response.json();
-
-                            if (result.success) {
-                                showMessage(pasteImageMessage, "Image pasted and saved successfully!");
-                                loadAndFilterListings(); // Refresh the list to show updated images
-                            } else {
-                                showMessage(pasteImageMessage, "Failed to save image: " + result.error, true);
-                            }
-                        } catch (error) {
-                            console.error("Error sending image to backend:", error);
-                            showMessage(pasteImageMessage, "Network error saving image.", true);
+                    // Send the raw image bytes; the server streams them to disk instead of decoding base64
+                    try {
+                        const response = await fetch(`/upload_image/${parseInt(listingId)}`, {
+                            method: "POST",
+                            headers: { "Content-Type": mimeType },
+                            body: blob,
+                        });
+                        const result = await response.json();
+
+                        if (result.success) {
+                            showMessage(pasteImageMessage, "Image pasted and saved successfully!");
+                            syncListings(); // Patch the card to show the new image
+                        } else {
+                            showMessage(pasteImageMessage, "Failed to save image: " + result.error, true);
                         }
-                    };
-                    reader.readAsDataURL(blob); // Convert Blob to Data URL
+                    } catch (error) {
+                        console.error("Error sending image to backend:", error);
+                        showMessage(pasteImageMessage, "Network error saving image.", true);
+                    }
                     imageFound = true;
                     break; // Process only the first image found
                 }
@@ -454,38 +527,123 @@ document.addEventListener("DOMContentLoaded", () => {
     });
     // END NEW IMAGE PASTE LISTENER
 
-    // Function to load and display listings with current sort and filter
+    // Cards currently built, by listing id, plus the order and version they reflect.
+    // After a change the UI asks /listings/changes for just what changed since listingsVersion
+    // and patches those cards, instead of rebuilding every card from a full /listings fetch.
+    const cardsById = new Map();
+    const groupsById = new Map();
+    let listingOrder = [];
+    let listingsVersion = null;
+    let searchResults = null; // Ids matching the search box, best first (null when it's empty)
+
+    function setCard(listing) {
+        const card = createListingCard(listing);
+        const existing = cardsById.get(listing.id);
+        if (existing && existing.parentNode) {
+            existing.replaceWith(card); // Keep its place until the cards are re-ordered
+        }
+        cardsById.set(listing.id, card);
+        groupsById.set(listing.id, listing.group);
+    }
+
+    // Shows the built cards in listingOrder (or search relevance order while searching), hiding
+    // those outside the selected group. Cards are moved, not rebuilt.
+    function renderCards() {
+        const selectedGroup = document.querySelector('input[name="group"]:checked').value;
+        const visible = (searchResults || listingOrder).filter(
+            (id) => cardsById.has(id) && (selectedGroup === "none" || groupsById.get(id) === selectedGroup)
+        );
+        const visibleSet = new Set(visible);
+        cardsById.forEach((card, id) => {
+            if (!visibleSet.has(id)) card.remove();
+        });
+        const empty = listingsContainer.querySelector(".no-listings");
+        if (visible.length === 0) {
+            if (!empty) listingsContainer.innerHTML = '<p class="no-listings">No listings found for the selected criteria.</p>';
+            return;
+        }
+        if (empty) empty.remove();
+        visible.forEach((id) => listingsContainer.appendChild(cardsById.get(id)));
+    }
+
+    // Function to load and display listings with current sort and filter (full reload)
     async function loadAndFilterListings() {
         const sortBy = document.getElementById("sort").value;
-        const selectedGroup = document.querySelector('input[name="group"]:checked').value;
-    
-        // Get a reference to listingsContainer (it's already done at the top, but good to ensure scope)
-        const listingsContainer = document.getElementById("listingsContainer"); // Make sure this is accessible
     
         try {
             const response = await fetch(`/listings?sort_by=${sortBy}`);
             const listings = await response.json();
-        
+            listingsVersion = response.headers.get("X-Listings-Version");
+
             listingsContainer.innerHTML = ""; // Clear existing content
-        
-            const filteredListings = listings.filter(
-                (listing) => selectedGroup === "none" || listing.group === selectedGroup
-            );
-        
-            if (filteredListings.length === 0) {
-                listingsContainer.innerHTML = "<p>No listings found for the selected criteria.</p>";
-            } else {
-                filteredListings.forEach((listing) => {
-                    const cardElement = createListingCard(listing); // Get the returned HTML element
-                    listingsContainer.appendChild(cardElement); // <--- THIS IS THE MISSING LINE
-                });
-            }
+            cardsById.clear();
+            groupsById.clear();
+            listings.forEach(setCard);
+            listingOrder = listings.map((listing) => listing.id);
+            renderCards();
         } catch (error) {
             console.error("Error loading listings:", error);
             listingsContainer.innerHTML = '<p style="color: red;">Error loading listings.</p>';
         }
     }
 
+    // Fetches only what changed since the last load/sync and patches those cards in place.
+    // Falls back to a full reload if the server can't diff from our version.
+    async function syncListings() {
+        if (listingsVersion === null) {
+            return loadAndFilterListings();
+        }
+        const sortBy = document.getElementById("sort").value;
+        try {
+            const response = await fetch(`/listings/changes?since=${encodeURIComponent(listingsVersion)}&sort_by=${sortBy}`);
+            const delta = await response.json();
+            if (!delta.success || delta.reset) {
+                return loadAndFilterListings();
+            }
+            delta.deleted.forEach((id) => {
+                const card = cardsById.get(id);
+                if (card) card.remove();
+                cardsById.delete(id);
+                groupsById.delete(id);
+            });
+            delta.changed.forEach(setCard);
+            listingOrder = delta.order;
+            listingsVersion = delta.version;
+            if (searchResults !== null) {
+                return runSearch(); // Edited comments may change what matches
+            }
+            renderCards();
+        } catch (error) {
+            console.error("Error syncing listings:", error);
+            loadAndFilterListings();
+        }
+    }
+    window.syncListings = syncListings; // Used by the card buttons in ui.js
+
+    // Search box: shows only the matching cards, most relevant first
+    let searchTimer = null;
+    async function runSearch() {
+        const query = document.getElementById("search").value.trim();
+        if (!query) {
+            searchResults = null;
+            return renderCards();
+        }
+        try {
+            const response = await fetch(`/search?q=${encodeURIComponent(query)}`);
+            const result = await response.json();
+            if (result.success) {
+                searchResults = result.results.map((match) => match.id);
+                renderCards();
+            }
+        } catch (error) {
+            console.error("Error searching listings:", error);
+        }
+    }
+    document.getElementById("search").addEventListener("input", () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(runSearch, 150);
+    });
+
     async function loadSpiel()
     {
         try {
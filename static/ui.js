@@ -57,7 +57,7 @@ function createListingCard(listing) {
         <p><strong>Bedrooms:</strong> ${listing.bedrooms || "N/A"}</p>
         <p><strong>Bathrooms:</strong> ${listing.bathrooms || "N/A"}</p>
         <p><strong>Date Available:</strong> ${listing.date_available || "N/A"}</p>
-        <p><strong>Distance:</strong> ${listing.distance !== null && listing.distance !== undefined ? (listing.distance) : "N/A"}</p>
+        <p><strong>Distance:</strong> ${typeof listing.distance === 'number' ? `${listing.distance} mi` : (listing.distance || "N/A")}</p>
         <p><strong>Recommended Score:</strong> ${typeof listing.score === 'number' ? ((listing.score *100 ).toFixed(1)+ "%"): "N/A"}</p>
         <p><strong>Your Rating:</strong> ${listing.overall_rating || "N/A"}</p>
         <p><strong>Cost per Square Foot:</strong> $${listing.cost_per_sqft || "N/A"}</p>
@@ -66,21 +66,36 @@ function createListingCard(listing) {
         <p><a href="${listing.url}" class="hyperlink" target="_blank">Link to Zillow</a></p>
     `;
 
+    // Cards show small thumbnails; the full-size photo is only fetched when "Full size" is clicked.
+    // Older listings have no thumbnails, so their full images are used instead.
+    const images = listing.image || [];
+    const thumbnails = (listing.thumbnails && listing.thumbnails.length === images.length) ? listing.thumbnails : images;
+
+    const fullSizeLink = document.createElement("a");
+    fullSizeLink.className = "hyperlink";
+    fullSizeLink.target = "_blank";
+    fullSizeLink.textContent = "Full size";
+    fullSizeLink.href = images[0] || "#";
+    if (images.length === 0) fullSizeLink.style.display = "none";
+
     const imageElement = document.createElement("img");
     imageElement.setAttribute("index", 0);
-    imageElement.src=listing.image[0];
+    imageElement.src=thumbnails[0];
     imageElement.alt = "Listing Image";
+    imageElement.loading = "lazy";
     imageElement.style = "max-width: 100%; border-radius: 10px;";
     imageElement.addEventListener("click", () =>
     {
-        if(listing.image.length >1)
+        if(thumbnails.length >1)
         {
             var index = parseInt(imageElement.getAttribute("index"));
-            index = (index == listing.image.length - 1) ? 0 : parseInt(index + 1);
-            imageElement.src=listing.image[index];
+            index = (index == thumbnails.length - 1) ? 0 : parseInt(index + 1);
+            imageElement.src=thumbnails[index];
             imageElement.setAttribute("index", index);
+            fullSizeLink.href = images[index];
         }
     });
+    card.prepend(fullSizeLink);
     card.prepend(imageElement);
 
     const title = document.createElement("h3");
@@ -198,11 +213,9 @@ function createListingCard(listing) {
             });
             const result = await response.json();
             if (result.success) {
-                // Remove the card from the DOM directly
+                // Remove the card from the DOM directly, then patch the cards re-scored by the delete
                 card.remove();
-                // Optionally, trigger a full reload to re-sort/filter if needed,
-                // but direct removal is faster for single item deletion.
-                // loadAndFilterListings(); // Uncomment if you want a full refresh
+                if (window.syncListings) window.syncListings();
             } else {
                 alert("Error deleting listing: " + result.error);
             }
@@ -235,7 +248,8 @@ function createListingCard(listing) {
             const result = await response.json();
             if (result.success) {
                 card.dataset.group = input.value;
-                // No explicit loadAndFilterListings here for a simple group change
+                // Patch just this card, so the group filter sees the change
+                if (window.syncListings) window.syncListings();
             } else {
                 alert("Error updating group: " + result.message);
             }
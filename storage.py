@@ -0,0 +1,115 @@
+## Sky Vercauteren
+## Zillower
+## Updated july 2025
+
+import json
+import logging
+import os
+from typing import List
+
+import config # Allows access to constants like LISTINGS_FILE
+import state # File identity for the listings snapshot cache
+import codec # Schema-validated listing decode/encode (orjson when available)
+from models import Listing # Typed listing records
+
+# --- Listing storage (listings.json) ---
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Parsed snapshots of listing files, keyed on each file's (inode, mtime, size).
+# Loading only re-reads and re-validates a file when that identity changes; saving
+# refreshes the snapshot with what this process wrote.
+_listings_cache = {"signature": None, "data": None}
+_archive_cache = {"signature": None, "data": None}
+
+def _load(path, cache):
+    signature = state.file_signature(path)
+    if signature is None:
+        return []
+    if signature == cache["signature"]:
+        return cache["data"]
+
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        data = codec.decode_listings(raw) # Validated and converted to Listing records in one pass
+    except codec.DecodeError as e:
+        logging.error(f"Error decoding JSON from {path}: {e}. Returning empty list.")
+        return []
+    cache.update(signature=signature, data=data)
+    return data
+
+def _save(path, listings, cache):
+    listings = [listing if isinstance(listing, Listing) else Listing.from_dict(listing) for listing in listings]
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'wb') as f:
+        f.write(codec.encode_listings(listings, pretty=config.PRETTY_LISTINGS_FILE))
+    os.replace(temp_file, path)
+    cache.update(signature=state.file_signature(path), data=listings)
+    logging.info(f"Saved {len(listings)} listings to {path}")
+
+def load_listings() -> List[Listing]:
+    """
+    Loads listings from a JSON file as typed Listing records.
+    Returns a cached snapshot while the file is unchanged. The snapshot is shared: callers
+    that mutate it must save_listings() or invalidate_listings_cache() afterwards.
+    """
+    return _load(config.LISTINGS_FILE, _listings_cache)
+
+def invalidate_listings_cache():
+    """Forgets the cached snapshot, e.g. after in-memory changes that were abandoned without saving."""
+    _listings_cache.update(signature=None, data=None)
+
+def save_listings(listings: List[Listing]):
+    """
+    Saves listings to a JSON file (compact unless config.PRETTY_LISTINGS_FILE is set).
+    Writes a temporary file and swaps it in, so other processes never read a half-written file.
+    """
+    _save(config.LISTINGS_FILE, listings, _listings_cache)
+
+# --- Archived listings (archive.json) ---
+# Same format as listings.json, kept apart so archived listings stay out of every load,
+# save and scoring pass of the live ones.
+
+def load_archive() -> List[Listing]:
+    """Loads archived listings. Cached like load_listings."""
+    return _load(config.ARCHIVE_FILE, _archive_cache)
+
+def invalidate_archive_cache():
+    _archive_cache.update(signature=None, data=None)
+
+def save_archive(listings: List[Listing]):
+    """Saves archived listings atomically, like save_listings."""
+    # The metadata goes first and only ever grows, so it never falls behind the archive
+    _save_archive_meta(max(load_archive_highest_id(), _highest_id(listings)))
+    _save(config.ARCHIVE_FILE, listings, _archive_cache)
+
+# Metadata kept next to the archive: {"highest_id": ...}, the highest integer id ever archived.
+# Adding a listing checks it so a later restore can't meet a reused id, without decoding the archive.
+_archive_meta_cache = {"signature": None, "data": None}
+
+def _highest_id(listings):
+    return max((listing.get("id") for listing in listings if isinstance(listing.get("id"), int)), default=0)
+
+def load_archive_highest_id() -> int:
+    """The highest integer id ever archived (0 if none). Derived from the archive itself only for an archive saved before the metadata existed."""
+    signature = state.file_signature(config.ARCHIVE_META_FILE)
+    if signature is None:
+        return _highest_id(load_archive()) if state.file_signature(config.ARCHIVE_FILE) else 0
+    if signature != _archive_meta_cache["signature"]:
+        try:
+            with open(config.ARCHIVE_META_FILE, 'rb') as f:
+                highest = json.load(f)["highest_id"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.error(f"Error reading {config.ARCHIVE_META_FILE}: {e}. Deriving it from the archive.")
+            return _highest_id(load_archive())
+        _archive_meta_cache.update(signature=signature, data=highest)
+    return _archive_meta_cache["data"]
+
+def _save_archive_meta(highest):
+    temp_file = f"{config.ARCHIVE_META_FILE}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump({"highest_id": highest}, f)
+    os.replace(temp_file, config.ARCHIVE_META_FILE)
+    _archive_meta_cache.update(signature=state.file_signature(config.ARCHIVE_META_FILE), data=highest)
@@ -2,13 +2,38 @@
 ## Zillower
 ## Updated july 2025
 
-from flask import Flask, request, jsonify, render_template
-from bs4 import BeautifulSoup
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory
+from flask.json.provider import JSONProvider
 from datetime import datetime
+import base64
+import click
+import csv
+import binascii
+import heapq
+import itertools
+import math
 import os
+import time
 
 # Import functions and configurations from other modules
-import utils # For data loading, saving, scoring, scraping, etc.
+import storage # Loading and saving listings.json
+import scoring # Scores and derived cost fields
+import parsing # Listing page parsing (BeautifulSoup is loaded on first use)
+import scraping # Browser scraping (Playwright is loaded on first use)
+import dedup # Canonical listing keys and duplicate detection
+import images # Image store, re-encoding and thumbnails
+import state # Thread- and process-safe listing state
+import codec # Listing JSON codec, shared by listings.json and API responses
+import profiles # Named score weight profiles and cached score columns
+import ranking # Score-ordered index for top-K queries
+import search # Full-text index over addresses, comments and descriptions
+import spatial # Grid index of listing coordinates
+import refresh # Scheduled re-scrape with change detection
+import archive # Archive policy for the cold tier
+import importer # Batch import of saved listing pages
+import migrate # Streaming listings.json -> listings.db migration
+import formats # CSV / NDJSON / Parquet export and bulk import
+from models import Listing # Typed listing records
 
 import config # For constants like API keys, file paths, score weights
 
@@ -19,24 +44,284 @@ app = Flask(
     template_folder="templates"
 )
 
-# Global variable for listings.
-# This list will hold the current state of your listings in memory.
-# It's loaded once at startup and modified by routes, then saved.
-listings = []
+class ListingJSONProvider(JSONProvider):
+    """
+    jsonify() and request.json through the listing codec: Listing records are serialized
+    directly, compactly (orjson when available). Set app.json.pretty for indented responses.
+    """
+    pretty = False
+
+    def dumps(self, obj, **kwargs):
+        return codec.dumps(obj, pretty=self.pretty).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return codec.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(codec.dumps(obj, pretty=self.pretty), mimetype="application/json")
+
+app.json = ListingJSONProvider(app)
+
+# Listing state for this process.
+# The store loads listings once, serves reads under a shared lock and serializes writes
+# (across threads and worker processes), saving after each successful write.
+store = state.ListingStore(config.LISTINGS_FILE, storage.load_listings, storage.save_listings, storage.invalidate_listings_cache)
+# Dedup index (zpid/URL identity, normalized address, address blocks), rebuilt whenever the store re-loads
+listing_index = dedup.ListingIndex()
+store.register_index(listing_index)
+# Normalized scoring criteria and per-profile scores for the current listings, cached per store version
+score_columns = profiles.ScoreColumns()
+store.register_index(profiles.ActiveProfile())
+# Listings ordered by score, patched from the change log, for /listings?top=K
+score_index = ranking.ScoreIndex()
+# Inverted index for /search, patched from the change log like the score index
+search_index = search.SearchIndex()
+# Coordinate grid for radius and map-viewport queries on /listings
+spatial_index = spatial.SpatialIndex()
+# Archived listings (archive.json): loaded on first use, with their own search index
+archive_store = state.ListingStore(config.ARCHIVE_FILE, storage.load_archive, storage.save_archive, storage.invalidate_archive_cache)
+archive_search = search.SearchIndex()
+# Background re-scrape of stored listings (started after warm-up when REFRESH_ENABLED)
+refresher = refresh.RefreshScheduler(store)
 
 # --- Application Setup ---
-# This decorator ensures 'initialize_listings' runs once before the first request.
-# This prevents issues with Flask's reloader potentially calling it multiple times
-# during development.
-@app.before_request
-def initialize_listings():
-    global listings
-    # Only load if the 'listings' list is currently empty.
-    # This prevents reloading on every request in development with Flask's reloader.
-    if not listings: 
-        listings = utils.load_listings()
-        listings = utils.assign_scores(listings) # Assign initial scores
-        utils.save_listings(listings) # Save after initial score assignment
+# Listings are loaded, validated, migrated and scored once by warm_up(), before the server
+# accepts traffic: from __main__, from create_app() under a WSGI server, or via "flask warm".
+startup = {"ready": False, "listings": 0, "migrated": 0, "duration_ms": None, "finished_at": None}
+
+def warm_up():
+    """Loads, validates, migrates and scores the listings once, and records how long it took."""
+    start = time.perf_counter()
+    profiles.activate(profiles.load_profiles()) # Score with the saved active profile's weights
+    with store.write() as txn:
+        migrated = 0
+        for listing in txn.listings:
+            migrated += images.migrate_inline_images(listing) # Move old base64 photos into the image store
+            scoring.update_derived(listing) # Cost fields from files written by older versions may be stale
+        txn.listings = scoring.assign_scores(txn.listings) # Assign initial scores, saved on commit
+        listing_count = len(txn.listings)
+
+    duration_ms = round((time.perf_counter() - start) * 1000, 1)
+    startup.update(ready=True, listings=listing_count, migrated=migrated, duration_ms=duration_ms,
+                   finished_at=datetime.now().isoformat(timespec="seconds"))
+    print(f"Startup complete in {duration_ms} ms: {listing_count} listings loaded, {migrated} migrated.")
+
+def create_app():
+    """App factory for WSGI servers (e.g. gunicorn "zillower:create_app()"). Warms up, then returns the app."""
+    if not startup["ready"]:
+        warm_up()
+        if config.REFRESH_ENABLED:
+            refresher.start()
+    return app
+
+@app.cli.command("warm")
+def warm_command():
+    """Loads, migrates and scores listings, saving the result (flask --app zillower warm)."""
+    warm_up()
+
+@app.cli.command("geocode")
+def geocode_command():
+    """Looks up coordinates for listings that don't have them yet (flask --app zillower geocode)."""
+    with store.read() as listings:
+        missing = [(listing.get("id"), listing.get("address")) for listing in listings
+                   if listing.get("latitude") is None or listing.get("longitude") is None]
+    print(f"Geocoding {len(missing)} listings...")
+
+    # Look up outside the lock (network calls), then apply everything in one write
+    found = {}
+    for listing_id, address in missing:
+        lat, lon = parsing.geocode(address)
+        if lat is not None and lon is not None:
+            found[listing_id] = (lat, lon)
+
+    with store.write() as txn:
+        for listing_id, (lat, lon) in found.items():
+            listing = txn.edit(listing_id)
+            if listing: # May have been deleted meanwhile
+                listing["latitude"] = lat
+                listing["longitude"] = lon
+        txn.dirty = bool(found)
+    print(f"Added coordinates to {len(found)} of {len(missing)} listings.")
+
+@app.cli.command("import-html")
+@click.argument("path")
+@click.option("--workers", type=int, default=None, help="Parser processes (default: one per CPU).")
+@click.option("--roommates", type=int, default=1)
+@click.option("--rating", "overall_rating", type=int, default=5)
+@click.option("--no-enrich", is_flag=True, help="Skip gallery downloads and distance lookups.")
+def import_html_command(path, workers, roommates, overall_rating, no_enrich):
+    """Adds listings from a directory or .zip/.tar archive of saved listing pages (flask --app zillower import-html PATH)."""
+    profiles.activate(profiles.load_profiles()) # Score with the active profile's weights
+    report = _import_pages(importer.iter_sources(path), {"roommates": roommates, "overall_rating": overall_rating},
+                           workers=workers, enrich=not no_enrich)
+    for item in report["duplicates"] + report["failures"]:
+        print(f"  {item['file']}: {item['error']}")
+    print(f"{report['added']} added, {len(report['duplicates'])} duplicates, {len(report['failures'])} failed; "
+          f"parsed {report['pages_per_second']} pages/s, {report['seconds']} s in all.")
+
+@app.cli.command("migrate-db")
+@click.option("--source", default=None, help="Listings file to migrate (default: LISTINGS_FILE).")
+@click.option("--db", "database", default=None, help="SQLite database to write (default: DATABASE_FILE).")
+@click.option("--batch-size", type=int, default=None, help="Listings per transaction and checkpoint.")
+@click.option("--restart", is_flag=True, help="Start over instead of resuming an interrupted migration.")
+def migrate_db_command(source, database, batch_size, restart):
+    """Streams listings.json into listings.db with bounded memory, resuming if interrupted (flask --app zillower migrate-db)."""
+    print(migrate.migrate(source, database, batch_size, restart))
+
+@app.cli.command("refresh")
+@click.option("--all", "refresh_all", is_flag=True, help="Refresh every active listing, not just the ones due.")
+def refresh_command(refresh_all):
+    """Re-fetches listings due for a refresh and records price changes (flask --app zillower refresh)."""
+    profiles.activate(profiles.load_profiles()) # Re-score with the active profile's weights
+    if refresh_all:
+        print(refresher.run_once(force=True))
+        return
+    while True: # Batch by batch, so progress is saved as it goes
+        counts = refresher.run_once(limit=config.REFRESH_BATCH_SIZE)
+        print(counts)
+        if counts["refreshed"] < config.REFRESH_BATCH_SIZE:
+            break
+
+def _duplicate_error(scraped_data, allow_near_duplicate=False, own_id=None):
+    """
+    Checks scraped data against the dedup index. Call with the store locked.
+    Returns an error message if it duplicates a stored listing (other than own_id, for an edit), otherwise None.
+    """
+    def other(listing_id):
+        return listing_id is not None and (own_id is None or str(listing_id) != str(own_id))
+
+    if other(listing_index.find_by_url(scraped_data.get("url"))):
+        return "Listing with this URL already exists."
+    address = scraped_data.get("address")
+    if other(listing_index.find_by_address(address)):
+        return "Listing with this address already exists."
+    if not allow_near_duplicate:
+        near = listing_index.find_near_duplicate(address)
+        if near and other(near[0]):
+            near_id, similarity = near
+            return (f"Listing looks like a duplicate of listing {near_id} ({similarity:.0%} address match). "
+                    "Resubmit with allow_near_duplicate to add it anyway.")
+    return None
+
+def _url_already_listed(url):
+    """True if a listing with the same zpid/URL identity is already stored."""
+    with store.read():
+        return listing_index.find_by_url(url) is not None
+
+def _new_listing(scraped_data, data, roommates, overall_rating, listing_id):
+    """
+    Completes scraped data with user input and its derived cost fields. Returns a Listing (not yet
+    stored) with listing_id, which comes from _new_listing_ids in the write that stores it.
+    """
+    listing = Listing.from_dict(scraped_data) # Prices, sizes and distance are converted here, once
+
+    listing.update({
+        "overall_rating": overall_rating, # Use parsed overall_rating
+        "contacted": data.get("contacted", False),
+        "applied": data.get("applied", False),
+        "id": listing_id,
+        "added_at": time.time(), # The id may not be a timestamp (several adds in one second), so age goes by this
+        "group": "none", # Default group
+        "roommates": roommates, # Store the actual roommate count
+        "utility_estimate": None, # New field, default to None
+        "comments": '' # Nothing yet.
+    })
+    scoring.update_derived(listing) # All of them: every input is new
+    return listing
+
+def _add_scraped_listing(scraped_data, data, roommates, overall_rating):
+    """
+    Completes scraped data with user input and its derived cost fields, then adds it and re-scores
+    in one write transaction. Returns (listing, None) on success or (None, duplicate error).
+    """
+    # Check for duplicates against the current listings (they may have changed while scraping)
+    with store.write() as txn:
+        listing = _new_listing(scraped_data, data, roommates, overall_rating, _new_listing_ids(1, txn.listings)[0])
+        duplicate_error = _duplicate_error(listing, data.get("allow_near_duplicate", False))
+        if duplicate_error:
+            txn.dirty = False
+            return None, duplicate_error
+        txn.listings.append(listing)
+        listing_index.add(listing)
+        txn.listings = scoring.assign_scores(txn.listings) # Re-score all listings
+    return txn.find(listing["id"]), None
+
+def _new_listing_ids(count, listings):
+    """
+    count unused listing ids for a write transaction's listings: from the current YYYYmmddHHMMSS
+    timestamp, or from one past the highest live or archived id if that is higher (several adds
+    in one second, or a batch). Call it inside the write that stores them, so every add path
+    draws from the same increasing sequence and no id is ever reserved ahead of time.
+    """
+    highest = max((listing.get("id") for listing in listings if isinstance(listing.get("id"), int)), default=0)
+    highest = max(highest, storage.load_archive_highest_id()) # Restoring must not meet a reused id
+    first = max(int(datetime.now().strftime("%Y%m%d%H%M%S")), highest + 1)
+    return list(range(first, first + count))
+
+def _import_pages(sources, data, workers=None, enrich=True):
+    """
+    Adds listings from saved pages ((name, source) pairs, see importer.iter_sources): parses them
+    in a process pool, skips duplicates of stored listings (and of each other) before fetching
+    galleries and distances, then adds them all with one re-score and one save.
+    data holds the defaults /add_listing_from_html takes (roommates, overall_rating, ...).
+    Returns a report with counts, throughput and per-file failures.
+    """
+    roommates = int(data.get("roommates", 1))
+    overall_rating = int(data.get("overall_rating", 5))
+    allow_near_duplicate = data.get("allow_near_duplicate", False)
+    start = time.perf_counter()
+
+    pages, failures = importer.read_pages(sources, workers)
+    pages.sort(key=lambda item: item[0]) # Workers finish in any order; add in file order
+    parse_seconds = time.perf_counter() - start
+    files = len(pages) + len(failures)
+
+    # Don't fetch galleries and distances for pages that are already stored
+    duplicates = []
+    with store.read():
+        fresh = []
+        for name, page in pages:
+            duplicate_error = _duplicate_error(page, allow_near_duplicate)
+            if duplicate_error:
+                duplicates.append((name, duplicate_error))
+            else:
+                fresh.append((name, page))
+    if enrich:
+        pages, enrich_failures = importer.enrich_pages(fresh)
+        failures.extend(enrich_failures)
+    else:
+        pages = [(name, importer.without_enrichment(page)) for name, page in fresh]
+
+    added = []
+    with store.write() as txn:
+        for (name, page), listing_id in zip(pages, _new_listing_ids(len(pages), txn.listings)):
+            listing = _new_listing(page, data, roommates, overall_rating, listing_id)
+            duplicate_error = _duplicate_error(listing, allow_near_duplicate) # Also catches two saves of one listing
+            if duplicate_error:
+                duplicates.append((name, duplicate_error))
+                continue
+            txn.listings.append(listing)
+            listing_index.add(listing)
+            added.append(listing_id)
+        if added:
+            txn.listings = scoring.assign_scores(txn.listings) # One re-score for the whole batch
+        else:
+            txn.dirty = False
+
+    seconds = time.perf_counter() - start
+    print(f"Imported {len(added)} of {files} saved pages in {seconds:.1f} s "
+          f"({len(duplicates)} duplicates, {len(failures)} failures).")
+    return {
+        "files": files,
+        "added": len(added),
+        "ids": added,
+        "duplicates": [{"file": name, "error": error} for name, error in sorted(duplicates)],
+        "failures": [{"file": name, "error": error} for name, error in sorted(failures)],
+        "seconds": round(seconds, 2),
+        "parse_seconds": round(parse_seconds, 2),
+        "pages_per_second": round(files / parse_seconds, 1) if parse_seconds else None,
+    }
 
 # --- Routes ---
 
@@ -45,45 +330,197 @@ def home():
     """Renders the main UI.html page."""
     return render_template("UI.html")
 
+@app.route("/images/<path:filename>")
+def serve_image(filename):
+    """Serves a stored photo or thumbnail. Names are content hashes, so they can be cached forever."""
+    return send_from_directory(os.path.abspath(config.IMAGE_DIR), filename, max_age=31536000)
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """Readiness probe: 200 with startup stats once warm-up has finished, 503 before that."""
+    return jsonify(startup), (200 if startup["ready"] else 503)
+
+@app.route("/http_stats", methods=["GET"])
+def http_stats():
+    """Returns per-host latency, error and circuit breaker counters for outbound requests."""
+    import http_client # Not loaded until the first outbound request or this endpoint
+    return jsonify(http_client.host_stats())
+
+@app.route("/refresh_status", methods=["GET"])
+def refresh_status():
+    """Returns the refresh scheduler's counters and how many listings are due now."""
+    with store.read() as listings:
+        due = len(refresh.due_listings(listings, time.time()))
+    return jsonify(dict(refresher.stats, due=due))
+
+# /update_settings, /profiles and /score_preview weight names -> SCORE_WEIGHTS keys
+_WEIGHT_PARAMS = {"rent": "rent", "sqft": "sqft", "beds": "bedrooms", "baths": "bathrooms", "dist": "distance"}
+
+def _weights_from_request(data, base):
+    """
+    A copy of base with any weights given in the request (by _WEIGHT_PARAMS name). Raises ValueError
+    unless each is a finite number from 0 to 1 and the resulting weights add up to at most 1.
+    """
+    weights = dict(base)
+    for param, key in _WEIGHT_PARAMS.items():
+        if data.get(param) is not None:
+            try:
+                weights[key] = float(data[param])
+            except (TypeError, ValueError):
+                raise ValueError(f"Weight '{param}' must be a number.") from None
+            if not (math.isfinite(weights[key]) and 0 <= weights[key] <= 1): # float() accepts "nan" and "inf"
+                raise ValueError(f"Weight '{param}' must be a number from 0 to 1.")
+    profiles.check_weights(weights)
+    return weights
+
+def _rescore_for_profile(txn, profile_data):
+    """
+    Makes profile_data's active profile the scoring weights and updates the stored scores from
+    its cached score column. Cost fields don't depend on the weights, so nothing else is recomputed;
+    only listings whose score changed are copied, and nothing is saved if none did.
+    """
+    profiles.activate(profile_data)
+    _, scores = score_columns.scores(txn.listings, store, profile_data["active"], config.SCORE_WEIGHTS)
+    rescored = []
+    changed = False
+    for listing, score in zip(txn.listings, scores):
+        if listing.get("score") != score:
+            listing = listing.copy()
+            listing["score"] = score
+            changed = True
+        rescored.append(listing)
+    txn.listings = rescored
+    txn.dirty = changed
+
 @app.route("/update_settings", methods=["POST"])
 def update_settings():
-    """Updates the origin address and score weights."""
+    """
+    Updates the origin address and score weights. The weights are saved to the active profile,
+    or to ?profile / "profile" (created if new), which then becomes the active one.
+    """
     data = request.json
     print(data)
     address = data.get("address")
 
     if address:
-        config.ORIGIN_ADDRESS = address # Update the global in config.py
-        
-        # Update score weights in config.py
-        # Ensure these keys match the frontend settings for
-        config.SCORE_WEIGHTS["rent"] = float(data.get("rent"))
-        config.SCORE_WEIGHTS["sqft"] = float(data.get("sqft"))
-        config.SCORE_WEIGHTS["bedrooms"] = float(data.get("beds"))
-        config.SCORE_WEIGHTS["bathrooms"] = float(data.get("baths"))
-        config.SCORE_WEIGHTS["distance"] = float(data.get("dist"))
-        
-        global listings
-        listings = utils.load_listings() # Re-load to ensure the latest state before re-scoring
-        # Re-calculate cost_per_roommate for all listings based on current roommates if utilities are added
-        for listing in listings:
-            rent = utils.currency_to_float(listing.get("price")) # Get clean rent
-            num_roommates = listing.get("roommates", 1)
-            utility_est = listing.get("utility_estimate") # Get existing utility estimate
+        try:
+            weights = _weights_from_request(data, config.SCORE_WEIGHTS)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        def save_weights(profile_data):
+            name = str(data.get("profile") or profile_data["active"])
+            profile_data["profiles"][name] = weights
+            profile_data["active"] = name
+
+        with store.write() as txn:
+            config.ORIGIN_ADDRESS = address # Update the global in config.py
+            profile_data = profiles.update_profiles(save_weights)
+            _rescore_for_profile(txn, profile_data) # Re-assign scores with the new weights
+
+        return jsonify({"success": True, "message": "Settings updated!", "new_origin": config.ORIGIN_ADDRESS,
+                        "profile": profile_data["active"]})
+    
+    return jsonify({"success": False, "error": "Invalid address"})
+
+@app.route("/profiles", methods=["GET"])
+def get_profiles():
+    """Lists the named weight profiles and which one is active."""
+    profile_data = profiles.load_profiles()
+    return jsonify({"success": True, "active": profile_data["active"], "profiles": profile_data["profiles"]})
+
+@app.route("/profiles", methods=["POST"])
+def save_profile():
+    """
+    Creates or updates a named profile from {"name": ..., "rent": ..., "dist": ..., ...} (weights
+    not given keep their current values). With "activate": true, or if it is already the active
+    profile, the listings are re-scored with it.
+    """
+    data = request.get_json(silent=True) or {}
+    name = str(data.get("name") or "").strip()
+    if not name:
+        return jsonify({"success": False, "error": "Profile name is required."}), 400
+    try:
+        current = profiles.load_profiles()
+        weights = _weights_from_request(data, current["profiles"].get(name, config.SCORE_WEIGHTS))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    def save(profile_data):
+        profile_data["profiles"][name] = weights
+        if data.get("activate"):
+            profile_data["active"] = name
+
+    with store.write() as txn:
+        profile_data = profiles.update_profiles(save)
+        if profile_data["active"] == name:
+            _rescore_for_profile(txn, profile_data)
+        else:
+            txn.dirty = False
+    return jsonify({"success": True, "active": profile_data["active"], "profiles": profile_data["profiles"]})
+
+@app.route("/profiles/activate", methods=["POST"])
+def activate_profile():
+    """Switches the active profile. Its scores come from the cached column: no re-normalization."""
+    name = (request.get_json(silent=True) or {}).get("name")
+
+    def switch(profile_data):
+        if name not in profile_data["profiles"]:
+            raise ValueError(f"No profile named {name!r}.")
+        profile_data["active"] = name
+
+    with store.write() as txn:
+        try:
+            profile_data = profiles.update_profiles(switch)
+        except ValueError as e:
+            txn.dirty = False
+            return jsonify({"success": False, "error": str(e)}), 404
+        _rescore_for_profile(txn, profile_data)
+    print(f"Active score profile: {name}")
+    return jsonify({"success": True, "active": name})
+
+@app.route("/profiles/delete", methods=["POST"])
+def delete_profile():
+    """Deletes a profile. The active profile can't be deleted."""
+    name = (request.get_json(silent=True) or {}).get("name")
+
+    def remove(profile_data):
+        if name not in profile_data["profiles"]:
+            raise ValueError(f"No profile named {name!r}.")
+        if name == profile_data["active"]:
+            raise ValueError("The active profile can't be deleted.")
+        del profile_data["profiles"][name]
 
-            listing["cost_per_roommate"] = utils.calculate_cost_per_occupant(rent, num_roommates, utility_estimate=utility_est)
+    try:
+        profile_data = profiles.update_profiles(remove)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, "active": profile_data["active"], "profiles": profile_data["profiles"]})
 
-        listings = utils.assign_scores(listings) # Re-assign scores with new weights
-        utils.save_listings(listings) # Save the updated listings
+@app.route("/profiles/ranking", methods=["GET"])
+def profile_ranking():
+    """
+    The listings ranked under ?name=<profile> (default: the active one) without switching to it:
+    ids best first ("order", at most ?top= of them) and their "scores", from the cached column.
+    """
+    profile_data = profiles.load_profiles()
+    name = request.args.get("name") or profile_data["active"]
+    if name not in profile_data["profiles"]:
+        return jsonify({"success": False, "error": f"No profile named {name!r}."}), 404
+    try:
+        top = int(request.args["top"]) if request.args.get("top") else None
+    except ValueError:
+        return jsonify({"success": False, "error": "top must be a number."}), 400
 
-        return jsonify({"success": True, "message": "Settings updated!", "new_origin": config.ORIGIN_ADDRESS})
-    
-    return jsonify({"success": False, "error": "Invalid address"})
+    with store.read() as listings:
+        version = store.version_token()
+        ids, scores = score_columns.scores(listings, store, name, profile_data["profiles"][name])
+    order, ranked_scores = profiles.ranking(ids, scores, top)
+    return jsonify({"success": True, "version": version, "profile": name, "order": order, "scores": ranked_scores})
 
 @app.route("/add_listing_from_html", methods=["POST"])
 def add_listing_from_html():
     """Adds a new listing by parsing raw HTML provided by the user."""
-    global listings
     data = request.json
     raw_html = data.get("raw_html")
     original_url = data.get("url")
@@ -94,56 +531,27 @@ def add_listing_from_html():
     if not raw_html:
         return jsonify({"success": False, "error": "No HTML content provided."})
 
+    # Check for an existing listing with the same URL before doing any parsing or image/distance fetching
+    if _url_already_listed(original_url):
+        print(f"Listing for {original_url} already exists. Skipping HTML parsing.")
+        return jsonify({"success": False, "error": "Listing with this URL already exists."})
+
     try:
-        soup = BeautifulSoup(raw_html, "html.parser")
-        scraped_data = utils._parse_zillow_html(soup, original_url) # Use utility function for parsing
+        scraped_data = parsing.parse_html(raw_html, original_url) # Shared listing page parser
 
         if not scraped_data or not scraped_data.get("address") or scraped_data.get("address") == "Address not found":
             print("Manual HTML parsing failed or no valid address found.")
             return jsonify({"success": False, "error": "Could not parse listing details from the provided HTML. Please ensure it's the full page source of a Zillow listing."})
 
-        # Load current listings to check for duplicates
-        listings = utils.load_listings()
-
-        scraped_address_normalized = scraped_data.get("address", "").strip().lower()
-        if all(listing.get("address", "").strip().lower() != scraped_address_normalized for listing in listings):
-            rent = utils.currency_to_float(scraped_data.get("price")) # Clean rent early
-            sqft = scraped_data.get("square_footage")
-
-            # Calculate cost per sqft
-            if sqft is not None and sqft > 0 and rent is not None and rent > 0:
-                scraped_data["cost_per_sqft"] = f"{rent / sqft:.2f}"
-            else:
-                scraped_data["square_footage"] = -1 # Indicate missing/invalid sqft
-                scraped_data["cost_per_sqft"] = "N/A"
-
-            # Calculate cost per roommate using the new utility function
-            scraped_data["cost_per_roommate"] = utils.calculate_cost_per_occupant(rent, roommates)
-            
-            timestamp = int(datetime.now().strftime("%Y%m%d%H%M%S"))
-
-            scraped_data.update({
-                "overall_rating": overall_rating, # Use parsed overall_rating
-                "contacted": data.get("contacted", False),
-                "applied": data.get("applied", False),
-                "id": timestamp,
-                "url": original_url,
-                "group": "none", # Default group
-                "roommates": roommates, # Store the actual roommate count
-                "utility_estimate": None, # New field, default to None
-                "comments": '' # Nothing yet. 
-            })
-
-            listings.append(scraped_data)
-            listings = utils.assign_scores(listings) # Re-score all listings
-            utils.save_listings(listings) # Save updated listings
-
+        scraped_data["url"] = original_url
+        listing, duplicate_error = _add_scraped_listing(scraped_data, data, roommates, overall_rating)
+        if listing:
             print("Listing successfully added from manual HTML and saved.")
-            return jsonify({"success": True, "listing": scraped_data})
+            return jsonify({"success": True, "listing": listing})
 
         else:
-            print("Failed to add from manual HTML. Listing already exists based on address.")
-            return jsonify({"success": False, "error": "Listing with this address already exists."})
+            print(f"Failed to add from manual HTML. {duplicate_error}")
+            return jsonify({"success": False, "error": duplicate_error})
 
     except Exception as e:
         print(f"Error processing manual HTML: {e}")
@@ -151,17 +559,55 @@ def add_listing_from_html():
         traceback.print_exc() # Print full traceback for debugging
         return jsonify({"success": False, "error": f"An error occurred while processing HTML: {str(e)}"})
 
+@app.route("/import_html", methods=["POST"])
+def import_html():
+    """
+    Adds listings from an uploaded .zip/.tar archive of saved listing pages (a multipart
+    'archive' file, or the raw request body). Form or query fields: roommates, overall_rating,
+    allow_near_duplicate, and enrich=false to skip gallery downloads and distance lookups.
+    Returns counts, throughput and the files that were duplicates or failed to parse.
+    """
+    if request.content_length is not None and request.content_length > config.MAX_IMPORT_BYTES:
+        return jsonify({"success": False, "error": "Archive is too large."}), 413
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("archive")
+        if not upload:
+            return jsonify({"success": False, "error": "No 'archive' file in upload."}), 400
+        stream = upload.stream
+    else:
+        stream = request.stream
+    options = request.form if request.mimetype == "multipart/form-data" else request.args
+
+    try:
+        data = {"roommates": int(options.get("roommates", 1)), "overall_rating": int(options.get("overall_rating", 5)),
+                "allow_near_duplicate": options.get("allow_near_duplicate", "").lower() in ("true", "1", "yes")}
+        path = importer.receive_file(stream, config.MAX_IMPORT_BYTES)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    try:
+        report = _import_pages(importer.iter_sources(path), data, enrich=options.get("enrich", "").lower() != "false")
+    except ValueError: # Not a zip or tar archive
+        return jsonify({"success": False, "error": "Upload is not a zip or tar archive of saved pages."}), 400
+    finally:
+        os.remove(path)
+    return jsonify(dict(report, success=True))
+
 @app.route("/add_listing", methods=["POST"])
 def add_listing():
     """Adds a new listing by scraping a URL."""
-    global listings
     data = request.json
     url = data.get("url")
     roommates = int(data.get("roommates", 0)) # Change default to 0 for "living by myself"
     overall_rating = int(data.get("overall_rating", 5))
 
+    # Check for an existing listing with the same URL before launching a browser
+    if _url_already_listed(url):
+        print(f"Listing for {url} already exists. Skipping scrape.")
+        return jsonify({"success": False, "error": "Listing with this URL already exists."})
+
     print(f"Attempting to add listing from {url}. Launching Playwright browser.")
-    scraped_data = utils.scrape_zillow(url, headless=False) # Use utility function for scraping
+    # Concurrent requests for the same listing share one in-flight scrape
+    scraped_data = scraping.scrape_zillow_single_flight(url, headless=False)
 
     if "error" in scraped_data:
         print(f"Scraping failed with error: {scraped_data['error']}")
@@ -171,47 +617,14 @@ def add_listing():
         print("Scraping failed or returned incomplete data. Cannot add listing.")
         return jsonify({"success": False, "error": "Scraping failed or no valid address found. Please check URL and solve any challenges."})
 
-    # Load current listings to check for duplicates
-    listings = utils.load_listings()
-
-    scraped_address_normalized = scraped_data.get("address", "").strip().lower()
-    if all(listing.get("address", "").strip().lower() != scraped_address_normalized for listing in listings):
-        rent = utils.currency_to_float(scraped_data.get("price")) # Clean rent early
-        sqft = scraped_data.get("square_footage")
-
-        # Calculate cost per sqft
-        if sqft is not None and sqft > 0 and rent is not None and rent > 0:
-            scraped_data["cost_per_sqft"] = f"{rent / sqft:.2f}"
-        else:
-            scraped_data["square_footage"] = -1
-            scraped_data["cost_per_sqft"] = "N/A"
-
-        # Calculate cost per roommate using the new utility function
-        scraped_data["cost_per_roommate"] = utils.calculate_cost_per_occupant(rent, roommates)
-        
-        timestamp = int(datetime.now().strftime("%Y%m%d%H%M%S"))
-
-        scraped_data.update({
-            "overall_rating": overall_rating, # Use parsed overall_rating
-            "contacted": data.get("contacted", False),
-            "applied": data.get("applied", False),
-            "id": timestamp,
-            "group": "none",
-            "roommates": roommates, # Store the actual roommate count
-            "utility_estimate": None, # New field, default to None
-            "comments": '' # Nothing yet. 
-        })
-
-        listings.append(scraped_data)
-        listings = utils.assign_scores(listings) # Re-score all listings
-        utils.save_listings(listings) # Save updated listings
-
+    listing, duplicate_error = _add_scraped_listing(scraped_data, data, roommates, overall_rating)
+    if listing:
         print("Listing successfully added and saved.")
-        return jsonify({"success": True, "listing": scraped_data})
+        return jsonify({"success": True, "listing": listing})
 
     else:
-        print("Failed to add. Listing already exists based on address.")
-        return jsonify({"success": False, "error": "Listing with this address already exists."})
+        print(f"Failed to add. {duplicate_error}")
+        return jsonify({"success": False, "error": duplicate_error})
 
 @app.route("/contacted", methods=["POST"])
 def contacted():
@@ -220,15 +633,13 @@ def contacted():
     listing_id = int(data.get("id")) if data.get("id") else None
     checked = data.get("selected") if data.get("selected") else False
     
-    global listings
-    for listing in listings:
-        stored_id = int(listing.get("id"))
-
-        if stored_id == listing_id:
+    with store.write() as txn:
+        listing = txn.edit(listing_id)
+        if listing:
             listing["contacted"] = checked
-            utils.save_listings(listings)
             return jsonify({"success": True, "listing": listing})
-        
+        txn.dirty = False
+
     return jsonify({"success": False, "error": "Listing not found"}), 404
         
 @app.route("/applied", methods=["POST"])
@@ -238,15 +649,13 @@ def applied():
     listing_id = int(data.get("id")) if data.get("id") else None
     checked = data.get("selected") if data.get("selected") else False
     
-    global listings
-    for listing in listings:
-        stored_id = int(listing.get("id"))
-
-        if stored_id == listing_id:
+    with store.write() as txn:
+        listing = txn.edit(listing_id)
+        if listing:
             listing["applied"] = checked
-            utils.save_listings(listings)
             return jsonify({"success": True, "listing": listing})
-    
+        txn.dirty = False
+
     return jsonify({"success": False, "error": "Listing not found"}), 404
 
 @app.route("/update_group", methods=["POST"])
@@ -255,14 +664,13 @@ def update_group():
     data = request.json
     listing_id = data.get("id")
     
-    global listings
-    listing = next((l for l in listings if l.get("id") == listing_id), None)
-    
-    if listing:
-        listing["group"] = data["group"]
-        utils.save_listings(listings)
-        return jsonify({"success": True, "listing": listing})
-    
+    with store.write() as txn:
+        listing = txn.edit(listing_id)
+        if listing:
+            listing["group"] = data["group"]
+            return jsonify({"success": True, "listing": listing})
+        txn.dirty = False
+
     return jsonify({"success": False, "message": "Listing not found"}), 404
 
 @app.route("/edit_listing", methods=["POST"])
@@ -270,66 +678,111 @@ def edit_listing():
     """Edits details of an existing listing."""
     data = request.json
     listing_id = int(data.get("id")) if data.get("id") else None
-    
-    global listings
-
-    found_listing = False
-    for listing in listings:
-        stored_id = int(listing.get("id"))
-
-        if stored_id == listing_id:
-            new_image_data_uri = data.get("new_image_base64")
-            if new_image_data_uri and isinstance(new_image_data_uri, str) and new_image_data_uri.startswith("data:") and len(new_image_data_uri) > 50:
-                if 'image' not in listing or not isinstance(listing['image'], list):
-                    listing['image'] = []
-                listing['image'].append(new_image_data_uri)
-                print(f"Appended new image to listing {listing_id}. Total images: {len(listing['image'])}")
-                # If only adding an image, save and return early
-                if len(data) == 2 and "id" in data and "new_image_base64" in data:
-                    utils.save_listings(listings)
-                    return jsonify({"success": True, "listing": listing})
-            elif new_image_data_uri:
-                print(f"Warning: Invalid image data URI received for listing {listing_id}. Not appended. Data URI starts with: {new_image_data_uri[:50]}...")
-            
-            # Update other fields if present in the request
-            if "address" in data: listing["address"] = data["address"]
-            if "price" in data: listing["price"] = utils.currency_to_float(data["price"])
-            if "square_footage" in data: listing["square_footage"] = int(float(data["square_footage"])) if data["square_footage"] is not None else -1
-            if "bedrooms" in data: listing["bedrooms"] = int(float(data["bedrooms"])) if data["bedrooms"] is not None else -1
-            if "bathrooms" in data: listing["bathrooms"] = float(data["bathrooms"]) if data["bathrooms"] is not None else -1.0
-            if "date_available" in data: listing["date_available"] = data["date_available"]
-            if "overall_rating" in data: listing["overall_rating"] = int(data["overall_rating"])
-            # Update roommates count
-            if "roommates" in data: listing["roommates"] = int(data["roommates"])
-            # New: Update utility estimate
-            if "utility_estimate" in data: 
-                # Convert to float, None if empty string or "N/A"
-                utility_val = data["utility_estimate"]
-                listing["utility_estimate"] = float(utility_val) if utility_val not in ["", None, "N/A"] else None
-
-            # Recalculate derived fields
-            rent = listing.get("price")
-            sqft = listing.get("square_footage")
-            num_roommates = listing.get("roommates", 0) # Use the updated roommates
-            utility_est = listing.get("utility_estimate") # Use the updated utility estimate
-
-            if sqft is not None and sqft > 0 and rent is not None and rent > 0:
-                listing["cost_per_sqft"] = f"{rent / sqft:.2f}"
-            else:
-                listing["cost_per_sqft"] = "N/A"
 
-            # Calculate cost per roommate using the utility function
-            listing["cost_per_roommate"] = utils.calculate_cost_per_occupant(rent, num_roommates, utility_estimate=utility_est)
+    # Decode a pasted data URI and run it through the image pipeline (re-encode, cap size, thumbnail)
+    # before taking the lock, since that is the slow part
+    stored = None
+    new_image_data_uri = data.get("new_image_base64")
+    if new_image_data_uri and isinstance(new_image_data_uri, str) and new_image_data_uri.startswith("data:") and len(new_image_data_uri) > 50:
+        header, _, encoded = new_image_data_uri.partition(",")
+        content_type = header[len("data:"):].split(";")[0]
+        try:
+            stored = images.store_image(base64.b64decode(encoded), content_type)
+        except (binascii.Error, ValueError):
+            stored = None
+        if not stored:
+            return jsonify({"success": False, "error": "Uploaded data is not a readable image."})
+    elif new_image_data_uri:
+        print(f"Warning: Invalid image data URI received for listing {listing_id}. Not appended. Data URI starts with: {new_image_data_uri[:50]}...")
+
+    with store.write() as txn:
+        listing = txn.edit(listing_id)
+        if not listing:
+            txn.dirty = False
+            return jsonify({"success": False, "error": "Listing not found"})
+
+        if stored:
+            images.add_to_listing(listing, stored)
+            print(f"Appended new image to listing {listing_id}. Total images: {len(listing['image'])}")
+            # If only adding an image, save and return early
+            if len(data) == 2 and "id" in data and "new_image_base64" in data:
+                return jsonify({"success": True, "listing": listing})
+
+        # Update other fields if present in the request; the Listing converts each value to its type
+        # (prices and sizes to numbers, "" / "N/A" / null to None). Only the cost fields that
+        # depend on changed fields are recomputed, and only a change to a score input re-scores.
+        changed = scoring.apply_changes(listing, {field: data[field] for field in EDIT_FIELDS if field in data})
+        if not changed and not stored:
+            txn.dirty = False # Nothing to save
+        if "address" in changed:
+            listing_index.add(listing) # Re-index for the new address
+        if changed & scoring.SCORE_INPUTS:
+            txn.listings = scoring.assign_scores(txn.listings) # Re-score all listings (the ranges may have changed)
+            listing = txn.find(listing_id)
+
+    return jsonify({"success": True, "listing": listing})
+
+@app.route("/upload_image/<int:listing_id>", methods=["POST"])
+def upload_image(listing_id):
+    """
+    Adds a photo to a listing from a raw binary request body (or a multipart 'image' field).
+    The body is streamed to disk in chunks with a size limit and content sniffing, so it is
+    never held in memory or base64-encoded.
+    """
+    with store.read() as current:
+        found = any(str(l.get("id")) == str(listing_id) for l in current)
+    if not found:
+        return jsonify({"success": False, "error": "Listing not found"}), 404
+
+    if request.content_length is not None and request.content_length > config.MAX_UPLOAD_BYTES:
+        return jsonify({"success": False, "error": "Image is too large."}), 413
+
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("image")
+        if not upload:
+            return jsonify({"success": False, "error": "No 'image' file in upload."}), 400
+        stream = upload.stream
+    else:
+        stream = request.stream
 
-            found_listing = True
-            break
+    received = images.receive_upload(stream, config.MAX_UPLOAD_BYTES)
+    if "error" in received:
+        return jsonify({"success": False, "error": received["error"]}), received["status"]
 
-    if found_listing:
-        listings = utils.assign_scores(listings) # Re-score all listings after edit
-        utils.save_listings(listings)
+    try:
+        with open(received["path"], "rb") as f:
+            stored = images.store_image(f, received["content_type"])
+    finally:
+        os.remove(received["path"])
+    if not stored:
+        return jsonify({"success": False, "error": "Uploaded data is not a readable image."}), 415
+
+    with store.write() as txn:
+        listing = txn.edit(listing_id)
+        if not listing: # Deleted while the upload was streaming
+            txn.dirty = False
+            return jsonify({"success": False, "error": "Listing not found"}), 404
+        images.add_to_listing(listing, stored)
+        print(f"Uploaded {received['size']} byte image to listing {listing_id}. Total images: {len(listing['image'])}")
         return jsonify({"success": True, "listing": listing})
 
-    return jsonify({"success": False, "error": "Listing not found"})
+def _remove_unused_images(removed):
+    """Deletes the stored photos of removed listings that no live or archived listing still uses."""
+    names = images.referenced_names(removed)
+    if not names:
+        return
+    with store.read() as listings, archive_store.read() as archived_listings:
+        referenced = images.referenced_names(itertools.chain(listings, archived_listings))
+    count = images.remove_images(names, referenced)
+    if count:
+        print(f"Removed {count} images no listing uses any more.")
+
+@app.cli.command("gc-images")
+def gc_images_command():
+    """Deletes stored photos that no live or archived listing refers to (flask --app zillower gc-images)."""
+    with store.read() as listings, archive_store.read() as archived_listings:
+        referenced = images.referenced_names(itertools.chain(listings, archived_listings))
+    print(f"Removed {images.collect_garbage(referenced)} unreferenced images from {config.IMAGE_DIR}.")
 
 @app.route("/delete_listing", methods=["POST"])
 def delete_listing():
@@ -337,48 +790,160 @@ def delete_listing():
     data = request.json
     listing_id = data.get("id")
 
-    global listings
-    initial_len = len(listings)
-    
-    # Filter out the listing to be deleted
-    listings = [listing for listing in listings if listing.get("id") != listing_id]
-    
-    if len(listings) < initial_len:
-        print(f"Deleted listing with ID: {listing_id}")
-        # Only re-assign scores if there are listings left
-        if listings:
-            # Re-calculate cost_per_roommate for all listings if needed (less critical here)
-            for listing in listings:
-                rent = utils.currency_to_float(listing.get("price"))
-                num_roommates = listing.get("roommates", 0)
-                utility_est = listing.get("utility_estimate")
-                listing["cost_per_roommate"] = utils.calculate_cost_per_occupant(rent, num_roommates, utility_estimate=utility_est)
-
-            listings = utils.assign_scores(listings)
-        utils.save_listings(listings)
+    with store.write() as txn:
+        removed = [listing for listing in txn.listings if listing.get("id") == listing_id]
+
+        # Filter out the listing to be deleted
+        txn.listings = [listing for listing in txn.listings if listing.get("id") != listing_id]
+
+        if removed:
+            print(f"Deleted listing with ID: {listing_id}")
+            listing_index.remove(listing_id)
+            # Re-score the remaining listings (the min/max ranges may have changed)
+            txn.listings = scoring.assign_scores(txn.listings)
+        else:
+            txn.dirty = False
+    if removed:
+        _remove_unused_images(removed) # Once the delete is saved
         return jsonify({"success": True, "id": listing_id})
-    
+
     print(f"Listing with ID: {listing_id} not found for deletion.")
     return jsonify({"success": False, "error": "Listing not found for deletion."}), 404
 
-@app.route("/listings", methods=["GET"])
-def get_listings():
-    """Retrieves and returns all listings, optionally sorted."""
-    sort_by = request.args.get("sort_by", "score") # Default sort by score
+# Fields a batch "set" may change: none of them feed the scores
+FLAG_FIELDS = ("contacted", "applied", "group", "comments")
+# Fields /edit_listing and a batch "edit" may change: most of them feed the cost fields or score
+EDIT_FIELDS = ("address", "price", "square_footage", "bedrooms", "bathrooms", "date_available",
+               "overall_rating", "roommates", "utility_estimate")
+
+def _batch_operation_ids(operation):
+    """The ids an operation targets ('id' or 'ids'), or None if it has none."""
+    ids = operation.get("ids")
+    if ids is None and operation.get("id") is not None:
+        ids = [operation["id"]]
+    if not isinstance(ids, list) or not ids:
+        return None
+    return ids
+
+def _apply_batch_operation(txn, operation):
+    """
+    Applies one /listings/batch operation inside txn. Returns (ids, error, rescore): the ids
+    it changed, an error message if it can't be applied, and whether scores need recomputing
+    (a delete, or an edit that changed a score input).
+    """
+    if not isinstance(operation, dict):
+        return None, "Operation must be an object.", False
+    kind = operation.get("op")
+    ids = _batch_operation_ids(operation)
+    if ids is None:
+        return None, "Operation needs an 'id' or a non-empty list of 'ids'.", False
+
+    if kind == "delete":
+        wanted = {str(listing_id) for listing_id in ids}
+        deleted = [listing.get("id") for listing in txn.listings if str(listing.get("id")) in wanted]
+        if len(deleted) < len(wanted):
+            found = {str(listing_id) for listing_id in deleted}
+            return None, f"Listing not found: {', '.join(sorted(wanted - found))}", False
+        txn.listings = [listing for listing in txn.listings if str(listing.get("id")) not in wanted]
+        for listing_id in deleted:
+            listing_index.remove(listing_id)
+        return deleted, None, True
+
+    if kind == "group":
+        if not isinstance(operation.get("group"), str):
+            return None, "'group' must be a string.", False
+        fields, allowed = {"group": operation["group"]}, FLAG_FIELDS
+    elif kind in ("set", "edit"):
+        fields = operation.get("fields")
+        allowed = FLAG_FIELDS if kind == "set" else EDIT_FIELDS
+        if not isinstance(fields, dict) or not fields:
+            return None, "'fields' must be a non-empty object.", False
+    else:
+        return None, f"Unknown operation: {kind!r}", False
+
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        return None, f"Fields not allowed for '{kind}': {', '.join(unknown)}", False
+
+    changed = []
+    rescore = False
+    for listing_id in ids:
+        listing = txn.edit(listing_id)
+        if not listing:
+            return None, f"Listing not found: {listing_id}", False
+        changed_fields = scoring.apply_changes(listing, fields) # Also recomputes dependent cost fields
+        if "address" in changed_fields:
+            listing_index.add(listing) # Re-index for the new address
+        rescore = rescore or not changed_fields.isdisjoint(scoring.SCORE_INPUTS)
+        changed.append(listing.get("id"))
+    return changed, None, rescore
+
+@app.route("/listings/batch", methods=["POST"])
+def batch_listings():
+    """
+    Applies a list of operations atomically: either all of them or none. Each is one of
+        {"op": "set", "ids": [...], "fields": {"contacted": true, ...}}    (contacted, applied, group, comments)
+        {"op": "group", "ids": [...], "group": "red"}
+        {"op": "edit", "id": ..., "fields": {"price": 1850, ...}}          (the /edit_listing fields)
+        {"op": "delete", "ids": [...]}
+    ("id" works in place of "ids" everywhere.) Operations run in order, each recomputing only the
+    cost fields its changes feed into; then scores are recomputed once (if anything that feeds
+    them changed) and the file is saved once.
+    Returns a result per operation and the changed listings as they were saved.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get("operations") if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"success": False, "error": "Expected {\"operations\": [...]}."}), 400
+    if len(operations) > config.MAX_BATCH_OPERATIONS:
+        return jsonify({"success": False, "error": f"At most {config.MAX_BATCH_OPERATIONS} operations per batch."}), 400
+
+    results = []
+    with store.write() as txn:
+        before = txn.listings # The records as they were, for the photos of deleted listings
+        rescore = False
+        touched = set()
+        failed = None
+        for position, operation in enumerate(operations):
+            ids, error, needs_rescore = _apply_batch_operation(txn, operation)
+            if error:
+                results.append({"success": False, "error": error})
+                failed = position
+                break
+            results.append({"success": True, "ids": ids})
+            touched.update(str(listing_id) for listing_id in ids)
+            rescore = rescore or needs_rescore
+
+        if failed is not None:
+            txn.abort() # Nothing is applied, including the operations before the failed one
+            results += [{"success": False, "error": "Not run: an earlier operation failed."}] * (len(operations) - failed - 1)
+            print(f"Batch rejected at operation {failed}: {results[failed]['error']}")
+            return jsonify({"success": False, "error": f"Operation {failed} failed; nothing was applied.",
+                            "results": results}), 400
+
+        if rescore:
+            txn.listings = scoring.assign_scores(txn.listings) # One pass for the whole batch
+        listings = [listing for listing in txn.listings if str(listing.get("id")) in touched]
+        kept = {str(listing.get("id")) for listing in txn.listings}
+
+    _remove_unused_images([listing for listing in before if str(listing.get("id")) not in kept])
+    print(f"Applied batch of {len(operations)} operations to {len(touched)} listings.")
+    return jsonify({"success": True, "results": results, "listings": listings})
+
+def _sort_key(sort_by):
+    """Returns (key function, reverse) to order listings for display by sort_by (a listing field), best first."""
     reverse_sort = True # Default for score, higher is better
 
     # For these fields, lower values are generally better, so reverse_sort is False
     if sort_by in {"price", "distance", "cost_per_sqft", "cost_per_roommate"}:
         reverse_sort = False
 
-    listings = utils.load_listings()
-
     def sort_key(listing):
         """Helper function to extract the correct value for sorting."""
         value = listing.get(sort_by)
         
-        # Handle missing or 'N/A' values for sorting
-        if value is None or value == "N/A":
+        # Handle missing values for sorting
+        if value is None:
             # If sorting ascending, put 'N/A' at the very end (inf),
             # if sorting descending, put 'N/A' at the very end too (inf)
             # unless it's a "score" or similar where higher is always better
@@ -386,14 +951,9 @@ def get_listings():
                 return float('-inf') 
             return float('inf') 
 
-
-        if sort_by in {"price", "cost_per_sqft", "cost_per_roommate", "rent_score"}:
-            return utils.currency_to_float(value)
-        elif sort_by == "distance":
-            try:
-                return float(value.split()[0]) # Extract numeric part from "X miles"
-            except (ValueError, AttributeError):
-                return float('inf')
+        # Prices, distances, sizes and costs are already numbers on a Listing
+        if isinstance(value, (int, float)):
+            return value
         elif sort_by == "date_available":
             try:
                 # Try parsing common date formats
@@ -403,16 +963,500 @@ def get_listings():
                     return datetime.strptime(value, "%Y-%m-%d") if value != "Not Listed" else datetime.max
                 except ValueError:
                     return datetime.max # Put unparsable dates at the end
-        elif isinstance(value, (int, float)):
-            return value
         else:
             return 0 # Fallback for other types or unexpected values
 
+    return sort_key, reverse_sort
+
+def _sort_listings(listings, sort_by):
+    """Returns the listings sorted for display by sort_by (a listing field), best first."""
+    sort_key, reverse_sort = _sort_key(sort_by)
     print(f"Sorting by: {sort_by}, Reverse: {reverse_sort}")
-    # Perform the sort
-    sorted_listings = sorted(listings, key=sort_key, reverse=reverse_sort)
+    return sorted(listings, key=sort_key, reverse=reverse_sort)
+
+def _top_listings(listings, sort_by, k, predicate, whole_collection=True):
+    """
+    The first k listings in sort_by order that pass predicate, without sorting the collection:
+    read from the score index for the default sort (when listings is the whole collection),
+    otherwise a heap selection (O(n log k)). Same result as sorting and slicing, ties included.
+    Call with the store read-locked.
+    """
+    if sort_by == "score" and whole_collection:
+        score_index.sync(listings, store)
+        return score_index.top(k, predicate)
+    sort_key, reverse_sort = _sort_key(sort_by)
+    candidates = listings if predicate is None else filter(predicate, listings)
+    select = heapq.nlargest if reverse_sort else heapq.nsmallest
+    return select(k, candidates, key=sort_key)
+
+def _coordinates(value, axes, name):
+    """Parses comma-separated coordinates, one per axis ("lat" or "lon"). Raises ValueError unless each is finite and in range."""
+    try:
+        numbers = [float(part) for part in value.split(",")]
+    except ValueError:
+        numbers = []
+    if len(numbers) != len(axes) or not all(math.isfinite(number) and abs(number) <= (90 if axis == "lat" else 180)
+                                            for number, axis in zip(numbers, axes)):
+        raise ValueError(f"{name} must be {len(axes)} comma-separated numbers (latitudes within ±90, longitudes within ±180).")
+    return numbers
+
+def _area_query(args):
+    """
+    Parses ?near=lat,lon&radius=miles or ?bbox=south,west,north,east (a map viewport) into
+    (a function that returns the listings in that area from the spatial index, the near point).
+    near listings come nearest first; the point is None for a bbox. (None, None) if neither is
+    given. Raises ValueError for malformed values.
+    """
+    if args.get("bbox"):
+        south, west, north, east = _coordinates(args["bbox"], ("lat", "lon", "lat", "lon"), "bbox")
+        return (lambda index: index.within_box(south, west, north, east)), None
+    if args.get("near"):
+        lat, lon = _coordinates(args["near"], ("lat", "lon"), "near")
+        try:
+            miles = float(args.get("radius", config.DEFAULT_RADIUS_MILES))
+        except ValueError:
+            miles = None
+        if miles is None or not math.isfinite(miles) or miles < 0:
+            raise ValueError("radius must be a non-negative number.")
+        return (lambda index: [listing for _, listing in index.within_radius(lat, lon, miles)]), (lat, lon)
+    return None, None
+
+def _listing_filter(args):
+    """A predicate for the ?group=, ?contacted= and ?applied= filters, or None if none are given."""
+    group = args.get("group")
+    flags = {name: args[name].lower() in ("true", "1", "yes") for name in ("contacted", "applied") if args.get(name)}
+    if not group and not flags:
+        return None
+    def predicate(listing):
+        if group and listing.get("group") != group:
+            return False
+        return all(bool(listing.get(name)) == wanted for name, wanted in flags.items())
+    return predicate
+
+@app.route("/listings", methods=["GET"])
+def get_listings():
+    """
+    Retrieves and returns all listings, optionally sorted, streamed as a JSON array or NDJSON.
+    ?group=, ?contacted= and ?applied= filter them; ?near=lat,lon&radius=miles or
+    ?bbox=south,west,north,east limit them to an area (listings with coordinates only); ?top=K
+    returns only the best K (after filtering) without sorting the whole collection.
+    With ?near= and no ?sort_by= they come nearest first, each with its distance_miles from the point.
+    The X-Listings-Version header is the version to pass to /listings/changes.
+    """
+    sort_by = request.args.get("sort_by", "score") # Default sort by score
+    try:
+        top = int(request.args["top"]) if request.args.get("top") else None
+    except ValueError:
+        return jsonify({"success": False, "error": "top must be a number."}), 400
+    try:
+        area, point = _area_query(request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    predicate = _listing_filter(request.args)
+    by_distance = point is not None and not request.args.get("sort_by")
+
+    with store.read() as listings:
+        # Sort references only; records are encoded one at a time as the response streams, after
+        # the lock is released. Writers never change a stored record in place (txn.edit copies it),
+        # so the snapshot stays consistent.
+        candidates = listings
+        if area is not None:
+            spatial_index.sync(listings, store)
+            candidates = area(spatial_index)
+        if by_distance: # Already nearest first
+            sorted_listings = candidates if predicate is None else list(filter(predicate, candidates))
+            sorted_listings = sorted_listings[:max(top, 0)] if top is not None else sorted_listings
+        elif top is not None:
+            sorted_listings = _top_listings(candidates, sort_by, max(top, 0), predicate, whole_collection=area is None)
+        else:
+            sorted_listings = _sort_listings(candidates if predicate is None else list(filter(predicate, candidates)), sort_by)
+        version = store.version_token()
+
+    if by_distance: # Copies with the distance added; the stored records stay as they are
+        sorted_listings = [dict(listing.to_dict(), distance_miles=round(
+                               spatial.haversine_miles(*point, listing["latitude"], listing["longitude"]), 2))
+                           for listing in sorted_listings]
+
+    # A JSON array by default; NDJSON (one listing per line) with ?format=ndjson or Accept: application/x-ndjson
+    if request.args.get("format") == "ndjson" or request.accept_mimetypes.best == "application/x-ndjson":
+        response = Response(codec.iter_ndjson(sorted_listings, config.STREAM_CHUNK_BYTES), mimetype="application/x-ndjson")
+    else:
+        response = Response(codec.iter_json_array(sorted_listings, config.STREAM_CHUNK_BYTES), mimetype="application/json")
+    response.headers["X-Listings-Version"] = version
+    return response
+
+@app.route("/listings/changes", methods=["GET"])
+def get_listing_changes():
+    """
+    Delta sync: the listings created or updated (including re-scores) and the ids deleted since
+    ?since=<version>, plus the new version and the ids in ?sort_by order so the UI can re-order
+    its cards. If the version can't be diffed from (another worker, a restart, or too old),
+    returns {"reset": true} and the client should reload /listings.
+    """
+    since = request.args.get("since")
+    sort_by = request.args.get("sort_by", "score")
+    with store.read() as listings:
+        version = store.version_token()
+        delta = store.changes.since(since)
+        if delta is None:
+            return jsonify({"success": True, "reset": True, "version": version})
+        changed, deleted = delta
+        order = [listing.get("id") for listing in _sort_listings(listings, sort_by)]
+    return jsonify({"success": True, "reset": False, "version": version,
+                    "changed": changed, "deleted": deleted, "order": order})
+
+@app.route("/score_preview", methods=["POST"])
+def score_preview():
+    """
+    Scores and ranks every listing under trial weights ({"rent": 0.4, "dist": 0.2, ...}, the
+    /update_settings names; missing ones keep their current value) without changing anything:
+    nothing is saved and SCORE_WEIGHTS is untouched. Scores come from cached normalized
+    criteria columns, so this is cheap enough to call on every slider movement.
+    Returns the ids best first ("order", at most ?top= of them) with their "scores".
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        weights = _weights_from_request(data, config.SCORE_WEIGHTS)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    try:
+        top = int(request.args["top"]) if request.args.get("top") else None
+    except ValueError:
+        return jsonify({"success": False, "error": "top must be a number."}), 400
+
+    with store.read() as listings:
+        version = store.version_token()
+        columns = score_columns.columns(listings, store)
 
-    return jsonify(sorted_listings)
+    order, scores = profiles.ranking(columns["id"], scoring.score_columns(columns, weights), top)
+    return jsonify({"success": True, "version": version, "order": order, "scores": scores})
+
+@app.route("/search", methods=["GET"])
+def search_listings():
+    """
+    Ranked full-text search over addresses, comments and descriptions. ?q= takes words,
+    prefixes (gar*) and "quoted phrases", all of which must match; ?limit= caps the results.
+    Returns the matching listings best first, with their relevance.
+    """
+    query = request.args.get("q", "")
+    try:
+        limit = int(request.args.get("limit", config.SEARCH_RESULT_LIMIT))
+    except ValueError:
+        return jsonify({"success": False, "error": "limit must be a number."}), 400
+
+    with store.read() as listings:
+        search_index.sync(listings, store)
+        results = search_index.search(query, max(limit, 0))
+        version = store.version_token()
+    return jsonify({"success": True, "query": query, "version": version,
+                    "results": [{"id": listing.get("id"), "relevance": relevance} for relevance, listing in results],
+                    "listings": [listing for _, listing in results]})
+
+# --- Export and bulk import ---
+
+# Values for fields an imported row doesn't have, as for a newly added listing
+_IMPORT_DEFAULTS = {"contacted": False, "applied": False, "group": "none", "roommates": 1, "overall_rating": 5,
+                    "utility_estimate": None, "comments": "", "image": [], "thumbnails": []}
+
+def _import_batch(batch, errors):
+    """
+    Applies a batch of cleaned rows ((row number, fields)) in row order in one write, re-scoring
+    once if it added listings or changed a score input. A row whose id is stored updates just the
+    fields it has; other rows are added (keeping their id if it was never used). Updates that
+    change the url or address and additions are checked against the dedup index, which also
+    holds the listings earlier batches added. Returns (updated, added).
+    """
+    updated = added = 0
+    rescore = False
+    with store.write() as txn:
+        positions = {str(listing.get("id")): i for i, listing in enumerate(txn.listings)}
+        with archive_store.read() as archived_listings:
+            archived = {str(listing.get("id")) for listing in archived_listings}
+        next_id = None
+        for number, fields in batch:
+            key = str(fields["id"]) if "id" in fields else None
+            position = positions.get(key)
+            if position is not None:
+                listing = txn.listings[position].copy()
+                changed = scoring.apply_changes(listing, fields)
+                if not changed:
+                    continue
+                if "url" in changed or "address" in changed:
+                    duplicate_error = _duplicate_error(listing, allow_near_duplicate=True, own_id=listing.get("id"))
+                    if duplicate_error:
+                        errors.append({"row": number, "error": duplicate_error})
+                        continue
+                    listing_index.add(listing)
+                txn.listings[position] = listing
+                updated += 1
+                rescore = rescore or bool(changed & scoring.SCORE_INPUTS)
+                continue
+
+            if not fields.get("url") or not fields.get("address"):
+                errors.append({"row": number, "error": "New listings need a url and an address."})
+                continue
+            listing = Listing.from_dict({**_IMPORT_DEFAULTS, "added_at": time.time(), **fields}) # An exported added_at is kept
+            if key is None or key in archived or not isinstance(listing.get("id"), int):
+                if next_id is None:
+                    next_id = _new_listing_ids(1, txn.listings)[0]
+                listing["id"] = next_id
+            scoring.update_derived(listing)
+            duplicate_error = _duplicate_error(listing, allow_near_duplicate=True)
+            if duplicate_error:
+                errors.append({"row": number, "error": duplicate_error})
+                continue
+            if next_id is not None and listing["id"] >= next_id:
+                next_id = listing["id"] + 1 # Stays past every id in this batch
+            positions[str(listing["id"])] = len(txn.listings)
+            txn.listings.append(listing)
+            listing_index.add(listing)
+            added += 1
+
+        if added or rescore:
+            txn.listings = scoring.assign_scores(txn.listings)
+        elif not updated:
+            txn.dirty = False
+    return updated, added
+
+def _import_rows(rows):
+    """
+    Bulk import of exported rows (see formats.iter_rows), IMPORT_BATCH_ROWS at a time, each batch
+    in its own write (see _import_batch), so memory stays bounded however long the file is.
+    Returns a report with counts and the first MAX_IMPORT_ERRORS per-row errors.
+    """
+    report = {"rows": 0, "updated": 0, "added": 0, "failed": 0, "errors": []}
+
+    def apply(batch, batch_errors):
+        if batch:
+            updated, added = _import_batch(batch, batch_errors)
+            report["updated"] += updated
+            report["added"] += added
+        batch_errors.sort(key=lambda error: error["row"])
+        report["failed"] += len(batch_errors)
+        report["errors"].extend(batch_errors[:config.MAX_IMPORT_ERRORS - len(report["errors"])])
+
+    batch, batch_errors = [], []
+    for number, row in enumerate(rows, 1):
+        report["rows"] = number
+        try:
+            batch.append((number, formats.clean_row(row)))
+        except ValueError as e:
+            batch_errors.append({"row": number, "error": str(e)})
+        if len(batch) >= config.IMPORT_BATCH_ROWS:
+            apply(batch, batch_errors)
+            batch, batch_errors = [], []
+    apply(batch, batch_errors)
+    print(f"Imported {report['rows']} rows: {report['updated']} listings updated, {report['added']} added, {report['failed']} errors.")
+    return report
+
+@app.cli.command("export")
+@click.argument("path")
+@click.option("--format", "fmt", type=click.Choice(formats.FORMATS), default=None, help="Default: from the file extension.")
+@click.option("--fields", default=None, help="Comma-separated fields to export (default: all).")
+def export_command(path, fmt, fields):
+    """Writes the listings to a CSV, NDJSON, Parquet or Arrow file (flask --app zillower export listings.csv)."""
+    with store.read() as listings:
+        snapshot = list(listings) # References only; records are never changed in place
+    try:
+        chunks = formats.export(snapshot, formats.format_for(path, fmt), formats.select_fields(fields))
+    except ValueError as e:
+        print(f"Export failed: {e}")
+        return
+    with open(path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    print(f"Exported {len(snapshot)} listings to {path}.")
+
+@app.cli.command("import-listings")
+@click.argument("path")
+@click.option("--format", "fmt", type=click.Choice(formats.FORMATS), default=None, help="Default: from the file extension.")
+def import_listings_command(path, fmt):
+    """Updates and adds listings from an exported CSV, NDJSON, Parquet or Arrow file (flask --app zillower import-listings FILE)."""
+    profiles.activate(profiles.load_profiles()) # Re-score with the active profile's weights
+    try:
+        report = _import_rows(formats.iter_rows(path, formats.format_for(path, fmt)))
+    except (ValueError, csv.Error) as e:
+        print(f"Import failed: {e}")
+        return
+    for error in report["errors"]:
+        print(f"  row {error['row']}: {error['error']}")
+
+@app.route("/export", methods=["GET"])
+def export_listings():
+    """
+    Streams the listings as a download: ?format=csv (default), ndjson, parquet or arrow, and
+    ?fields=id,address,price to choose the columns. ?group=, ?contacted=, ?applied= filter as on
+    /listings, and ?sort_by= sorts (otherwise they come in stored order).
+    """
+    predicate = _listing_filter(request.args)
+    with store.read() as listings:
+        selected = list(listings) if predicate is None else list(filter(predicate, listings))
+        if request.args.get("sort_by"):
+            selected = _sort_listings(selected, request.args["sort_by"])
+        version = store.version_token()
+
+    fmt = request.args.get("format", "csv")
+    try:
+        fields = formats.select_fields(request.args.get("fields"))
+        chunks = formats.export(selected, formats.format_for("", fmt), fields) # Checks for pyarrow up front
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    response = Response(chunks, mimetype=formats.MIMETYPES[fmt])
+    response.headers["Content-Disposition"] = f"attachment; filename=listings.{fmt}"
+    response.headers["X-Listings-Version"] = version
+    return response
+
+@app.route("/import", methods=["POST"])
+def import_listings():
+    """
+    Bulk import from an exported file: the raw request body with ?format=, or a multipart 'file'
+    (format from ?format= or its extension). Rows with a stored id update that listing; others are
+    added. Returns counts and per-row errors.
+    """
+    if request.content_length is not None and request.content_length > config.MAX_IMPORT_BYTES:
+        return jsonify({"success": False, "error": "Upload is too large."}), 413
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("file")
+        if not upload:
+            return jsonify({"success": False, "error": "No 'file' in upload."}), 400
+        stream, filename = upload.stream, upload.filename or ""
+    else:
+        stream, filename = request.stream, ""
+
+    try:
+        fmt = formats.format_for(filename, request.args.get("format"))
+        path = importer.receive_file(stream, config.MAX_IMPORT_BYTES)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    try:
+        report = _import_rows(formats.iter_rows(path, fmt))
+    except (ValueError, csv.Error) as e: # No pyarrow, or not a file in the format it claims to be
+        return jsonify({"success": False, "error": f"Could not read the {fmt} file: {e}"}), 400
+    finally:
+        os.remove(path)
+    return jsonify(dict(report, success=True))
+
+# --- Archive tier ---
+
+def _archive_listings(select):
+    """
+    Moves the live listings select(listing) picks into the archive and re-scores the rest.
+    The archive is saved before the live list, so an interruption can leave a listing in both
+    files but never in neither. Returns the archived ids.
+    """
+    now = time.time()
+    with store.write() as txn, archive_store.write() as archived:
+        moving = [listing for listing in txn.listings if select(listing)]
+        if not moving:
+            txn.dirty = archived.dirty = False
+            return []
+        ids = {listing.get("id") for listing in moving}
+        archived.listings = [listing for listing in archived.listings if listing.get("id") not in ids] # Left over from an interrupted restore
+        for listing in moving:
+            listing = listing.copy()
+            listing["archived_at"] = now
+            archived.listings.append(listing)
+        txn.listings = [listing for listing in txn.listings if listing.get("id") not in ids]
+        for listing_id in ids:
+            listing_index.remove(listing_id)
+        txn.listings = scoring.assign_scores(txn.listings) # The min/max ranges may have changed
+    print(f"Archived {len(ids)} listings.")
+    return [listing.get("id") for listing in moving]
+
+def _restore_listings(ids):
+    """
+    Moves archived listings back into the live set and re-scores. Listings that now duplicate a
+    live one stay archived. The live list is saved first, then they're dropped from the archive.
+    Returns (restored ids, {id as a string: error}).
+    """
+    wanted = {str(listing_id) for listing_id in ids}
+    restored, failed = [], {}
+    with store.write() as txn, archive_store.read() as archived_listings:
+        for listing in archived_listings:
+            listing_id = listing.get("id")
+            if str(listing_id) not in wanted:
+                continue
+            wanted.discard(str(listing_id))
+            if txn.find(listing_id) is None:
+                duplicate_error = _duplicate_error(listing, allow_near_duplicate=True)
+                if duplicate_error:
+                    failed[str(listing_id)] = duplicate_error
+                    continue
+                listing = listing.copy()
+                listing.pop("archived_at", None)
+                txn.listings.append(listing)
+                listing_index.add(listing)
+            restored.append(listing_id) # Already live (an interrupted restore): just drop the archived copy
+        failed.update((listing_id, "Not in the archive.") for listing_id in wanted)
+        if restored:
+            txn.listings = scoring.assign_scores(txn.listings)
+        else:
+            txn.dirty = False
+
+    if restored:
+        restored_ids = set(restored)
+        with archive_store.write() as archived:
+            archived.listings = [listing for listing in archived.listings if listing.get("id") not in restored_ids]
+        print(f"Restored {len(restored)} listings from the archive.")
+    return restored, failed
+
+@app.cli.command("archive")
+def archive_command():
+    """Moves listings matching the archive policy into archive.json (flask --app zillower archive)."""
+    profiles.activate(profiles.load_profiles()) # Re-score the rest with the active profile's weights
+    now = time.time()
+    archived = _archive_listings(lambda listing: archive.archive_reason(listing, now) is not None)
+    print(f"{len(archived)} listings archived.")
+
+@app.route("/archive", methods=["GET"])
+def get_archive():
+    """
+    Archived listings, most recently archived first (?limit= caps them), or with ?q= a ranked
+    search over them (same syntax as /search). Loads the archive on first use.
+    """
+    query = request.args.get("q")
+    try:
+        limit = int(request.args.get("limit", config.SEARCH_RESULT_LIMIT))
+    except ValueError:
+        return jsonify({"success": False, "error": "limit must be a number."}), 400
+
+    with archive_store.read() as archived_listings:
+        if query:
+            archive_search.sync(archived_listings, archive_store)
+            listings = [listing for _, listing in archive_search.search(query, max(limit, 0))]
+        else:
+            listings = heapq.nlargest(max(limit, 0), archived_listings, key=lambda listing: listing.get("archived_at") or 0)
+        total = len(archived_listings)
+    return jsonify({"success": True, "total": total, "listings": listings})
+
+@app.route("/archive", methods=["POST"])
+def archive_listings():
+    """
+    Archives listings: {"ids": [...]}, or {"auto": true} for every listing the archive policy
+    (ARCHIVE_GROUPS, ARCHIVE_OFF_MARKET, ARCHIVE_AFTER_DAYS) picks. Returns the archived ids.
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get("auto"):
+        now = time.time()
+        archived = _archive_listings(lambda listing: archive.archive_reason(listing, now) is not None)
+    elif isinstance(data.get("ids"), list) and data["ids"]:
+        wanted = {str(listing_id) for listing_id in data["ids"]}
+        archived = _archive_listings(lambda listing: str(listing.get("id")) in wanted)
+    else:
+        return jsonify({"success": False, "error": "Give 'ids' to archive, or 'auto': true."}), 400
+    return jsonify({"success": True, "archived": archived})
+
+@app.route("/archive/restore", methods=["POST"])
+def restore_listings():
+    """Moves archived listings ({"ids": [...]}) back into the live set. Returns the restored ids and any failures."""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data.get("ids"), list) or not data["ids"]:
+        return jsonify({"success": False, "error": "Give 'ids' to restore."}), 400
+    restored, failed = _restore_listings(data["ids"])
+    if not restored and failed:
+        return jsonify({"success": False, "error": "Nothing restored.", "failed": failed}), 409
+    return jsonify({"success": True, "restored": restored, "failed": failed})
 
 # --- NEW COMMENT ENDPOINT ---
 @app.route('/update_comment', methods=['POST'])
@@ -425,16 +1469,14 @@ def update_comment():
     if not listing_id:
         return jsonify({"success": False, "error": "Listing ID is required."}), 400
 
-    listings = utils.load_listings()
-    found = False
-    for listing in listings:
-        if str(listing.get('id')) == listing_id:
+    with store.write() as txn:
+        listing = txn.edit(listing_id)
+        if listing:
             listing['comments'] = comments # Update the comments field
-            found = True
-            break
-    
-    if found:
-        utils.save_listings(listings)
+        else:
+            txn.dirty = False
+
+    if listing:
         return jsonify({"success": True, "message": "Comment updated successfully."})
     else:
         return jsonify({"success": False, "error": "Listing not found."}), 404
@@ -481,6 +1523,13 @@ def get_spiel_content():
 
 # --- Application Entry Point ---
 if __name__ == "__main__":
-    # If run directly, start the Flask development server.
-    # The @app.before_request will handle initial loading and scoring.
-    app.run(host="0.0.0.0", port=8080, debug=True)
\ No newline at end of file
+    # If run directly, warm up and start the Flask development server.
+    # With debug on, the reloader re-runs this file in a child process that does the serving;
+    # only that process needs to warm up.
+    debug = True
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        warm_up()
+        if config.REFRESH_ENABLED:
+            refresher.start()
+    # threaded=True is safe: all listing access goes through the store's locks.
+    app.run(host="0.0.0.0", port=8080, debug=debug, threaded=True)
\ No newline at end of file